@@ -0,0 +1,108 @@
+"""
+Memory benchmark for the in-process representation of a wardrobe.
+
+Builds one synthetic wardrobe (10k items by default) in a local SQLite
+database, fetches it the way the app does and measures with tracemalloc how
+much memory each representation keeps alive:
+    rows (select *)   PostgREST's list-of-dicts rows with every column
+    rows (loader)     the same with only the columns load_wardrobe selects
+    compact           benchmarks.compact.CompactWardrobe built from the loader
+                      rows (the rows themselves are freed)
+Each rows variant is parsed from its JSON payload, as the supabase client
+does, so the strings are fresh objects and not shared with the database
+layer. The compact form is also converted back with to_rows() and checked
+against the loader rows.
+
+Run from the repository root:
+    python -m benchmarks.bench_memory [--items 10000] [--slots 20] [--attrs 100] [--json PATH]
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from benchmarks.bench_routes import create_wardrobe
+from benchmarks.compact import CompactWardrobe
+from models.auth import user_repository
+from models.backend import SQLiteBackend, set_backend, get_backend
+from models.wardrobe import load_wardrobe, WARDROBE_TABLES
+
+
+def retained(build):
+    """Returns (result, bytes of traced memory still allocated after build())."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def full_rows(user_id):
+    return {table: get_backend().table(table).select("*").eq("user_id", user_id).execute().data
+            for table in WARDROBE_TABLES}
+
+
+def canonical(rows):
+    """Order-independent form of a wardrobe's rows, for the round-trip check."""
+    return {table: sorted(json.dumps(row, sort_keys=True) for row in rows[table]) for table in WARDROBE_TABLES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory of row dicts and the compact wardrobe.")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--slots", type=int, default=20)
+    parser.add_argument("--attrs", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    set_backend(SQLiteBackend())
+    user = user_repository.create("memory@example.com", "", "Memory", "Bench")
+    create_wardrobe(user["user_id"], args.items, args.slots, args.attrs, random.Random(args.seed))
+
+    # The JSON payloads the client would receive
+    full_payload = json.dumps(full_rows(user["user_id"]))
+    loader_payload = json.dumps(load_wardrobe(user["user_id"]))
+
+    full, full_bytes = retained(lambda: json.loads(full_payload))
+    n_values = len(full["attr_items"])
+    del full
+
+    loader, loader_bytes = retained(lambda: json.loads(loader_payload))
+    del loader
+
+    def build_compact():
+        rows = json.loads(loader_payload)
+        return CompactWardrobe.from_rows(*(rows[table] for table in WARDROBE_TABLES))
+
+    compact, compact_bytes = retained(build_compact)
+    round_trip = canonical(compact.to_rows()) == canonical(json.loads(loader_payload))
+
+    results = {
+        "items": args.items,
+        "values": n_values,
+        "rows_select_all_bytes": full_bytes,
+        "rows_loader_bytes": loader_bytes,
+        "compact_bytes": compact_bytes,
+        "round_trip_ok": round_trip,
+    }
+
+    print(f"{args.items} items, {n_values} attribute values, {args.slots} slots, {args.attrs} attributes")
+    print(f"{'representation':18} {'KiB':>9} {'B/item':>8} {'vs select *':>12}")
+    for label, size in (("rows (select *)", full_bytes), ("rows (loader)", loader_bytes), ("compact", compact_bytes)):
+        print(f"{label:18} {size / 1024:9.1f} {size / max(args.items, 1):8.1f} {size / full_bytes:11.1%}")
+    print(f"round trip through to_rows(): {'ok' if round_trip else 'MISMATCH'}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if not round_trip:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Route-level benchmark for the Flask app on a local SQLite backend.
+
+Builds synthetic users at several scales, then times the hot routes with the
+Flask test client: GET /items, GET /wardrobe, GET and POST /items/edit/<id>
+and POST /signup (which clones the default template). Repeat page views are
+served from the rendered-page cache (models.pages), so GET /items is also
+timed with the caches cleared before every request ("GET /items cold"). For every route it reports
+latency percentiles, data-store calls per request and the peak traced memory
+of one request. Results can be saved as a baseline and compared later; a
+route whose p50, store calls or peak memory grew past the threshold is
+reported as a regression and the run exits with status 1.
+
+The SQLite backend has no embedded selects, so store calls are those of the
+parallel per-table path (one per table) rather than one per page.
+
+The repository does not ship templates/edit_item.html, so while it is missing
+GET /items/edit/<id> renders a minimal stand-in (STAND_IN_TEMPLATES) listing
+the same item, slot and attribute values: the row measures the route's data
+loading with a trivial render.
+
+Run from the repository root:
+    python -m benchmarks.bench_routes [--scales small,medium,large] [--iterations N]
+                                      [--save-baseline PATH] [--baseline PATH]
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from jinja2 import ChoiceLoader, DictLoader
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from models.backend import SQLiteBackend, set_backend
+from models.auth import user_repository
+from models.attributes import slot_repository, attribute_repository
+from models.items import item_repository
+from models.rules import rule_repository
+from models import pages
+
+# (items, slots, attributes) per scale
+SCALES = {
+    "small": (10, 5, 10),
+    "medium": (1000, 10, 50),
+    "large": (10000, 20, 100),
+}
+COLORS = ["red", "blue", "green", "black", "white", "grey", "navy", "beige"]
+SEASONS = ["summer", "winter", "spring", "fall"]
+DEFAULT_USER_EMAIL = "DEFAULT_DEFAULT"
+REGRESSION_THRESHOLD = 0.2
+# Latency changes smaller than this are timer noise on sub-millisecond routes
+MIN_LATENCY_DELTA_MS = 1.0
+
+# Rendered in place of templates the benchmarked routes need but the repository lacks
+STAND_IN_TEMPLATES = {
+    "edit_item.html": (
+        "<h1>{{ item.item_name }} ({{ slot.slot_name }})</h1>"
+        "{% for attr in attributes %}<p>{{ attr.attr_name }}: {{ attr_values.get(attr.attr_id, '') }}</p>{% endfor %}"
+    ),
+}
+
+
+class CountingBackend(SQLiteBackend):
+    """SQLiteBackend that counts executed queries by (table, action)."""
+
+    def __init__(self, path=":memory:"):
+        super(CountingBackend, self).__init__(path)
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+
+    def execute(self, query):
+        with self._calls_lock:
+            self.calls[f"{query.table}.{query.action}"] += 1
+        return super(CountingBackend, self).execute(query)
+
+    def rpc(self, name, params):
+        with self._calls_lock:
+            self.calls[f"rpc.{name}"] += 1
+        return super(CountingBackend, self).rpc(name, params)
+
+
+# ==========================================================
+#                     SYNTHETIC DATA
+# ==========================================================
+
+def create_wardrobe(user_id, n_items, n_slots, n_attrs, rng):
+    """Fills a user's wardrobe; attributes are spread round-robin over the slots."""
+    slots = slot_repository.create_many([{
+        "user_id": user_id,
+        "slot_name": f"Slot {i}",
+        "order_index": (i + 1) * 1024
+    } for i in range(n_slots)])
+
+    attributes = attribute_repository.create_many([{
+        "user_id": user_id,
+        "attr_name": f"attr{i}",
+        "attr_type": "string",
+        "attr_possiblevals": COLORS if i % 2 == 0 else SEASONS,
+        "allow_multiple": i % 5 == 4
+    } for i in range(n_attrs)])
+
+    slot_attrs = {slot["slot_id"]: [] for slot in slots}
+    links = []
+    for i, attr in enumerate(attributes):
+        slot = slots[i % n_slots]
+        slot_attrs[slot["slot_id"]].append(attr)
+        links.append({
+            "user_id": user_id,
+            "attr_id": attr["attr_id"],
+            "slot_id": slot["slot_id"],
+            "order_index": len(slot_attrs[slot["slot_id"]]) * 1024
+        })
+    attribute_repository.create_links(links)
+
+    items = item_repository.table("items").insert([{
+        "user_id": user_id,
+        "item_name": f"Item {i}",
+        "slot_id": slots[i % n_slots]["slot_id"],
+        "times_generated": rng.randint(0, 50),
+        "times_worn": rng.randint(0, 20)
+    } for i in range(n_items)]).execute().data
+
+    values = []
+    for item in items:
+        for attr in slot_attrs[item["slot_id"]]:
+            values.append({
+                "user_id": user_id,
+                "attr_id": attr["attr_id"],
+                "item_id": item["item_id"],
+                "value": rng.choice(attr["attr_possiblevals"])
+            })
+    if values:
+        item_repository.table("attr_items").insert(values).execute()
+
+    rule_repository.create_many([{
+        "user_id": user_id,
+        "rule_definition": '"Slot 0".attr0 != "Slot 1".attr1'
+    }])
+    return items, slot_attrs
+
+
+def create_template(rng):
+    """The default template user whose data /signup clones."""
+    template = user_repository.create(DEFAULT_USER_EMAIL, "", "Default", "Template")
+    create_wardrobe(template["user_id"], 0, 8, 20, rng)
+
+
+def add_stand_in_templates(app):
+    """Lets the app find STAND_IN_TEMPLATES that templates/ does not have."""
+    missing = {name: source for name, source in STAND_IN_TEMPLATES.items()
+               if name not in app.jinja_env.list_templates()}
+    if missing:
+        print(f"Using stand-in templates for: {', '.join(sorted(missing))}")
+        app.jinja_env.loader = ChoiceLoader([app.jinja_env.loader, DictLoader(missing)])
+
+
+# ==========================================================
+#                     MEASUREMENT
+# ==========================================================
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(p / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def measure(backend, request, iterations):
+    """
+    Times iterations calls of request() after one warm-up call, then runs one
+    more call under tracemalloc for the peak memory.
+    """
+    request(0)
+
+    backend.calls.clear()
+    timings = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        request(i + 1)
+        timings.append((time.perf_counter() - started) * 1e3)
+    calls = dict(backend.calls)
+
+    tracemalloc.start()
+    request(iterations + 1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "p50_ms": percentile(timings, 50),
+        "p90_ms": percentile(timings, 90),
+        "p99_ms": percentile(timings, 99),
+        "mean_ms": sum(timings) / len(timings),
+        "store_calls": sum(calls.values()) / iterations,
+        "store_calls_by_table": {k: v / iterations for k, v in sorted(calls.items())},
+        "peak_kib": peak / 1024.0,
+    }
+
+
+def expect(response, *statuses):
+    # Reading the body runs a streamed response to the end
+    response.get_data()
+    if response.status_code not in statuses:
+        raise RuntimeError(f"Unexpected status {response.status_code} for {response.request.path}")
+    return response
+
+
+def bench_scale(app, backend, name, iterations, rng):
+    n_items, n_slots, n_attrs = SCALES[name]
+    user = user_repository.create(f"bench-{name}@example.com", "", "Bench", name)
+    items, slot_attrs = create_wardrobe(user["user_id"], n_items, n_slots, n_attrs, rng)
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = user["user_id"]
+
+    def edit(i):
+        item = items[i % len(items)]
+        form = {"item_name": f"Item {i}"}
+        for attr in slot_attrs[item["slot_id"]]:
+            form[f"attr_{attr['attr_id']}"] = attr["attr_possiblevals"][i % len(attr["attr_possiblevals"])]
+        expect(client.post(f"/items/edit/{item['item_id']}", data=form), 302)
+
+    def items_cold(i):
+        pages.version_cache.clear()
+        pages.page_cache.clear()
+        pages.fragment_cache.clear()
+        expect(client.get("/items"), 200)
+
+    def signup(i):
+        fresh = app.test_client()
+        expect(fresh.post("/signup", data={
+            "first_name": "New",
+            "last_name": "User",
+            "email": f"signup-{name}-{i}-{rng.random()}@example.com",
+            "password": "benchmark"
+        }), 302)
+
+    routes = {
+        "GET /items": lambda i: expect(client.get("/items"), 200),
+        "GET /items cold": items_cold,
+        "GET /wardrobe": lambda i: expect(client.get("/wardrobe"), 200),
+        "GET /items/edit": lambda i: expect(client.get(f"/items/edit/{items[i % len(items)]['item_id']}"), 200),
+        "POST /items/edit": edit,
+        "POST /signup": signup,
+    }
+    return {route: measure(backend, request, iterations) for route, request in routes.items()}
+
+
+# ==========================================================
+#                     BASELINE
+# ==========================================================
+
+def compare(results, baseline, threshold):
+    """Returns a line for every route that got slower, chattier or hungrier than the baseline."""
+    regressions = []
+    for scale, routes in results.items():
+        for route, now in routes.items():
+            before = baseline.get(scale, {}).get(route)
+            if before is None:
+                continue
+            for key in ("p50_ms", "store_calls", "peak_kib"):
+                if key == "p50_ms" and now[key] - before[key] < MIN_LATENCY_DELTA_MS:
+                    continue
+                if before[key] and now[key] > before[key] * (1 + threshold):
+                    regressions.append(f"{scale} {route}: {key} {before[key]:.2f} -> {now[key]:.2f}")
+                elif not before[key] and now[key]:
+                    regressions.append(f"{scale} {route}: {key} 0 -> {now[key]:.2f}")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'scale':8} {'route':18} {'p50':>8} {'p90':>8} {'p99':>8} {'calls':>6} {'peak KiB':>9}")
+    for scale, routes in results.items():
+        for route, r in routes.items():
+            print(f"{scale:8} {route:18} {r['p50_ms']:7.2f}ms {r['p90_ms']:7.2f}ms {r['p99_ms']:7.2f}ms "
+                  f"{r['store_calls']:6.1f} {r['peak_kib']:9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hot Flask routes on synthetic wardrobes.")
+    parser.add_argument("--scales", default="small,medium,large", help="comma-separated: " + ", ".join(SCALES))
+    parser.add_argument("--iterations", type=int, default=30, help="timed requests per route")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="allowed relative growth before a regression is reported (default 0.2)")
+    args = parser.parse_args()
+
+    backend = CountingBackend()
+    set_backend(backend)
+
+    from view import app
+    app.testing = True
+    add_stand_in_templates(app)
+
+    rng = random.Random(args.seed)
+    create_template(rng)
+
+    results = {}
+    for name in args.scales.split(","):
+        started = time.perf_counter()
+        results[name] = bench_scale(app, backend, name, args.iterations, rng)
+        print(f"{name}: done in {time.perf_counter() - started:.1f}s")
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
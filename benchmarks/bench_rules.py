@@ -0,0 +1,62 @@
+"""
+Micro-benchmark for the rule engine: one-off compile cost and per-check cost.
+
+Run from the repository root:
+    python -m benchmarks.bench_rules
+"""
+import random
+import timeit
+
+from models.rule_engine import compile_rule
+
+COLORS = ["red", "blue", "green", "black", "white", "grey", "navy", "beige"]
+SEASONS = ["summer", "winter", "spring", "fall"]
+
+SLOTS = [
+    {"slot_id": 1, "slot_name": "Top", "order_index": 1024},
+    {"slot_id": 2, "slot_name": "Bottom", "order_index": 2048},
+    {"slot_id": 3, "slot_name": "Shoes", "order_index": 3072},
+]
+ATTRIBUTES = [
+    {"attr_id": 10, "attr_name": "color", "allow_multiple": False},
+    {"attr_id": 11, "attr_name": "season", "allow_multiple": True},
+]
+SLOT_ATTRS = {slot["slot_id"]: ATTRIBUTES for slot in SLOTS}
+
+RULES = [
+    "if top.color = red then bottom.color != red",
+    "top.season in {summer, spring} or not bottom.season in {summer, spring}",
+    "shoes.color = bottom.color or shoes.color in {black, white}",
+    'if "Top".color = navy and bottom.color = navy then shoes.color != navy',
+]
+
+
+def random_outfit(rng):
+    return {
+        slot["slot_id"]: {"attr_values": {
+            10: rng.choice(COLORS),
+            11: ", ".join(rng.sample(SEASONS, rng.randint(1, 2))),
+        }}
+        for slot in SLOTS
+    }
+
+
+def main():
+    rng = random.Random(42)
+    outfits = [random_outfit(rng) for _ in range(1000)]
+
+    for definition in RULES:
+        compile_time = timeit.timeit(lambda: compile_rule(definition, SLOTS, SLOT_ATTRS, ATTRIBUTES), number=200) / 200
+        rule = compile_rule(definition, SLOTS, SLOT_ATTRS, ATTRIBUTES)
+
+        check = rule.check
+        rounds = 20
+        check_time = timeit.timeit(lambda: [check(o) for o in outfits], number=rounds) / (rounds * len(outfits))
+        passed = sum(check(o) for o in outfits)
+
+        print(f"{definition}")
+        print(f"    compile {compile_time * 1e6:8.1f} us   check {check_time * 1e9:8.0f} ns   pass rate {passed / len(outfits):.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Worker startup benchmark: how long a fresh gunicorn worker takes to boot and
+to serve its first real request, with and without --preload and with and
+without cache warm-up (WARM_CACHES, see view.warm_up).
+
+For every variant a single gthread worker is started against the PostgREST
+stand-in (benchmarks.postgrest_standin) and the harness measures
+    boot     spawn -> GET /login answered (no database access)
+    ttfr     spawn -> first /outfits/generate answered, login included
+    first    latency of that first /outfits/generate
+    steady   median latency of the next requests
+It also times "import view" in a fresh interpreter. Each variant is run
+--repeat times and the medians are reported.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup [--repeat 3] [--latency-ms 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.loadtest import PASSWORD, free_port, seed, start_gunicorn, start_standin, stop, wait_for
+
+VARIANTS = {
+    "lazy": ((), {}),
+    "lazy+preload": (("--preload",), {}),
+    "warm": ((), {"WARM_CACHES": "True"}),
+    "warm+preload": (("--preload",), {"WARM_CACHES": "True"}),
+}
+STEADY_REQUESTS = 5
+
+
+def time_import(env):
+    """Seconds to import the app in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import view; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def run_variant(env, extra_args, email):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.monotonic()
+    server = start_gunicorn("gthread:1x4", port, env, extra_args)
+    try:
+        wait_for(f"{base}/login")
+        boot = time.monotonic() - started
+
+        with httpx.Client(base_url=base, timeout=60.0) as client:
+            client.post("/login", data={"email": email, "password": PASSWORD})
+            began = time.monotonic()
+            client.get("/outfits/generate").raise_for_status()
+            first = time.monotonic() - began
+            ttfr = time.monotonic() - started
+
+            steady = []
+            for _ in range(STEADY_REQUESTS):
+                began = time.monotonic()
+                client.get("/outfits/generate").raise_for_status()
+                steady.append(time.monotonic() - began)
+        return {"boot": boot, "ttfr": ttfr, "first": first, "steady": statistics.median(steady)}
+    finally:
+        stop(server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure gunicorn worker startup and time-to-first-request.")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per variant")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stand-in latency per query")
+    parser.add_argument("--users", type=int, default=10, help="synthetic users (all warmed)")
+    parser.add_argument("--items", type=int, default=200, help="items per user")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "wardrobe.sqlite")
+        users = seed(db_path, args.users, args.items, random.Random(7))
+        standin, env = start_standin(db_path, args.latency_ms, 0.0)
+        env["WARM_SCHEMA_USERS"] = str(args.users)
+        try:
+            imports = [time_import(env) for _ in range(args.repeat)]
+            print(f"import view: {statistics.median(imports) * 1e3:.0f}ms")
+
+            print(f"{'variant':14} {'boot':>8} {'ttfr':>8} {'first':>8} {'steady':>8}")
+            for name, (extra_args, extra_env) in VARIANTS.items():
+                runs = [run_variant(dict(env, **extra_env), extra_args, users[i % len(users)]["email"])
+                        for i in range(args.repeat)]
+                medians = {key: statistics.median(run[key] for run in runs) * 1e3 for key in runs[0]}
+                print(f"{name:14} {medians['boot']:6.0f}ms {medians['ttfr']:6.0f}ms "
+                      f"{medians['first']:6.0f}ms {medians['steady']:6.0f}ms", flush=True)
+        finally:
+            stop(standin)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Experimental compact in-memory form of a wardrobe, measured by
+benchmarks/bench_memory.py. The app does not use it: its caches hold the
+loaders' row dicts, and a cached wardrobe would also need the cross-worker
+invalidation the outfit pool and page cache get from the wardrobe version.
+"""
+import sys
+from array import array
+
+
+# Array typecodes for value codes, smallest first; a column is widened when
+# its attribute's value pool outgrows the current type
+_CODE_TYPES = (("B", 0xFF), ("H", 0xFFFF), ("I", 0xFFFFFFFF))
+
+# Columns of the row dicts to_rows() produces (the wardrobe loaders' columns)
+SLOT_FIELDS = ("slot_id", "slot_name", "order_index")
+ATTRIBUTE_FIELDS = ("attr_id", "attr_name", "attr_type", "attr_possiblevals", "allow_multiple")
+ATTR_SLOT_FIELDS = ("attr_id", "slot_id", "order_index")
+ITEM_FIELDS = ("item_id", "item_name", "slot_id", "times_generated", "times_worn")
+
+
+# ==========================================================
+#                     RECORDS
+# ==========================================================
+
+class Record(object):
+    """A row with fixed fields and no per-instance dict."""
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*(row.get(field) for field in cls.__slots__))
+
+    def to_row(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class SlotRecord(Record):
+    __slots__ = SLOT_FIELDS
+
+
+class AttributeRecord(Record):
+    __slots__ = ATTRIBUTE_FIELDS
+
+
+class AttrSlotRecord(Record):
+    __slots__ = ATTR_SLOT_FIELDS
+
+
+class ItemRecord(Record):
+    __slots__ = ITEM_FIELDS
+
+
+# ==========================================================
+#                     VALUE COLUMNS
+# ==========================================================
+
+class ValueColumn(object):
+    """
+    One attribute's values for every item of a wardrobe: an array of small
+    integer codes indexed by item position (0 = no value), plus the pool of
+    distinct value strings the codes stand for. Each distinct value is
+    stored once however many items share it, and the codes take one byte
+    each until an attribute has more than 255 distinct values.
+    """
+
+    __slots__ = ("codes", "values", "_lookup")
+
+    def __init__(self, size=0):
+        self.codes = array("B", bytes(size))
+        self.values = [None]        # code -> value
+        self._lookup = {}           # value -> code
+
+    def get(self, index):
+        return self.values[self.codes[index]]
+
+    def set(self, index, value):
+        self.codes[index] = self._code(value)
+
+    def append(self, value=None):
+        self.codes.append(self._code(value))
+
+    def pop(self, index):
+        """Moves the last entry into index (the wardrobe's swap-remove)."""
+        last = self.codes.pop()
+        if index < len(self.codes):
+            self.codes[index] = last
+
+    def _code(self, value):
+        if value is None:
+            return 0
+        code = self._lookup.get(value)
+        if code is None:
+            # Interned, so equal values share one string across attributes and wardrobes
+            if isinstance(value, str):
+                value = sys.intern(value)
+            code = len(self.values)
+            self.values.append(value)
+            self._lookup[value] = code
+            self._widen(code)
+        return code
+
+    def _widen(self, code):
+        for typecode, limit in _CODE_TYPES:
+            if code <= limit:
+                if array(typecode).itemsize > self.codes.itemsize:
+                    self.codes = array(typecode, self.codes)
+                return
+        raise OverflowError("Too many distinct values for one attribute")
+
+    def nbytes(self):
+        """Bytes held by the code array (the pool's strings are shared with their callers)."""
+        return self.codes.itemsize * len(self.codes)
+
+
+# ==========================================================
+#                     WARDROBE
+# ==========================================================
+
+class CompactWardrobe(object):
+    """
+    A user's slots, attributes and items held as __slots__ records, with the
+    attribute values (attr_items) stored column-wise: one ValueColumn per
+    attribute, indexed by item position. Compared with PostgREST's lists of
+    row dicts, an attribute value costs one to four bytes instead of a dict
+    per attr_items row, and repeated values are not duplicated.
+
+    from_rows() and to_rows() convert from and to the loaders' row dicts, and
+    item_row() / slot_items() give the item dicts (with attr_values) that
+    the generator, rule engine and scorer take, should a cache adopt it.
+    """
+
+    __slots__ = ("slots", "attributes", "attr_slots", "items", "positions", "columns")
+
+    def __init__(self, slots=(), attributes=(), attr_slots=()):
+        self.slots = [SlotRecord.from_row(row) for row in slots]
+        self.attributes = [AttributeRecord.from_row(row) for row in attributes]
+        self.attr_slots = [AttrSlotRecord.from_row(row) for row in attr_slots]
+        self.items = []             # position -> ItemRecord
+        self.positions = {}         # item_id -> position
+        self.columns = {}           # attr_id -> ValueColumn
+
+    @classmethod
+    def from_rows(cls, slots, attributes, attr_slots, items, attr_items):
+        """Builds the compact form of the rows load_wardrobe returns."""
+        wardrobe = cls(slots, attributes, attr_slots)
+        for row in items:
+            wardrobe._append(ItemRecord.from_row(row))
+        for row in attr_items:
+            position = wardrobe.positions.get(row["item_id"])
+            if position is not None:
+                wardrobe._column(row["attr_id"]).set(position, row["value"])
+        return wardrobe
+
+    def to_rows(self):
+        """Returns the rows as load_wardrobe would: {table: [row dicts]}."""
+        attr_items = []
+        for attr_id, column in self.columns.items():
+            for position, code in enumerate(column.codes):
+                if code:
+                    attr_items.append({
+                        "item_id": self.items[position].item_id,
+                        "attr_id": attr_id,
+                        "value": column.values[code]
+                    })
+        return {
+            "slots": [slot.to_row() for slot in self.slots],
+            "attributes": [attr.to_row() for attr in self.attributes],
+            "attr_slots": [link.to_row() for link in self.attr_slots],
+            "items": [item.to_row() for item in self.items],
+            "attr_items": attr_items,
+        }
+
+    def __len__(self):
+        return len(self.items)
+
+    # ------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------
+
+    def value(self, item_id, attr_id):
+        column = self.columns.get(attr_id)
+        position = self.positions.get(item_id)
+        if column is None or position is None:
+            return None
+        return column.get(position)
+
+    def attr_values(self, item_id):
+        """{attr_id: value} of one item."""
+        position = self.positions[item_id]
+        values = {}
+        for attr_id, column in self.columns.items():
+            code = column.codes[position]
+            if code:
+                values[attr_id] = column.values[code]
+        return values
+
+    def item_row(self, item_id):
+        """The item as a row dict with its attr_values attached."""
+        row = self.items[self.positions[item_id]].to_row()
+        row["attr_values"] = self.attr_values(item_id)
+        return row
+
+    def slot_items(self):
+        """{slot_id: [item rows with attr_values]}, like assemble_items_page."""
+        by_slot = {slot.slot_id: [] for slot in self.slots}
+        for item in self.items:
+            by_slot.setdefault(item.slot_id, []).append(self.item_row(item.item_id))
+        return by_slot
+
+    # ------------------------------------------------------
+    # Writes (for caches kept current by the write routes)
+    # ------------------------------------------------------
+
+    def add_item(self, row, values=None):
+        """Adds an item row with its {attr_id: value} values."""
+        position = self._append(ItemRecord.from_row(row))
+        for attr_id, value in (values or {}).items():
+            self._column(attr_id).set(position, value)
+
+    def set_values(self, item_id, values):
+        """Replaces an item's attribute values with {attr_id: value}."""
+        position = self.positions[item_id]
+        for attr_id, column in self.columns.items():
+            if attr_id not in values:
+                column.set(position, None)
+        for attr_id, value in values.items():
+            self._column(attr_id).set(position, value)
+
+    def remove_item(self, item_id):
+        """Removes an item by moving the last item into its position."""
+        position = self.positions.pop(item_id)
+        last = self.items.pop()
+        if position < len(self.items):
+            self.items[position] = last
+            self.positions[last.item_id] = position
+        for column in self.columns.values():
+            column.pop(position)
+
+    def _append(self, item):
+        position = len(self.items)
+        self.items.append(item)
+        self.positions[item.item_id] = position
+        for column in self.columns.values():
+            column.append()
+        return position
+
+    def _column(self, attr_id):
+        column = self.columns.get(attr_id)
+        if column is None:
+            column = self.columns[attr_id] = ValueColumn(len(self.items))
+        return column
@@ -0,0 +1,334 @@
+"""
+Load test: the app under gunicorn against the local PostgREST stand-in.
+
+Seeds a SQLite database with synthetic users, serves it with
+benchmarks.postgrest_standin (with injected latency), then for every worker
+configuration starts gunicorn on view:app and drives a weighted mix of
+login, /items, add item, edit item and outfit requests at increasing
+concurrency. Each virtual user is a thread with its own session.
+
+For every configuration and concurrency level it reports throughput,
+p50/p95/p99 latency and errors, then the saturation point: the lowest
+concurrency after which more clients raised throughput by less than 10%.
+The load generator is itself Python threads, so on a small machine leave
+it enough CPU (or raise the injected latency) for the numbers to reflect
+the server.
+
+Run from the repository root:
+    python -m benchmarks.loadtest [--configs sync:4,gthread:4x8] [--concurrency 1,8,32,64]
+                                  [--duration 10] [--latency-ms 20] [--json PATH]
+Worker configs are <worker class>:<workers>[x<threads>]. The first config is
+the reference: the summary shows every other config's throughput and p99 at
+the highest concurrency relative to it (by default sync vs gthread workers,
+see gunicorn.conf.py).
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+from werkzeug.security import generate_password_hash
+
+from benchmarks.bench_routes import create_wardrobe, percentile
+from models.auth import user_repository
+from models.backend import SQLiteBackend, set_backend
+
+PASSWORD = "loadtest"
+DEFAULT_MIX = "login=1,items=4,add=1,edit=2,outfit=2"
+SATURATION_GAIN = 0.1
+
+
+# ==========================================================
+#                     SETUP
+# ==========================================================
+
+def seed(db_path, n_users, n_items, rng):
+    """Creates n_users users with small wardrobes; returns their login and form data."""
+    set_backend(SQLiteBackend(db_path))
+    password_hash = generate_password_hash(PASSWORD)
+
+    users = []
+    for i in range(n_users):
+        user = user_repository.create(f"load{i}@example.com", password_hash, "Load", str(i))
+        items, slot_attrs = create_wardrobe(user["user_id"], n_items, 4, 8, rng)
+        users.append({
+            "email": user["email"],
+            "item_ids": [item["item_id"] for item in items],
+            "slot_attrs": {slot_id: [(a["attr_id"], a["attr_possiblevals"]) for a in attrs]
+                           for slot_id, attrs in slot_attrs.items()},
+        })
+    return users
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_standin(db_path, latency_ms, jitter_ms):
+    """Starts the PostgREST stand-in; returns (process, environment for the app)."""
+    port = free_port()
+    standin = subprocess.Popen([sys.executable, "-m", "benchmarks.postgrest_standin", "--db", db_path,
+                                "--port", str(port), "--latency-ms", str(latency_ms),
+                                "--jitter-ms", str(jitter_ms)])
+    env = dict(os.environ,
+               DATA_BACKEND="supabase",
+               SUPABASE_URL=f"http://127.0.0.1:{port}",
+               SUPABASE_KEY="standin",
+               SECRET_KEY=os.environ.get("SECRET_KEY", "loadtest"))
+    try:
+        wait_for(f"http://127.0.0.1:{port}/rest/v1/users?select=user_id&limit=1")
+    except Exception:
+        stop(standin)
+        raise
+    return standin, env
+
+
+def parse_config(config):
+    """'gthread:2x8' -> ('gthread', 2, 8)."""
+    worker_class, _, size = config.partition(":")
+    workers, _, threads = (size or "1").partition("x")
+    return worker_class, int(workers), int(threads or 1)
+
+
+def start_gunicorn(config, port, env, extra_args=()):
+    worker_class, workers, threads = parse_config(config)
+    command = [sys.executable, "-m", "gunicorn", "view:app",
+               "--bind", f"127.0.0.1:{port}",
+               "--worker-class", worker_class,
+               "--workers", str(workers),
+               "--threads", str(threads),
+               "--log-level", "warning"] + list(extra_args)
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# ==========================================================
+#                     LOAD
+# ==========================================================
+
+def parse_mix(mix):
+    ops, weights = [], []
+    for part in mix.split(","):
+        op, _, weight = part.partition("=")
+        ops.append(op.strip())
+        weights.append(float(weight or 1))
+    return ops, weights
+
+
+class VirtualUser(object):
+    """One logged-in browser session issuing the request mix."""
+
+    def __init__(self, base_url, user, rng):
+        self.client = httpx.Client(base_url=base_url, timeout=60.0, follow_redirects=False)
+        self.user = user
+        self.rng = rng
+        self.counter = 0
+
+    def login(self):
+        response = self.client.post("/login", data={"email": self.user["email"], "password": PASSWORD})
+        return response.status_code == 302
+
+    def items(self):
+        return self.client.get("/items").status_code == 200
+
+    def outfit(self):
+        return self.client.get("/outfits/generate").status_code == 200
+
+    def add(self):
+        slot_id = self.rng.choice(list(self.user["slot_attrs"]))
+        return self.client.post("/items/new", data=self._form(slot_id, "slot_id")).status_code == 302
+
+    def edit(self):
+        if not self.user["item_ids"]:
+            return self.items()
+        item_id = self.rng.choice(self.user["item_ids"])
+        slot_id = next(iter(self.user["slot_attrs"]))
+        form = self._form(slot_id)
+        return self.client.post(f"/items/edit/{item_id}", data=form).status_code == 302
+
+    def _form(self, slot_id, slot_key=None):
+        self.counter += 1
+        form = {"item_name": f"Load item {self.counter}"}
+        if slot_key:
+            form[slot_key] = str(slot_id)
+        for attr_id, values in self.user["slot_attrs"][slot_id]:
+            form[f"attr_{attr_id}"] = self.rng.choice(values)
+        return form
+
+    def close(self):
+        self.client.close()
+
+
+def run_level(base_url, users, concurrency, duration, mix, seed):
+    """Runs concurrency virtual users for duration seconds; returns the level's stats."""
+    ops, weights = parse_mix(mix)
+    samples = []
+    samples_lock = threading.Lock()
+    deadline = [0.0]
+    # Every client logs in first; the clock starts once all of them have
+    start = threading.Barrier(concurrency + 1,
+                              action=lambda: deadline.__setitem__(0, time.monotonic() + duration))
+
+    def client(n):
+        rng = random.Random(seed * 1000 + n)
+        vu = VirtualUser(base_url, users[n % len(users)], rng)
+        vu.login()
+        start.wait()
+        local = []
+        try:
+            while time.monotonic() < deadline[0]:
+                op = rng.choices(ops, weights)[0]
+                began = time.perf_counter()
+                try:
+                    ok = getattr(vu, op)()
+                except httpx.HTTPError:
+                    ok = False
+                local.append((op, (time.perf_counter() - began) * 1e3, ok))
+        finally:
+            vu.close()
+            with samples_lock:
+                samples.extend(local)
+
+    threads = [threading.Thread(target=client, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.monotonic()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - began
+
+    latencies = sorted(ms for _, ms, _ in samples)
+    by_op = {}
+    for op in ops:
+        op_latencies = sorted(ms for name, ms, _ in samples if name == op)
+        if op_latencies:
+            by_op[op] = {"count": len(op_latencies), "p50_ms": percentile(op_latencies, 50),
+                         "p99_ms": percentile(op_latencies, 99)}
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": sum(1 for _, _, ok in samples if not ok),
+        "throughput": len(samples) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "by_op": by_op,
+    }
+
+
+def saturation(levels):
+    """The first level after which throughput grew by less than SATURATION_GAIN."""
+    for current, following in zip(levels, levels[1:]):
+        if following["throughput"] < current["throughput"] * (1 + SATURATION_GAIN):
+            return current
+    return None
+
+
+# ==========================================================
+#                     REPORT
+# ==========================================================
+
+def print_config(config, levels):
+    print(f"\n{config}")
+    print(f"  {'clients':>7} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for level in levels:
+        print(f"  {level['concurrency']:7d} {level['throughput']:8.1f} {level['p50_ms']:7.1f}ms "
+              f"{level['p95_ms']:7.1f}ms {level['p99_ms']:7.1f}ms {level['errors']:7d}")
+    point = saturation(levels)
+    if point:
+        print(f"  saturates at {point['concurrency']} clients: {point['throughput']:.1f} req/s, "
+              f"p99 {point['p99_ms']:.1f}ms")
+    else:
+        print("  not saturated at the highest concurrency tested")
+
+
+def print_comparison(results):
+    configs = [config for config, levels in results.items() if levels]
+    if len(configs) < 2:
+        return
+    reference = results[configs[0]][-1]
+    print(f"\nAt {reference['concurrency']} clients, relative to {configs[0]}:")
+    for config in configs[1:]:
+        top = results[config][-1]
+        gain = top["throughput"] / reference["throughput"] if reference["throughput"] else float("inf")
+        print(f"  {config}: {gain:.2f}x throughput, p99 {top['p99_ms']:.1f}ms vs {reference['p99_ms']:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test view:app under gunicorn against a PostgREST stand-in.")
+    parser.add_argument("--configs", default="sync:4,gthread:4x8",
+                        help="comma-separated <worker class>:<workers>[x<threads>]")
+    parser.add_argument("--concurrency", default="1,8,32,64", help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stand-in latency per query")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="extra random stand-in latency")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"request weights (default {DEFAULT_MIX})")
+    parser.add_argument("--users", type=int, default=20, help="synthetic users")
+    parser.add_argument("--items", type=int, default=200, help="items per user")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "wardrobe.sqlite")
+        print(f"Seeding {args.users} users x {args.items} items...")
+        users = seed(db_path, args.users, args.items, random.Random(args.seed))
+
+        standin, env = start_standin(db_path, args.latency_ms, args.jitter_ms)
+        results = {}
+        try:
+            for config in args.configs.split(","):
+                port = free_port()
+                server = start_gunicorn(config, port, env)
+                try:
+                    wait_for(f"http://127.0.0.1:{port}/login")
+                    levels = []
+                    for concurrency in (int(c) for c in args.concurrency.split(",")):
+                        levels.append(run_level(f"http://127.0.0.1:{port}", users, concurrency,
+                                                args.duration, args.mix, args.seed))
+                        print(f"{config} @ {concurrency}: {levels[-1]['throughput']:.1f} req/s", flush=True)
+                    results[config] = levels
+                finally:
+                    stop(server)
+        finally:
+            stop(standin)
+
+    for config, levels in results.items():
+        print_config(config, levels)
+    print_comparison(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
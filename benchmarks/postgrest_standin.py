@@ -0,0 +1,180 @@
+"""
+A local stand-in for the PostgREST API that supabase-py talks to, backed by
+models.backend.SQLiteBackend, with configurable latency per request.
+
+It understands the requests the app makes:
+    GET/HEAD /rest/v1/<table>?select=...&<col>=<op>.<value>&order=...&limit=...&offset=...
+    POST     /rest/v1/<table>            insert (upsert with Prefer: resolution=merge-duplicates)
+    PATCH    /rest/v1/<table>?<filters>  update
+    DELETE   /rest/v1/<table>?<filters>  delete
+    POST     /rest/v1/rpc/<function>
+Filters: eq, neq, gt, gte, lt, lte, in. Prefer: count=exact is answered
+with a Content-Range header. Embedded selects are refused with PGRST200,
+so the app takes its parallel per-table path, as with a database that has
+no relationships declared.
+
+Run from the repository root:
+    python -m benchmarks.postgrest_standin --db wardrobe.sqlite [--port 54321]
+                                           [--latency-ms 20] [--jitter-ms 5]
+Then point the app at it with SUPABASE_URL=http://127.0.0.1:54321.
+"""
+import argparse
+import json
+import random
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl
+
+from models.backend import SQLiteBackend
+
+FILTER_OPS = {"eq", "neq", "gt", "gte", "lt", "lte", "in"}
+# Query parameters that are not column filters
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+class PostgrestError(Exception):
+    def __init__(self, status, code, message):
+        super(PostgrestError, self).__init__(message)
+        self.status = status
+        self.code = code
+
+
+def parse_in_list(value):
+    """Parses a PostgREST in.(a,"b c",d) list."""
+    if not (value.startswith("(") and value.endswith(")")):
+        raise PostgrestError(400, "PGRST100", f"Malformed in list {value!r}")
+    values = []
+    for part in value[1:-1].split(","):
+        part = part.strip()
+        if len(part) >= 2 and part[0] == part[-1] == '"':
+            part = part[1:-1]
+        if part:
+            values.append(part)
+    return values
+
+
+def build_query(backend, method, table, params, prefer, body):
+    """Turns one PostgREST request into a SQLiteBackend query."""
+    query = backend.table(table)
+
+    if method in ("GET", "HEAD"):
+        select = params.get("select", "*")
+        if "(" in select:
+            raise PostgrestError(400, "PGRST200", f"Could not find a relationship for '{select}' in the schema cache")
+        query = query.select(select, count="exact" if "count=exact" in prefer else None, head=method == "HEAD")
+    elif method == "POST":
+        if "resolution=merge-duplicates" in prefer:
+            query = query.upsert(body, on_conflict=params.get("on_conflict"))
+        else:
+            query = query.insert(body)
+    elif method == "PATCH":
+        query = query.update(body)
+    elif method == "DELETE":
+        query = query.delete()
+    else:
+        raise PostgrestError(405, "PGRST117", f"Unsupported method {method}")
+
+    for column, value in params.items():
+        if column in RESERVED_PARAMS:
+            continue
+        op, _, operand = value.partition(".")
+        if op not in FILTER_OPS:
+            raise PostgrestError(400, "PGRST100", f"Unsupported filter {value!r}")
+        query = query.in_(column, parse_in_list(operand)) if op == "in" else getattr(query, op)(column, operand)
+
+    for part in filter(None, params.get("order", "").split(",")):
+        column, _, direction = part.partition(".")
+        query = query.order(column, desc=direction.startswith("desc"))
+    if "limit" in params:
+        offset = int(params.get("offset", 0))
+        query = query.range(offset, offset + int(params["limit"]) - 1)
+    return query
+
+
+def make_handler(backend, latency_ms, jitter_ms):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def handle_request(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+
+            # Simulated network + database time
+            delay = latency_ms + random.uniform(0, jitter_ms)
+            if delay > 0:
+                time.sleep(delay / 1e3)
+
+            url = urlsplit(self.path)
+            params = dict(parse_qsl(url.query, keep_blank_values=True))
+            prefer = self.headers.get("Prefer", "")
+            parts = [p for p in url.path.split("/") if p]
+            try:
+                if parts[:2] != ["rest", "v1"] or len(parts) < 3:
+                    raise PostgrestError(404, "PGRST125", f"Invalid path {url.path}")
+                body = json.loads(raw) if raw else None
+
+                if parts[2] == "rpc":
+                    function = parts[3] if len(parts) > 3 else ""
+                    data = backend.rpc(function, body or {}).execute().data
+                    return self.reply(200, data)
+
+                response = build_query(backend, self.command, parts[2], params, prefer, body).execute()
+                headers = {}
+                if response.count is not None:
+                    end = max(len(response.data) - 1, 0)
+                    headers["Content-Range"] = f"0-{end}/{response.count}"
+                if self.command in ("PATCH", "DELETE", "POST") and "return=representation" not in prefer:
+                    return self.reply(204, None, headers)
+                return self.reply(200, response.data, headers)
+            except PostgrestError as e:
+                self.reply(e.status, {"code": e.code, "message": str(e), "details": None, "hint": None})
+            except Exception as e:
+                self.reply(400, {"code": "PGRST100", "message": str(e), "details": None, "hint": None})
+
+        def reply(self, status, data, headers=None):
+            payload = b"" if data is None or self.command == "HEAD" else json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_HEAD = do_POST = do_PATCH = do_DELETE = handle_request
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(db_path, host="127.0.0.1", port=54321, latency_ms=0.0, jitter_ms=0.0):
+    """Creates (but does not start) the stand-in server; port 0 picks a free port."""
+    handler = make_handler(SQLiteBackend(db_path), latency_ms, jitter_ms)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a SQLite database through a PostgREST-like API.")
+    parser.add_argument("--db", required=True, help="SQLite database file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random delay of up to this much")
+    args = parser.parse_args()
+
+    server = serve(args.db, args.host, args.port, args.latency_ms, args.jitter_ms)
+    print(f"PostgREST stand-in on http://{args.host}:{server.server_port} "
+          f"({args.latency_ms:g}ms + up to {args.jitter_ms:g}ms per request)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
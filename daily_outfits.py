@@ -0,0 +1,131 @@
+"""
+Precomputes a daily outfit for every user.
+
+Users are streamed from the users table in pages (keyset pagination on
+user_id). Each page is split into chunks that are spread over a
+ProcessPoolExecutor; every worker loads each of its users' wardrobes once,
+generates and ranks an outfit, and writes the whole chunk back with a single
+upsert into daily_outfits. After each page the last user_id is written to a
+checkpoint file, so a crashed run resumes where it stopped (re-running a page
+is harmless because the upsert is keyed on user and date).
+
+The data backend comes from DATA_BACKEND like the web app; with
+DATA_BACKEND=sqlite, SQLITE_PATH must be a file so the workers share it.
+
+Usage:
+    python daily_outfits.py [--date YYYY-MM-DD] [--workers N] [--page-size N]
+                            [--chunk-size N] [--checkpoint PATH] [--reset]
+"""
+import argparse
+import datetime
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_USER_EMAIL = "DEFAULT_DEFAULT"
+
+
+def generate_chunk(user_ids, outfit_date):
+    """
+    Runs in a worker process: generates one outfit per user and writes the
+    chunk with one batched upsert. Returns (users done, outfits written, errors).
+    """
+    from models.outfits import outfit_repository
+    from models.pregen import generate_outfits
+
+    rows = []
+    errors = 0
+    for user_id in user_ids:
+        try:
+            outfits = generate_outfits(user_id, 1)
+        except Exception as e:
+            print(f"Error generating daily outfit for user {user_id}: {str(e)}")
+            errors += 1
+            continue
+        if outfits:
+            rows.append({
+                "user_id": user_id,
+                "outfit_date": outfit_date,
+                "item_ids": [item["item_id"] for item in outfits[0]]
+            })
+
+    outfit_repository.save_daily(rows)
+    return len(user_ids), len(rows), errors
+
+
+def stream_user_pages(users, page_size, after=None):
+    """Yields pages of user ids in user_id order, starting after the given id."""
+    while True:
+        page = users.page_ids(page_size, after, exclude_email=DEFAULT_USER_EMAIL)
+        if not page:
+            return
+        yield page
+        after = page[-1]
+
+
+def read_checkpoint(path, outfit_date):
+    """Returns the last user_id finished for outfit_date, or None."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        saved_date, _, last = f.read().strip().partition(" ")
+    if saved_date != outfit_date or not last:
+        return None
+    return int(last) if last.isdigit() else last
+
+
+def write_checkpoint(path, outfit_date, last_user_id):
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(f"{outfit_date} {last_user_id}\n")
+    os.replace(tmp, path)
+
+
+def chunked(values, size):
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute today's outfit for every user.")
+    parser.add_argument("--date", default=datetime.date.today().isoformat(), help="outfit date (default: today)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+    parser.add_argument("--page-size", type=int, default=1000, help="users fetched per page")
+    parser.add_argument("--chunk-size", type=int, default=50, help="users per worker task")
+    parser.add_argument("--checkpoint", default=".daily_outfits.checkpoint", help="resume file")
+    parser.add_argument("--reset", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    from models.auth import user_repository
+
+    after = None if args.reset else read_checkpoint(args.checkpoint, args.date)
+    if after is not None:
+        print(f"Resuming {args.date} after user {after}")
+
+    started = time.monotonic()
+    users = outfits = errors = 0
+
+    # Spawned (not forked) workers, so none inherits the parent's open HTTP connections
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as executor:
+        for page in stream_user_pages(user_repository, args.page_size, after):
+            futures = [executor.submit(generate_chunk, chunk, args.date) for chunk in chunked(page, args.chunk_size)]
+            for future in futures:
+                done, written, failed = future.result()
+                users += done
+                outfits += written
+                errors += failed
+
+            write_checkpoint(args.checkpoint, args.date, page[-1])
+
+            elapsed = max(time.monotonic() - started, 1e-6)
+            print(f"{users} users, {outfits} outfits, {errors} errors "
+                  f"in {elapsed:.1f}s ({users / elapsed:.1f} users/s)")
+
+    elapsed = time.monotonic() - started
+    print(f"Done: {users} users, {outfits} outfits, {errors} errors in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
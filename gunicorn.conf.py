@@ -0,0 +1,36 @@
+"""
+gunicorn settings for view:app (Procfile: gunicorn -c gunicorn.conf.py view:app).
+
+Requests spend most of their time waiting on Supabase, so the default is
+the threaded gthread worker: each process serves GUNICORN_THREADS requests
+at once and a slow query only holds up its own thread. Supported worker
+classes:
+    gthread  (default) WEB_CONCURRENCY processes x GUNICORN_THREADS threads
+    gevent   greenlets, GUNICORN_CONNECTIONS per process (pip install gevent)
+    sync     one request per process, for comparison in benchmarks/loadtest.py
+Every process creates its own supabase client and connection pool after the
+fork (supabase_client.get_supabase), so preloading the app is safe. With
+WARM_CACHES=True (read in view.py) each new worker fills its caches before
+taking requests (view.warm_up, called from post_worker_init below).
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+worker_connections = int(os.environ.get("GUNICORN_CONNECTIONS", 100))
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "False") == "True"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+
+def post_worker_init(worker):
+    # Runs in the worker after the app is loaded (so the import is free),
+    # before it accepts requests
+    from view import WARM_CACHES, warm_up
+    if WARM_CACHES:
+        warm_up()
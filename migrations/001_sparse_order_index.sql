@@ -0,0 +1,25 @@
+-- Re-space slots.order_index and attr_slots.order_index as sparse gap keys
+-- (1024, 2048, ...) so new rows can be placed between neighbours without
+-- shifting the rest. See models/ordering.py for the key scheme.
+
+BEGIN;
+
+UPDATE slots AS s
+SET order_index = ranked.rn * 1024
+FROM (
+    SELECT slot_id,
+           row_number() OVER (PARTITION BY user_id ORDER BY order_index, slot_id) AS rn
+    FROM slots
+) AS ranked
+WHERE s.slot_id = ranked.slot_id;
+
+UPDATE attr_slots AS a
+SET order_index = ranked.rn * 1024
+FROM (
+    SELECT attr_slot_id,
+           row_number() OVER (PARTITION BY slot_id ORDER BY order_index, attr_slot_id) AS rn
+    FROM attr_slots
+) AS ranked
+WHERE a.attr_slot_id = ranked.attr_slot_id;
+
+COMMIT;
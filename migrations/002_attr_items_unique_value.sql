@@ -0,0 +1,16 @@
+-- One value row per (item, attribute), so attribute edits can be written as a
+-- single upsert (see ItemRepository.save_values in models/items.py).
+
+BEGIN;
+
+-- Keep the most recent row where an item has duplicate values for an attribute
+DELETE FROM attr_items AS a
+USING attr_items AS b
+WHERE a.item_id = b.item_id
+  AND a.attr_id = b.attr_id
+  AND a.ctid < b.ctid;
+
+ALTER TABLE attr_items
+    ADD CONSTRAINT attr_items_item_attr_key UNIQUE (item_id, attr_id);
+
+COMMIT;
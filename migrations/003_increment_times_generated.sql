@@ -0,0 +1,13 @@
+-- Atomically bump times_generated for the items of a served outfit, so
+-- pre-generated outfits (whose item rows may be stale) never overwrite
+-- newer counts. Called from /outfits/generate via supabase.rpc.
+
+CREATE OR REPLACE FUNCTION increment_times_generated(p_user_id bigint, p_item_ids bigint[])
+RETURNS void
+LANGUAGE sql
+AS $$
+    UPDATE items
+    SET times_generated = times_generated + 1
+    WHERE user_id = p_user_id
+      AND item_id = ANY(p_item_ids);
+$$;
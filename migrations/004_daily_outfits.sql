@@ -0,0 +1,10 @@
+-- One precomputed outfit per user per day, written by daily_outfits.py.
+
+CREATE TABLE IF NOT EXISTS daily_outfits (
+    daily_outfit_id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    user_id bigint NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    outfit_date date NOT NULL,
+    item_ids bigint[] NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    UNIQUE (user_id, outfit_date)
+);
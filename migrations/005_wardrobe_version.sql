@@ -0,0 +1,15 @@
+-- A per-user counter bumped by every write to the user's wardrobe. The app
+-- uses it as the ETag of the /items and /wardrobe pages and as the key of
+-- its rendered-page cache. Called from view.py via supabase.rpc.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS wardrobe_version bigint NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION bump_wardrobe_version(p_user_id bigint)
+RETURNS bigint
+LANGUAGE sql
+AS $$
+    UPDATE users
+    SET wardrobe_version = wardrobe_version + 1
+    WHERE user_id = p_user_id
+    RETURNING wardrobe_version;
+$$;
@@ -0,0 +1,5 @@
+-- /items pages each slot's items by item_id (keyset pagination, see
+-- models/wardrobe.load_slot_page); this index answers every page with a
+-- range scan however far into the slot it starts.
+
+CREATE INDEX IF NOT EXISTS items_user_slot_item_idx ON items (user_id, slot_id, item_id);
@@ -0,0 +1,74 @@
+from models.backend import Repository
+
+
+class SlotRepository(Repository):
+    """A user's slots (Tops, Bottoms, ...)."""
+
+    def list_ordered(self, user_id):
+        """Returns the user's slots sorted by order_index."""
+        return self.table("slots").select("*").eq("user_id", user_id).order("order_index").execute().data
+
+    def create(self, user_id, slot_name, order_index):
+        """Inserts a slot and returns the new row."""
+        return self.table("slots").insert({
+            "user_id": user_id,
+            "slot_name": slot_name,
+            "order_index": order_index
+        }).execute().data[0]
+
+    def create_many(self, rows):
+        """Inserts several slots in one write; returns the new rows in the same order."""
+        return self.table("slots").insert(rows).execute().data
+
+    def rename(self, user_id, slot_id, slot_name):
+        """Renames a slot; returns the updated rows (empty if it does not exist)."""
+        return self.table("slots").update({"slot_name": slot_name}) \
+            .eq("slot_id", slot_id).eq("user_id", user_id).execute().data
+
+    def delete(self, user_id, slot_id):
+        """Deletes a slot (the database cascades to its items and attr_slots)."""
+        self.table("slots").delete().eq("slot_id", slot_id).eq("user_id", user_id).execute()
+
+
+class AttributeRepository(Repository):
+    """A user's attribute definitions and their attachment to slots (attr_slots)."""
+
+    def list_for_user(self, user_id):
+        """Returns every attribute definition of the user."""
+        return self.table("attributes").select("*").eq("user_id", user_id).execute().data
+
+    def create(self, user_id, attr_name, attr_type, possible_values, allow_multiple):
+        """Inserts an attribute definition and returns the new row."""
+        return self.table("attributes").insert({
+            "user_id": user_id,
+            "attr_name": attr_name,
+            "attr_type": attr_type,
+            "attr_possiblevals": possible_values,
+            "allow_multiple": allow_multiple
+        }).execute().data[0]
+
+    def create_many(self, rows):
+        """Inserts several attributes in one write; returns the new rows in the same order."""
+        return self.table("attributes").insert(rows).execute().data
+
+    def slot_links(self, user_id, slot_id):
+        """Returns a slot's attr_slots rows sorted by order_index."""
+        return self.table("attr_slots").select("*").eq("slot_id", slot_id).eq("user_id", user_id) \
+            .order("order_index").execute().data
+
+    def link(self, user_id, attr_id, slot_id, order_index):
+        """Attaches an attribute to a slot at order_index."""
+        return self.table("attr_slots").insert({
+            "user_id": user_id,
+            "attr_id": attr_id,
+            "slot_id": slot_id,
+            "order_index": order_index
+        }).execute().data[0]
+
+    def create_links(self, rows):
+        """Inserts several attr_slots rows in one write."""
+        return self.table("attr_slots").insert(rows).execute().data
+
+
+slot_repository = SlotRepository()
+attribute_repository = AttributeRepository()
@@ -0,0 +1,47 @@
+from models.backend import Repository
+
+
+class UserRepository(Repository):
+    """Accounts in the users table."""
+
+    def find_by_email(self, email, columns="*"):
+        """Returns the user row with this email, or None."""
+        rows = self.table("users").select(columns).eq("email", email).execute().data
+        return rows[0] if rows else None
+
+    def create(self, email, password_hash, first_name, last_name):
+        """Inserts a user and returns the new row."""
+        return self.table("users").insert({
+            "email": email,
+            "password_hash": password_hash,
+            "first_name": first_name,
+            "last_name": last_name
+        }).execute().data[0]
+
+    def wardrobe_version(self, user_id):
+        """Returns the user's wardrobe version (0 if the user does not exist)."""
+        rows = self.table("users").select("wardrobe_version").eq("user_id", user_id).execute().data
+        return (rows[0]["wardrobe_version"] or 0) if rows else 0
+
+    def bump_wardrobe_version(self, user_id):
+        """Atomically increments the user's wardrobe version and returns the new value."""
+        return self.backend.rpc("bump_wardrobe_version", {"p_user_id": user_id}).execute().data
+
+    def page_ids(self, page_size, after=None, exclude_email=None):
+        """Returns up to page_size user ids in user_id order, starting after the given id."""
+        query = self.table("users").select("user_id")
+        if exclude_email is not None:
+            query = query.neq("email", exclude_email)
+        if after is not None:
+            query = query.gt("user_id", after)
+        return [row["user_id"] for row in query.order("user_id").limit(page_size).execute().data]
+
+    def recent_ids(self, limit, exclude_email=None):
+        """Returns the ids of the limit most recently created users, newest first."""
+        query = self.table("users").select("user_id")
+        if exclude_email is not None:
+            query = query.neq("email", exclude_email)
+        return [row["user_id"] for row in query.order("user_id", desc=True).limit(limit).execute().data]
+
+
+user_repository = UserRepository()
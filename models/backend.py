@@ -0,0 +1,493 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+
+
+# "supabase" (default) or "sqlite"; SQLITE_PATH defaults to a private in-memory database
+DATA_BACKEND = os.environ.get("DATA_BACKEND", "supabase")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", ":memory:")
+
+
+class Response(object):
+    """Result of an executed query: the rows in data, plus count when one was asked for."""
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+# ==========================================================
+#                     SUPABASE BACKEND
+# ==========================================================
+
+class SupabaseBackend(object):
+    """
+    The hosted database, through the supabase client. table() and rpc()
+    return the client's own query builders.
+    """
+
+    supports_embedding = True
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is not None:
+            return self._client
+        # Imported lazily so the SQLite backend works without SUPABASE_URL set;
+        # get_supabase() hands each (forked) process its own client
+        from supabase_client import get_supabase
+        return get_supabase()
+
+    def table(self, name):
+        return self.client.table(name)
+
+    def rpc(self, name, params):
+        return self.client.rpc(name, params)
+
+
+# ==========================================================
+#                     SQLITE BACKEND
+# ==========================================================
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL UNIQUE,
+    password_hash TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    wardrobe_version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS slots (
+    slot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    slot_name TEXT NOT NULL,
+    order_index INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS attributes (
+    attr_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    attr_name TEXT NOT NULL,
+    attr_type TEXT,
+    attr_possiblevals TEXT,
+    allow_multiple INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS attr_slots (
+    attr_slot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    attr_id INTEGER NOT NULL REFERENCES attributes (attr_id) ON DELETE CASCADE,
+    slot_id INTEGER NOT NULL REFERENCES slots (slot_id) ON DELETE CASCADE,
+    order_index INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS items (
+    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    item_name TEXT NOT NULL,
+    slot_id INTEGER NOT NULL REFERENCES slots (slot_id) ON DELETE CASCADE,
+    times_generated INTEGER NOT NULL DEFAULT 0,
+    times_worn INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS attr_items (
+    attr_item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    attr_id INTEGER NOT NULL REFERENCES attributes (attr_id) ON DELETE CASCADE,
+    item_id INTEGER NOT NULL REFERENCES items (item_id) ON DELETE CASCADE,
+    value TEXT,
+    UNIQUE (item_id, attr_id)
+);
+CREATE TABLE IF NOT EXISTS rules (
+    rule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    rule_definition TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_outfits (
+    daily_outfit_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    outfit_date TEXT NOT NULL,
+    item_ids TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, outfit_date)
+);
+CREATE INDEX IF NOT EXISTS slots_user_idx ON slots (user_id);
+CREATE INDEX IF NOT EXISTS attributes_user_idx ON attributes (user_id);
+CREATE INDEX IF NOT EXISTS attr_slots_user_idx ON attr_slots (user_id);
+CREATE INDEX IF NOT EXISTS items_user_idx ON items (user_id);
+CREATE INDEX IF NOT EXISTS attr_items_user_idx ON attr_items (user_id);
+CREATE INDEX IF NOT EXISTS rules_user_idx ON rules (user_id);
+CREATE INDEX IF NOT EXISTS items_user_slot_item_idx ON items (user_id, slot_id, item_id);
+CREATE INDEX IF NOT EXISTS attr_items_user_item_idx ON attr_items (user_id, item_id);
+"""
+
+# Columns stored as JSON text / 0-1 integers in SQLite but lists / booleans in Postgres
+JSON_COLUMNS = {"attributes": {"attr_possiblevals"}, "daily_outfits": {"item_ids"}}
+BOOL_COLUMNS = {"attributes": {"allow_multiple"}}
+
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class SQLiteQuery(object):
+    """
+    The subset of the PostgREST query builder the app uses, compiled to SQL:
+    select (with count/head), insert, upsert, update and delete, filtered by
+    eq/neq/gt/gte/lt/lte/in_ and shaped by order/limit/range.
+    """
+
+    def __init__(self, backend, table):
+        self.backend = backend
+        self.table = table
+        self.action = "select"
+        self.columns = ["*"]
+        self.count = None
+        self.head = False
+        self.rows = None
+        self.on_conflict = None
+        self.filters = []
+        self.orders = []
+        self.limit_count = None
+        self.offset = None
+
+    # ------------------------------------------------------
+    # Actions
+    # ------------------------------------------------------
+
+    def select(self, columns="*", count=None, head=False):
+        if "(" in columns:
+            raise ValueError("Embedded selects are not supported by the SQLite backend")
+        self.columns = [c.strip() for c in columns.split(",") if c.strip()] or ["*"]
+        self.count = count
+        self.head = head
+        return self
+
+    def insert(self, rows):
+        self.action = "insert"
+        self.rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.action = "upsert"
+        self.rows = rows if isinstance(rows, list) else [rows]
+        self.on_conflict = on_conflict
+        return self
+
+    def update(self, values):
+        self.action = "update"
+        self.rows = [values]
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    # ------------------------------------------------------
+    # Filters and modifiers
+    # ------------------------------------------------------
+
+    def eq(self, column, value):
+        return self._filter(column, "=", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column, value):
+        return self._filter(column, ">", value)
+
+    def gte(self, column, value):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "<", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "<=", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "IN", list(values))
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def range(self, start, end):
+        self.offset = start
+        self.limit_count = end - start + 1
+        return self
+
+    def _filter(self, column, op, value):
+        self.filters.append((column, op, value))
+        return self
+
+    def execute(self):
+        return self.backend.execute(self)
+
+
+class SQLiteCall(object):
+    """A pending rpc() call; the functions live in SQLiteBackend.functions."""
+
+    def __init__(self, backend, name, params):
+        self.backend = backend
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        function = self.backend.functions.get(self.name)
+        if function is None:
+            raise ValueError(f"Unknown function {self.name!r}")
+        return Response(function(self.backend, **self.params))
+
+
+def _increment_times_generated(backend, p_user_id, p_item_ids):
+    # Same statement as migrations/003_increment_times_generated.sql
+    if p_item_ids:
+        marks = ", ".join("?" for _ in p_item_ids)
+        backend.run_sql(f"UPDATE items SET times_generated = times_generated + 1 "
+                        f"WHERE user_id = ? AND item_id IN ({marks})", [p_user_id] + list(p_item_ids))
+    return None
+
+
+def _bump_wardrobe_version(backend, p_user_id):
+    # Same statement as migrations/005_wardrobe_version.sql
+    rows = backend.run_sql("UPDATE users SET wardrobe_version = wardrobe_version + 1 "
+                           "WHERE user_id = ? RETURNING wardrobe_version", [p_user_id])
+    return rows[0][0] if rows else None
+
+
+class SQLiteBackend(object):
+    """
+    A local SQLite database with the same tables as the hosted one, for
+    running, profiling and testing the app with no network. The default
+    ":memory:" database is private to the process (and starts empty again
+    after a fork); pass a file path to share data between processes.
+
+    Embedded selects are not supported, so the loaders use their parallel
+    per-table path.
+    """
+
+    supports_embedding = False
+
+    functions = {
+        "increment_times_generated": _increment_times_generated,
+        "bump_wardrobe_version": _bump_wardrobe_version,
+    }
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._conn = None
+        self._pid = None
+        self._columns = {}
+        self._lock = threading.RLock()
+
+    def table(self, name):
+        if name not in self.columns_of_all():
+            raise ValueError(f"Unknown table {name!r}")
+        return SQLiteQuery(self, name)
+
+    def rpc(self, name, params):
+        return SQLiteCall(self, name, params)
+
+    # ------------------------------------------------------
+    # Connection
+    # ------------------------------------------------------
+
+    def connection(self):
+        pid = os.getpid()
+        if self._conn is None or self._pid != pid:
+            with self._lock:
+                if self._conn is None or self._pid != pid:
+                    conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                    conn.row_factory = sqlite3.Row
+                    conn.execute("PRAGMA foreign_keys = ON")
+                    conn.executescript(SQLITE_SCHEMA)
+                    self._columns = {
+                        name: [col[1] for col in conn.execute(f"PRAGMA table_info({name})")]
+                        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+                    }
+                    self._conn = conn
+                    self._pid = pid
+        return self._conn
+
+    def columns_of_all(self):
+        self.connection()
+        return self._columns
+
+    def run_sql(self, sql, params=()):
+        """Runs one statement and returns its rows (for functions and fixtures)."""
+        with self._lock:
+            return self.connection().execute(sql, params).fetchall()
+
+    # ------------------------------------------------------
+    # Query execution
+    # ------------------------------------------------------
+
+    def execute(self, query):
+        with self._lock:
+            conn = self.connection()
+            if query.action == "select":
+                return self._select(conn, query)
+
+            # Multi-row writes are all-or-nothing, like a single PostgREST request
+            conn.execute("BEGIN")
+            try:
+                if query.action in ("insert", "upsert"):
+                    rows = self._insert(conn, query)
+                elif query.action == "update":
+                    rows = self._update(conn, query)
+                else:
+                    rows = self._delete(conn, query)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return Response(rows)
+
+    def _select(self, conn, query):
+        where, params = self._where(query)
+        count = None
+        if query.count:
+            count = conn.execute(f"SELECT COUNT(*) FROM {query.table}{where}", params).fetchone()[0]
+        if query.head:
+            return Response([], count)
+
+        columns = ", ".join(self._column(query.table, c) if c != "*" else c for c in query.columns)
+        sql = f"SELECT {columns} FROM {query.table}{where}"
+        if query.orders:
+            sql += " ORDER BY " + ", ".join(
+                f"{self._column(query.table, c)}{' DESC' if desc else ''}" for c, desc in query.orders)
+        if query.limit_count is not None:
+            sql += " LIMIT ?"
+            params.append(query.limit_count)
+            if query.offset:
+                sql += " OFFSET ?"
+                params.append(query.offset)
+        return Response(self._decode_all(query.table, conn.execute(sql, params)), count)
+
+    def _insert(self, conn, query):
+        created = []
+        for row in query.rows:
+            columns = [self._column(query.table, c) for c in row]
+            sql = (f"INSERT INTO {query.table} ({', '.join(columns)}) "
+                   f"VALUES ({', '.join('?' for _ in columns)})")
+            if query.action == "upsert":
+                conflict = [self._column(query.table, c.strip())
+                            for c in (query.on_conflict or self._columns[query.table][0]).split(",")]
+                updates = [c for c in columns if c not in conflict]
+                sql += f" ON CONFLICT ({', '.join(conflict)}) DO "
+                sql += "UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in updates) if updates else "NOTHING"
+            sql += " RETURNING *"
+            created.extend(self._decode_all(query.table, conn.execute(sql, self._encode(query.table, row))))
+        return created
+
+    def _update(self, conn, query):
+        values = query.rows[0]
+        assignments = ", ".join(f"{self._column(query.table, c)} = ?" for c in values)
+        where, params = self._where(query)
+        sql = f"UPDATE {query.table} SET {assignments}{where} RETURNING *"
+        return self._decode_all(query.table, conn.execute(sql, self._encode(query.table, values) + params))
+
+    def _delete(self, conn, query):
+        where, params = self._where(query)
+        return self._decode_all(query.table, conn.execute(f"DELETE FROM {query.table}{where} RETURNING *", params))
+
+    def _where(self, query):
+        clauses = []
+        params = []
+        for column, op, value in query.filters:
+            column = self._column(query.table, column)
+            if op == "IN":
+                if not value:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{column} IN ({', '.join('?' for _ in value)})")
+                params.extend(value)
+            else:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _column(self, table, column):
+        # Column names are interpolated into SQL, so only real columns are accepted
+        if not _IDENTIFIER_RE.match(column) or column not in self._columns[table]:
+            raise ValueError(f"Unknown column {column!r} in table {table!r}")
+        return column
+
+    def _encode(self, table, row):
+        json_columns = JSON_COLUMNS.get(table, ())
+        return [json.dumps(value) if column in json_columns and value is not None else value
+                for column, value in row.items()]
+
+    def _decode_all(self, table, cursor):
+        json_columns = JSON_COLUMNS.get(table, ())
+        bool_columns = BOOL_COLUMNS.get(table, ())
+        rows = []
+        for record in cursor.fetchall():
+            row = dict(record)
+            for column in json_columns:
+                if row.get(column) is not None:
+                    row[column] = json.loads(row[column])
+            for column in bool_columns:
+                if column in row:
+                    row[column] = bool(row[column])
+            rows.append(row)
+        return rows
+
+
+# ==========================================================
+#                     BACKEND SELECTION
+# ==========================================================
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name=DATA_BACKEND):
+    """Creates the backend named by DATA_BACKEND ("supabase" or "sqlite")."""
+    if name == "sqlite":
+        return SQLiteBackend(SQLITE_PATH)
+    if name == "supabase":
+        return SupabaseBackend()
+    raise ValueError(f"Unknown DATA_BACKEND {name!r}")
+
+
+def get_backend():
+    """Returns the process-wide data backend, creating it on first use."""
+    global _backend
+
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """Replaces the process-wide backend (benchmarks and tests use a SQLiteBackend)."""
+    global _backend
+    _backend = backend
+
+
+# ==========================================================
+#                     REPOSITORIES
+# ==========================================================
+
+class Repository(object):
+    """
+    Base class of the data-access repositories in models/. A repository
+    uses the backend it was given, or the process-wide one at call time.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def table(self, name):
+        return self.backend.table(name)
@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    Small thread-safe LRU cache with a per-entry time-to-live.
+
+    Entries are evicted when the cache grows past maxsize (least recently used
+    first) or when they are older than ttl seconds. Hit, miss and eviction
+    counters are kept for monitoring.
+    """
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Returns the cached value for key, or default if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Stores value under key, evicting the least recently used entries if full."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Returns the cached value for key, calling loader() and caching it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        """Drops a single entry."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Returns the cache counters as a dict."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,94 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+QUERY_WORKERS = int(os.environ.get("QUERY_WORKERS", 8))
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the process-wide executor used for database reads.
+
+    The executor is created lazily and re-created when the pid changes, so a
+    gunicorn worker forked from a preloaded master never inherits the
+    master's (dead) threads.
+    """
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _executor_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="supabase-io")
+                _executor_pid = pid
+    return _executor
+
+
+def _reset_after_fork():
+    # A fork can happen while another thread holds the lock, and the
+    # parent's pool threads do not exist in the child
+    global _executor, _executor_pid, _executor_lock
+    _executor = None
+    _executor_pid = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def run_parallel(queries):
+    """
+    Executes independent queries concurrently.
+
+    Takes a dict of name -> query builder (anything with .execute()) or
+    zero-argument callable (e.g. a repository call) and returns a dict of
+    name -> response data / return value. If any query fails its
+    exception is re-raised here, exactly as if the queries had been run one
+    after another, so callers keep their existing error handling. Each
+    query runs in a copy of the caller's context, so per-request state held
+    in context variables (e.g. query metrics) follows it into the pool.
+    """
+    if len(queries) <= 1:
+        return {name: _run(query) for name, query in queries.items()}
+
+    executor = get_executor()
+    futures = {name: executor.submit(contextvars.copy_context().run, _run, query)
+               for name, query in queries.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def iter_parallel(queries):
+    """
+    Starts every query at once, like run_parallel, and returns an iterator
+    of (name, result) pairs in the order of queries, each available as soon
+    as its query finishes, so a caller can stream the first results while
+    later queries are still running. The queries must not call run_parallel
+    themselves: they already occupy the pool's threads.
+    """
+    executor = get_executor()
+    futures = [(name, executor.submit(contextvars.copy_context().run, _run, query))
+               for name, query in queries.items()]
+    return _in_order(futures)
+
+
+def _in_order(futures):
+    try:
+        for name, future in futures:
+            yield name, future.result()
+    finally:
+        # Stopped early (e.g. the client went away): drop what has not started
+        for _, future in futures:
+            future.cancel()
+
+
+def _run(query):
+    if hasattr(query, "execute"):
+        return query.execute().data
+    return query()
@@ -0,0 +1,197 @@
+import random
+
+
+# ==========================================================
+#                     CONSTRAINTS
+# ==========================================================
+
+class Constraint(object):
+    """
+    A condition on the items picked for a group of slots.
+
+    scope is the tuple of slot ids the condition looks at and check is a
+    function taking {slot_id: item} (covering at least the scope) and
+    returning True when the combination is allowed.
+    """
+
+    def __init__(self, scope, check):
+        self.scope = tuple(scope)
+        self.check = check
+
+    def __repr__(self):
+        return f"Constraint(scope={self.scope!r})"
+
+
+# ==========================================================
+#                     OUTFIT GENERATOR
+# ==========================================================
+
+class OutfitGenerator(object):
+    """
+    Builds valid outfits (one item per slot) by backtracking search.
+
+    Rather than enumerating the Cartesian product of every slot's items, the
+    generator
+      * filters each slot's items with its single-slot constraints,
+      * runs arc consistency (AC-3) over the two-slot constraints once, so
+        items that can never be part of a valid outfit are dropped up front,
+      * searches with forward checking: after choosing an item it prunes the
+        candidates of any slot that is now the last open slot of a
+        constraint, and backtracks as soon as a slot has none left,
+      * picks the slot with the fewest remaining candidates next.
+
+    Slots without items are left out of the outfit, as are constraints that
+    mention them.
+    """
+
+    def __init__(self, slots, slot_items, constraints=(), rng=None, max_steps=20000):
+        self.rng = rng or random.Random()
+        self.max_steps = max_steps
+
+        # Slot ids in order_index order, skipping empty slots
+        self.slot_ids = [slot["slot_id"] for slot in slots if slot_items.get(slot["slot_id"])]
+        self.items = {slot_id: list(slot_items[slot_id]) for slot_id in self.slot_ids}
+
+        active = set(self.slot_ids)
+        self.constraints = [c for c in constraints if c.scope and set(c.scope) <= active]
+        self.by_slot = {slot_id: [] for slot_id in self.slot_ids}
+        for constraint in self.constraints:
+            for slot_id in set(constraint.scope):
+                self.by_slot[slot_id].append(constraint)
+
+        # Candidate item positions per slot, narrowed by propagation
+        self.domains = {slot_id: list(range(len(self.items[slot_id]))) for slot_id in self.slot_ids}
+        self._node_consistency()
+        self._arc_consistency()
+
+    # ------------------------------------------------------
+    # Propagation
+    # ------------------------------------------------------
+
+    def _node_consistency(self):
+        for constraint in self.constraints:
+            if len(set(constraint.scope)) != 1:
+                continue
+            slot_id = constraint.scope[0]
+            items = self.items[slot_id]
+            self.domains[slot_id] = [i for i in self.domains[slot_id] if constraint.check({slot_id: items[i]})]
+
+    def _arc_consistency(self):
+        """AC-3 over the two-slot constraints."""
+        binary = [c for c in self.constraints if len(set(c.scope)) == 2]
+        arcs = [(x, y, c) for c in binary for x, y in (c.scope, c.scope[::-1])]
+        queue = list(arcs)
+
+        while queue:
+            x, y, constraint = queue.pop()
+            if self._revise(x, y, constraint):
+                if not self.domains[x]:
+                    return
+                queue.extend(arc for arc in arcs if arc[1] == x and arc[0] != y)
+
+    def _revise(self, x, y, constraint):
+        """Drops candidates of x that have no supporting candidate in y."""
+        x_items, y_items = self.items[x], self.items[y]
+        kept = []
+        for i in self.domains[x]:
+            assignment = {x: x_items[i]}
+            for j in self.domains[y]:
+                assignment[y] = y_items[j]
+                if constraint.check(assignment):
+                    kept.append(i)
+                    break
+        revised = len(kept) != len(self.domains[x])
+        self.domains[x] = kept
+        return revised
+
+    # ------------------------------------------------------
+    # Search
+    # ------------------------------------------------------
+
+    def generate(self, count=1):
+        """
+        Returns up to count distinct valid outfits. Each outfit is a list of
+        item rows in slot order. Fewer (possibly none) are returned if the
+        constraints do not allow that many.
+        """
+        if not self.slot_ids or any(not self.domains[s] for s in self.slot_ids):
+            return []
+
+        outfits = []
+        seen = set()
+        for _ in range(count * 4):
+            assignment = self._search()
+            if assignment is None:
+                break
+            key = tuple(assignment[slot_id] for slot_id in self.slot_ids)
+            if key in seen:
+                continue
+            seen.add(key)
+            outfits.append([self.items[slot_id][assignment[slot_id]] for slot_id in self.slot_ids])
+            if len(outfits) == count:
+                break
+        return outfits
+
+    def _search(self):
+        """One randomised backtracking run; returns {slot_id: item position} or None."""
+        domains = {slot_id: self.rng.sample(d, len(d)) for slot_id, d in self.domains.items()}
+        self._steps = 0
+        return self._backtrack({}, {}, domains)
+
+    def _backtrack(self, assignment, chosen, domains):
+        if len(assignment) == len(self.slot_ids):
+            return dict(assignment)
+
+        self._steps += 1
+        if self._steps > self.max_steps:
+            return None
+
+        # Most constrained slot first
+        slot_id = min((s for s in self.slot_ids if s not in assignment), key=lambda s: len(domains[s]))
+        items = self.items[slot_id]
+
+        for i in domains[slot_id]:
+            assignment[slot_id] = i
+            chosen[slot_id] = items[i]
+
+            pruned = self._forward_check(slot_id, chosen, domains)
+            if pruned is not None:
+                result = self._backtrack(assignment, chosen, pruned)
+                if result is not None:
+                    return result
+
+            del assignment[slot_id]
+            del chosen[slot_id]
+        return None
+
+    def _forward_check(self, slot_id, chosen, domains):
+        """
+        Checks the constraints touching slot_id after it was assigned. Returns
+        the narrowed domains, or None if the assignment cannot be completed.
+        """
+        narrowed = None
+        for constraint in self.by_slot[slot_id]:
+            open_slots = {s for s in constraint.scope if s not in chosen}
+
+            if not open_slots:
+                if not constraint.check(chosen):
+                    return None
+
+            elif len(open_slots) == 1:
+                other = open_slots.pop()
+                other_items = self.items[other]
+                current = (narrowed or domains)[other]
+                kept = []
+                for j in current:
+                    chosen[other] = other_items[j]
+                    if constraint.check(chosen):
+                        kept.append(j)
+                del chosen[other]
+                if not kept:
+                    return None
+                if len(kept) != len(current):
+                    if narrowed is None:
+                        narrowed = dict(domains)
+                    narrowed[other] = kept
+
+        return narrowed or domains
@@ -0,0 +1,78 @@
+from models.backend import Repository
+from models.concurrency import run_parallel
+
+
+class ItemRepository(Repository):
+    """A user's items and their attribute values (attr_items)."""
+
+    def create(self, user_id, item_name, slot_id):
+        """Inserts an item with zeroed counters and returns the new row."""
+        return self.table("items").insert({
+            "user_id": user_id,
+            "item_name": item_name,
+            "slot_id": slot_id,
+            "times_generated": 0,
+            "times_worn": 0
+        }).execute().data[0]
+
+    def create_many(self, rows):
+        """Inserts {user_id, item_name, slot_id} rows in one request; returns the new rows in order."""
+        if not rows:
+            return []
+        return self.table("items").insert([dict(row, times_generated=0, times_worn=0) for row in rows]) \
+            .execute().data
+
+    def rename(self, user_id, item_id, item_name):
+        """Renames an item; returns the updated rows (empty if it does not exist)."""
+        return self.table("items").update({"item_name": item_name}) \
+            .eq("item_id", item_id).eq("user_id", user_id).execute().data
+
+    def delete(self, user_id, item_id):
+        """Deletes an item (the database cascades to its attr_items)."""
+        self.table("items").delete().eq("item_id", item_id).eq("user_id", user_id).execute()
+
+    def delete_many(self, user_id, item_ids):
+        """Deletes several items in one request."""
+        if item_ids:
+            self.table("items").delete().eq("user_id", user_id).in_("item_id", list(item_ids)).execute()
+
+    def values(self, user_id, item_id):
+        """Returns an item's stored attribute values as {attr_id: value}."""
+        rows = self.table("attr_items").select("attr_id, value") \
+            .eq("item_id", item_id).eq("user_id", user_id).execute().data
+        return {ai["attr_id"]: ai["value"] for ai in rows}
+
+    def add_values(self, rows):
+        """Inserts {user_id, item_id, attr_id, value} rows of new items in one request."""
+        if rows:
+            self.table("attr_items").insert(rows).execute()
+
+    def save_values(self, user_id, item_id, values, stored=None):
+        """
+        Writes an item's attribute values as a diff against the stored ones.
+
+        New and changed values go out in a single upsert and cleared values in a
+        single delete (the two touch different rows, so they are sent together).
+        Unchanged values are not written at all, and an item is never left with
+        no attributes because of a half-finished rewrite.
+        """
+        stored = {str(attr_id): value for attr_id, value in (stored or {}).items()}
+
+        changed = [{
+            "user_id": user_id,
+            "attr_id": attr_id,
+            "item_id": item_id,
+            "value": value
+        } for attr_id, value in values.items() if stored.get(attr_id) != value]
+        removed = [attr_id for attr_id in stored if attr_id not in values]
+
+        writes = {}
+        if changed:
+            writes["upsert"] = self.table("attr_items").upsert(changed, on_conflict="item_id,attr_id")
+        if removed:
+            writes["delete"] = self.table("attr_items").delete() \
+                .eq("item_id", item_id).eq("user_id", user_id).in_("attr_id", removed)
+        run_parallel(writes)
+
+
+item_repository = ItemRepository()
@@ -0,0 +1,318 @@
+import contextvars
+import hmac
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+
+from flask import Response, g, request, before_render_template, template_rendered
+
+from models import pages, wardrobe
+from models.backend import get_backend, set_backend
+
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "True") == "True"
+# Requests slower than this are logged with their query list (0 = off)
+SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", 0))
+# /metrics requires "Authorization: Bearer <METRICS_TOKEN>"; without a token it
+# only answers requests from the machine itself
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+LOCAL_ADDRESSES = ("127.0.0.1", "::1")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+# name -> (type, help)
+METRICS = {
+    "wardrobe_http_requests_total": ("counter", "HTTP requests by route, method and status."),
+    "wardrobe_http_request_seconds": ("histogram", "Request latency by route."),
+    "wardrobe_request_db_queries": ("histogram", "Data-store queries per request by route."),
+    "wardrobe_template_render_seconds": ("histogram", "Template render time by template."),
+    "wardrobe_db_queries_total": ("counter", "Data-store queries by route, table and action."),
+    "wardrobe_db_rows_total": ("counter", "Rows returned by the data store by route and table."),
+    "wardrobe_db_seconds_total": ("counter", "Time spent in data-store queries by route and table."),
+    "wardrobe_cache_hits_total": ("counter", "In-process cache hits by cache."),
+    "wardrobe_cache_misses_total": ("counter", "In-process cache misses (including expired entries) by cache."),
+    "wardrobe_cache_evictions_total": ("counter", "In-process cache entries evicted for space by cache."),
+    "wardrobe_cache_entries": ("gauge", "Entries held by each in-process cache."),
+    "wardrobe_cache_max_entries": ("gauge", "Capacity of each in-process cache."),
+}
+
+# (stats key, metric) for the LRUCache counters exported on every scrape
+CACHE_METRICS = (
+    ("hits", "wardrobe_cache_hits_total"),
+    ("misses", "wardrobe_cache_misses_total"),
+    ("evictions", "wardrobe_cache_evictions_total"),
+    ("size", "wardrobe_cache_entries"),
+    ("maxsize", "wardrobe_cache_max_entries"),
+)
+
+
+# ==========================================================
+#                     REGISTRY
+# ==========================================================
+
+class MetricsRegistry(object):
+    """
+    In-process counters and histograms rendered in the Prometheus text
+    format. Every gunicorn worker keeps its own registry, so each scrape sees
+    the worker that answered it.
+    """
+
+    def __init__(self):
+        self.counters = defaultdict(float)     # (name, labels) -> value
+        self.histograms = {}                   # (name, labels) -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self.counters[(name, labels)] += value
+
+    def set(self, name, labels, value):
+        """Sets a gauge, or a counter kept elsewhere, to its current value."""
+        with self._lock:
+            self.counters[(name, labels)] = value
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        with self._lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = [buckets, [0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[1][i] += 1
+            histogram[2] += value
+            histogram[3] += 1
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in counters:
+                if metric == name:
+                    lines.append(f"{name}{_labels(labels)} {value:g}")
+            for (metric, labels), (buckets, counts, total, count) in histograms:
+                if metric != name:
+                    continue
+                for bound, bucket_count in zip(buckets, counts):
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {bucket_count}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {total:g}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+registry = MetricsRegistry()
+
+
+# ==========================================================
+#                     QUERY INSTRUMENTATION
+# ==========================================================
+
+class RequestStats(object):
+    """The queries and render time of one request."""
+
+    def __init__(self, route):
+        self.route = route
+        self.queries = []       # (table, action, rows, seconds)
+        self.render_seconds = 0.0
+
+
+# Set for the duration of a request; run_parallel copies it into its threads
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def _record_query(table, action, rows, seconds):
+    stats = _request_stats.get()
+    route = stats.route if stats else "background"
+    if stats:
+        stats.queries.append((table, action, rows, seconds))
+    registry.inc("wardrobe_db_queries_total", (("route", route), ("table", table), ("action", action)))
+    registry.inc("wardrobe_db_rows_total", (("route", route), ("table", table)), rows)
+    registry.inc("wardrobe_db_seconds_total", (("route", route), ("table", table)), seconds)
+
+
+class InstrumentedQuery(object):
+    """
+    Wraps a query builder of either backend. Chained calls are passed
+    through (and re-wrapped); execute() is timed and recorded.
+    """
+
+    def __init__(self, query, table, action=None):
+        self._query = query
+        self._table = table
+        self._action = action
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if hasattr(result, "execute"):
+                # The first builder method called on a table is the action
+                return InstrumentedQuery(result, self._table, self._action or name)
+            return result
+        return call
+
+    def execute(self):
+        started = time.perf_counter()
+        rows = 0
+        try:
+            response = self._query.execute()
+            rows = len(response.data) if isinstance(response.data, list) else 0
+            return response
+        finally:
+            _record_query(self._table, self._action or "select", rows, time.perf_counter() - started)
+
+
+class InstrumentedBackend(object):
+    """Data backend wrapper that records every query against the current request."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @property
+    def supports_embedding(self):
+        return self.backend.supports_embedding
+
+    def table(self, name):
+        return InstrumentedQuery(self.backend.table(name), name)
+
+    def rpc(self, name, params):
+        return InstrumentedQuery(self.backend.rpc(name, params), f"rpc:{name}", "call")
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+# ==========================================================
+#                     FLASK HOOKS
+# ==========================================================
+
+def init_metrics(app):
+    """
+    Instruments the data backend and registers the request hooks, template
+    render timing and the /metrics endpoint on app (which needs the
+    METRICS_TOKEN bearer token, or without one a local request). Does
+    nothing if METRICS_ENABLED is not "True".
+    """
+    if not METRICS_ENABLED:
+        return
+
+    if not isinstance(get_backend(), InstrumentedBackend):
+        set_backend(InstrumentedBackend(get_backend()))
+
+    @app.before_request
+    def _start_request():
+        rule = request.url_rule
+        g.metrics_started = time.perf_counter()
+        g.metrics_token = _request_stats.set(RequestStats(rule.rule if rule else "unmatched"))
+
+    @app.after_request
+    def _finish_request(response):
+        stats = _request_stats.get()
+        started = g.get("metrics_started")
+        if stats is None or started is None:
+            return response
+
+        # A streamed page is still running its queries here, so the request
+        # is recorded once the whole body has been sent
+        response.call_on_close(partial(_record_request, stats, started, request.method, request.path,
+                                       response.status_code))
+        return response
+
+    @app.teardown_request
+    def _end_request(exc):
+        token = g.pop("metrics_token", None)
+        if token is not None:
+            _request_stats.reset(token)
+
+    def _start_render(sender, template, context, **extra):
+        g.setdefault("metrics_renders", []).append(time.perf_counter())
+
+    def _end_render(sender, template, context, **extra):
+        renders = g.get("metrics_renders")
+        if not renders:
+            return
+        seconds = time.perf_counter() - renders.pop()
+        registry.observe("wardrobe_template_render_seconds", (("template", template.name or "string"),), seconds)
+        stats = _request_stats.get()
+        if stats:
+            stats.render_seconds += seconds
+
+    before_render_template.connect(_start_render, app, weak=False)
+    template_rendered.connect(_end_render, app, weak=False)
+
+    app.add_url_rule("/metrics", "metrics", _metrics_view)
+
+
+def _metrics_view():
+    if not _metrics_allowed():
+        return Response("Forbidden\n", status=403, mimetype="text/plain")
+    _collect_cache_stats()
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+def _collect_cache_stats():
+    caches = {
+        "schema": wardrobe.schema_cache,
+        "template": wardrobe.template_cache,
+        "rule": wardrobe.rule_cache,
+        "index": wardrobe.index_cache,
+        "version": pages.version_cache,
+        "page": pages.page_cache,
+        "fragment": pages.fragment_cache,
+    }
+    for name, cache in caches.items():
+        stats = cache.stats()
+        for key, metric in CACHE_METRICS:
+            registry.set(metric, (("cache", name),), stats[key])
+
+
+def _metrics_allowed():
+    if METRICS_TOKEN:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(token.strip(), METRICS_TOKEN)
+    return request.remote_addr in LOCAL_ADDRESSES
+
+
+def _record_request(stats, started, method, path, status):
+    seconds = time.perf_counter() - started
+    route = (("route", stats.route),)
+    registry.inc("wardrobe_http_requests_total", route + (("method", method), ("status", str(status))))
+    registry.observe("wardrobe_http_request_seconds", route, seconds)
+    registry.observe("wardrobe_request_db_queries", route, len(stats.queries), COUNT_BUCKETS)
+
+    if SLOW_REQUEST_MS and seconds * 1e3 >= SLOW_REQUEST_MS:
+        _log_slow_request(stats, seconds, method, path)
+
+
+def _log_slow_request(stats, seconds, method, path):
+    db_seconds = sum(q[3] for q in stats.queries)
+    print(f"Slow request {method} {path} ({stats.route}): {seconds * 1e3:.1f}ms, "
+          f"{len(stats.queries)} queries in {db_seconds * 1e3:.1f}ms, render {stats.render_seconds * 1e3:.1f}ms")
+    for table, action, rows, query_seconds in stats.queries:
+        print(f"    {table}.{action}: {rows} rows in {query_seconds * 1e3:.1f}ms")
@@ -0,0 +1,54 @@
+from models.backend import get_backend
+
+
+# order_index values are sparse keys rather than positions. New rows take a key
+# between their neighbours, so inserting or deleting touches a single row;
+# siblings are only re-spaced (in one batched write) once a gap is used up.
+ORDER_GAP = 1024
+
+
+def key_between(before, after):
+    """
+    Returns an integer key strictly between two neighbouring keys, or None if
+    they are adjacent. Either neighbour may be None (start / end of the list).
+    """
+    if before is None and after is None:
+        return ORDER_GAP
+    if after is None:
+        return before + ORDER_GAP
+    if before is None:
+        before = 0
+    if after - before > 1:
+        return (before + after) // 2
+    return None
+
+
+def spread_keys(count):
+    """Evenly spaced keys for count rows."""
+    return [(i + 1) * ORDER_GAP for i in range(count)]
+
+
+def order_index_for_insert(table, pk, siblings, position):
+    """
+    Returns the order_index for a new row displayed at position (0-based)
+    among siblings, which must be full rows sorted by order_index.
+
+    In the common case this only computes a key. If the neighbours are
+    adjacent, every sibling is re-spaced with a single upsert, leaving a hole
+    at position for the new row.
+    """
+    position = max(0, min(position, len(siblings)))
+    before = siblings[position - 1]["order_index"] if position > 0 else None
+    after = siblings[position]["order_index"] if position < len(siblings) else None
+
+    key = key_between(before, after)
+    if key is not None:
+        return key
+
+    keys = spread_keys(len(siblings) + 1)
+    key = keys.pop(position)
+    get_backend().table(table).upsert(
+        [dict(row, order_index=k) for row, k in zip(siblings, keys)],
+        on_conflict=pk
+    ).execute()
+    return key
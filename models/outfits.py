@@ -0,0 +1,26 @@
+from models.backend import Repository
+
+
+class OutfitRepository(Repository):
+    """Generated outfits: the daily_outfits table and the items' generation counts."""
+
+    def record_generated(self, user_id, item_ids):
+        """Counts one generation against every item of a served outfit (one atomic increment)."""
+        self.backend.rpc("increment_times_generated", {
+            "p_user_id": user_id,
+            "p_item_ids": list(item_ids)
+        }).execute()
+
+    def save_daily(self, rows):
+        """Writes {user_id, outfit_date, item_ids} rows, replacing any outfit already stored for that day."""
+        if rows:
+            self.table("daily_outfits").upsert(rows, on_conflict="user_id,outfit_date").execute()
+
+    def daily(self, user_id, outfit_date):
+        """Returns the item ids of a user's outfit for a date, or None."""
+        rows = self.table("daily_outfits").select("item_ids") \
+            .eq("user_id", user_id).eq("outfit_date", outfit_date).execute().data
+        return rows[0]["item_ids"] if rows else None
+
+
+outfit_repository = OutfitRepository()
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+from collections.abc import Iterator
+from functools import wraps
+
+from flask import g, request, session, make_response, render_template, get_flashed_messages
+from markupsafe import Markup
+
+from models.auth import user_repository
+from models.cache import LRUCache
+from models.wardrobe import sync_version
+
+
+# How long a worker trusts its copy of a user's wardrobe version. Writes made
+# through this worker are seen at once, and the writer's own session carries
+# the new version to every worker; other sessions on other workers see a
+# write once their worker's copy expires.
+WARDROBE_VERSION_TTL = int(os.environ.get("WARDROBE_VERSION_TTL", 5))
+PAGE_CACHE_SIZE = int(os.environ.get("PAGE_CACHE_SIZE", 512))
+PAGE_CACHE_TTL = int(os.environ.get("PAGE_CACHE_TTL", 600))
+FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", 4096))
+
+version_cache = LRUCache(maxsize=PAGE_CACHE_SIZE, ttl=WARDROBE_VERSION_TTL)
+
+# (user_id, page name) -> (etag, html)
+page_cache = LRUCache(maxsize=PAGE_CACHE_SIZE, ttl=PAGE_CACHE_TTL)
+
+# (template, user_id, key) -> (fingerprint of the render context, html)
+fragment_cache = LRUCache(maxsize=FRAGMENT_CACHE_SIZE, ttl=PAGE_CACHE_TTL)
+
+# Names of the pages served through versioned_page
+_pages = set()
+
+
+def fingerprint(value):
+    """Short stable hash of a JSON-like value."""
+    data = json.dumps(value, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# ==========================================================
+#                     WARDROBE VERSIONS
+# ==========================================================
+
+def _session_version(user_id):
+    # [user_id, version] of the last write made in this session
+    seen = session.get("wardrobe_version")
+    if seen and seen[0] == user_id:
+        return seen[1]
+    return None
+
+
+def current_version(user_id):
+    """
+    Returns the user's wardrobe version: this worker's cached copy, the
+    newer version this session wrote, or (when neither is known) the
+    users row. The user's cached schema, rules and search index are
+    dropped if they are older than it.
+    """
+    seen = _session_version(user_id)
+    version = version_cache.get(user_id)
+    if version is None:
+        version = max(user_repository.wardrobe_version(user_id), seen or 0)
+        version_cache.set(user_id, version)
+    elif seen is not None and seen > version:
+        version = seen
+        version_cache.set(user_id, version)
+    sync_version(user_id, version)
+    return version
+
+
+def bump_version(user_id):
+    """
+    Marks the user's wardrobe as changed: increments the stored version and
+    records the new one in this worker and in the session. Call it after
+    every write that changes what the wardrobe pages show.
+    """
+    try:
+        version = user_repository.bump_wardrobe_version(user_id)
+    except Exception as e:
+        print(f"Error bumping wardrobe version: {str(e)}")
+        version = None
+
+    if version is None:
+        # At least drop this worker's copies
+        version_cache.invalidate(user_id)
+        for name in _pages:
+            page_cache.invalidate((user_id, name))
+        return None
+
+    version_cache.set(user_id, version)
+    sync_version(user_id, version, written=True)
+    session["wardrobe_version"] = [user_id, version]
+    return version
+
+
+# ==========================================================
+#                     PAGE CACHE
+# ==========================================================
+
+def versioned_page(name):
+    """
+    Decorates a read-only page view of the logged-in user's wardrobe.
+
+    The page's ETag is derived from the wardrobe version, so a browser
+    revalidating an unchanged page gets a 304, and a changed version is the
+    only thing that makes the view run again: until then the rendered HTML
+    is served from page_cache with no data-store calls. Pages carrying flash
+    messages, or rendered while the version could not be read, are always
+    rendered and never cached. A streamed page is passed
+    through as it is produced and cached once all of it has been sent,
+    unless the view set g.page_incomplete.
+    """
+    def decorator(view):
+        _pages.add(name)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = session.get("user_id")
+            if user_id is None or session.get("_flashes"):
+                return view(*args, **kwargs)
+
+            try:
+                version = current_version(user_id)
+            except Exception as e:
+                # Without a version there is no ETag to trust; serve the page uncached
+                print(f"Error reading wardrobe version: {str(e)}")
+                return view(*args, **kwargs)
+            # The layout shows the session's email, so it is part of the page too
+            etag = f"{name}-{user_id}-{version}-{fingerprint(session.get('email'))[:8]}"
+
+            if request.if_none_match.contains(etag):
+                response = make_response("", 304)
+            else:
+                cached = page_cache.get((user_id, name))
+                if cached and cached[0] == etag:
+                    response = make_response(cached[1])
+                else:
+                    result = view(*args, **kwargs)
+                    if isinstance(result, Iterator):
+                        # A streamed page (stream_template)
+                        response = make_response(_cache_stream(result, (user_id, name), etag,
+                                                               g._get_current_object()))
+                    # Redirects pass through; error pages (flashed) are not cached
+                    elif not isinstance(result, str) or get_flashed_messages():
+                        return result
+                    else:
+                        page_cache.set((user_id, name), (etag, result))
+                        response = make_response(result)
+
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+        return wrapper
+    return decorator
+
+
+def _cache_stream(chunks, key, etag, request_globals):
+    # Yields the page through, caching it only if the client received all of it
+    parts = []
+    try:
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        if not request_globals.get("page_incomplete"):
+            page_cache.set(key, (etag, "".join(parts)))
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def render_fragment(template, user_id, key, context):
+    """
+    Renders one fragment of a page as Markup. If the context has the same
+    fingerprint as when this (template, user, key) was last rendered, that
+    HTML is reused, so a page made of fragments only re-renders the ones
+    whose data changed.
+    """
+    digest = fingerprint(context)
+    cached = fragment_cache.get((template, user_id, key))
+    if cached and cached[0] == digest:
+        return Markup(cached[1])
+    html = render_template(template, **context)
+    fragment_cache.set((template, user_id, key), (digest, html))
+    return Markup(html)
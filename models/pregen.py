@@ -0,0 +1,313 @@
+import os
+import queue
+import threading
+from collections import OrderedDict, defaultdict, deque
+
+from models.generator import OutfitGenerator
+from models.scoring import OutfitScorer
+from models.wardrobe import assemble_items_page, load_wardrobe, load_rules, get_rules
+
+
+# Valid outfits generated per refill before ranking
+OUTFIT_CANDIDATES = int(os.environ.get("OUTFIT_CANDIDATES", 50))
+
+OUTFIT_POOL_SIZE = int(os.environ.get("OUTFIT_POOL_SIZE", 10))
+OUTFIT_POOL_LOW_WATER = int(os.environ.get("OUTFIT_POOL_LOW_WATER", 3))
+OUTFIT_POOL_USERS = int(os.environ.get("OUTFIT_POOL_USERS", 256))
+
+
+def generate_outfits(user_id, count):
+    """
+    Generates up to count valid outfits for a user, best-ranked first. Each
+    outfit is a list of item rows (with attr_values) in slot order. The
+    wardrobe is read once and the rules are compiled against its rows, so
+    this costs one wardrobe read and one rules read.
+    """
+    wardrobe = load_wardrobe(user_id)
+    slots = wardrobe["slots"]
+    slot_attrs, slot_items = assemble_items_page(
+        slots, wardrobe["attributes"], wardrobe["attr_slots"], wardrobe["items"], wardrobe["attr_items"])
+
+    rules = load_rules(user_id, slots, slot_attrs, wardrobe["attributes"])
+    constraints = [rule.to_constraint() for rule in rules]
+    generator = OutfitGenerator(slots, slot_items, constraints)
+    candidates = generator.generate(max(OUTFIT_CANDIDATES, count))
+
+    scorer = OutfitScorer(generator.slot_ids, slot_items, wardrobe["attributes"])
+    return scorer.rank(candidates, count)
+
+
+# ==========================================================
+#                     OUTFIT POOL
+# ==========================================================
+
+class _UserQueue(object):
+    """
+    Pre-generated outfits for one user, indexed by the items they contain,
+    plus the wardrobe version they were built for and a generation counter
+    for invalidation.
+    """
+
+    def __init__(self):
+        self.outfits = deque()
+        self.by_item = defaultdict(list)    # str(item_id) -> queued outfits containing it
+        self.version = None                 # wardrobe version of the queued outfits
+        self.generation = 0
+
+    def push(self, outfit):
+        self.outfits.append(outfit)
+        for item in outfit:
+            self.by_item[str(item["item_id"])].append(outfit)
+
+    def pop(self):
+        outfit = self.outfits.popleft()
+        self._unindex(outfit)
+        return outfit
+
+    def discard(self, outfit):
+        for i, queued in enumerate(self.outfits):
+            if queued is outfit:
+                del self.outfits[i]
+                self._unindex(outfit)
+                return
+
+    def clear(self):
+        self.outfits.clear()
+        self.by_item.clear()
+
+    def _unindex(self, outfit):
+        for item in outfit:
+            key = str(item["item_id"])
+            remaining = [o for o in self.by_item.get(key, ()) if o is not outfit]
+            if remaining:
+                self.by_item[key] = remaining
+            else:
+                self.by_item.pop(key, None)
+
+
+class OutfitPool(object):
+    """
+    Bounded per-user queues of pre-generated outfits, refilled in the
+    background.
+
+    take() is just a dequeue. When a queue drops to low_water a refill is
+    scheduled on a daemon thread, which calls build(user_id, count) outside
+    the request. An empty queue is not refilled by take(): the caller builds
+    outfits itself and hands the spare ones to fill(), so they are not built
+    twice. invalidate() empties a user's queue after a wardrobe change; a
+    refill that was already running for the old wardrobe is discarded. Only
+    the max_users most recently active users keep a queue.
+
+    Each gunicorn worker has its own pool and only sees the writes it
+    handles, so a queue is also tagged with the wardrobe version
+    (models.pages) it was built for: take() drops it when the caller's
+    version is newer, i.e. after a write made through another worker. The
+    write methods take the version the write produced, so the queues they
+    update in place stay current.
+
+    Single-item changes do not throw the queue away: item_changed() only
+    re-checks the queued outfits containing that item, and only against the
+    rules (from rules(user_id)) that read a changed attribute of its slot;
+    item_removed() drops just the outfits containing the item.
+
+    The worker thread is started lazily and restarted if the pid changes, so
+    every gunicorn worker runs its own refill thread.
+    """
+
+    def __init__(self, build, rules, size=OUTFIT_POOL_SIZE, low_water=OUTFIT_POOL_LOW_WATER,
+                 max_users=OUTFIT_POOL_USERS):
+        self.build = build
+        self.rules = rules
+        self.size = size
+        self.low_water = low_water
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._pending = set()
+        self._requests = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def take(self, user_id, version=None):
+        """
+        Returns the next pre-generated outfit for a user's wardrobe version,
+        or None if none is ready (then no refill is scheduled; see fill()).
+        """
+        with self._lock:
+            user = self._user(user_id)
+            self._check_version(user, version)
+            if not user.outfits:
+                return None
+            outfit = user.pop()
+            needs_refill = len(user.outfits) <= self.low_water
+        if needs_refill:
+            self.refill(user_id)
+        return outfit
+
+    def fill(self, user_id, outfits, version=None):
+        """Queues outfits the caller built for a user's wardrobe version, up to size."""
+        with self._lock:
+            user = self._user(user_id)
+            self._check_version(user, version)
+            if version is not None and user.version != version:
+                # Built from an older wardrobe than the queue's
+                return
+            for outfit in outfits[:self.size - len(user.outfits)]:
+                user.push(outfit)
+
+    def refill(self, user_id):
+        """Schedules a background refill for a user (no-op if one is already queued)."""
+        with self._lock:
+            if user_id in self._pending:
+                return
+            self._pending.add(user_id)
+        self._ensure_worker()
+        self._requests.put(user_id)
+
+    def invalidate(self, user_id):
+        """Drops a user's queued outfits after their items, slots or rules changed."""
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return
+            user.clear()
+            user.generation += 1
+
+    def item_changed(self, user_id, item_id, item_name, values, version=None):
+        """
+        Applies an edit of one item (new name and {attr_id: value}) to the
+        queued outfits containing it, dropping those that now break a rule.
+        version is the wardrobe version after the edit.
+        """
+        key = str(item_id)
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return
+            # A refill in progress was built from the old values
+            user.generation += 1
+            self._advance_version(user, version)
+            if key not in user.by_item:
+                return
+
+        rules = self.rules(user_id)
+
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return
+            outfits = list(user.by_item.get(key, ()))
+
+            # Outfits from the same refill share item rows, so update each row once
+            changed_by_row = {}
+            for outfit in outfits:
+                item = next(i for i in outfit if str(i["item_id"]) == key)
+                if id(item) in changed_by_row:
+                    continue
+                old = item["attr_values"]
+
+                # Form values are keyed by string ids; map them back to the stored keys
+                keys = {str(k): k for k in old}
+                keys.update({str(a): a for rule in rules for a in rule.attr_ids})
+                new = {keys.get(str(k), k): v for k, v in values.items()}
+                changed_by_row[id(item)] = {k for k in set(old) | set(new) if old.get(k) != new.get(k)}
+
+                item["item_name"] = item_name
+                item["attr_values"] = new
+
+            # Re-check only the rules that read a changed attribute of this slot
+            for outfit in outfits:
+                item = next(i for i in outfit if str(i["item_id"]) == key)
+                assignment = {i["slot_id"]: i for i in outfit}
+                affected = [rule for rule in rules if rule.depends_on(item["slot_id"], changed_by_row[id(item)])
+                            and all(s in assignment for s in rule.slot_ids)]
+                if not all(rule.check(assignment) for rule in affected):
+                    user.discard(outfit)
+            needs_refill = len(user.outfits) <= self.low_water
+        if needs_refill:
+            self.refill(user_id)
+
+    def item_removed(self, user_id, item_id, version=None):
+        """Drops the queued outfits containing a deleted item (version is the one after the delete)."""
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return
+            user.generation += 1
+            self._advance_version(user, version)
+            for outfit in list(user.by_item.get(str(item_id), ())):
+                user.discard(outfit)
+            needs_refill = len(user.outfits) <= self.low_water
+        if needs_refill:
+            self.refill(user_id)
+
+    def size_of(self, user_id):
+        """Returns how many outfits are queued for a user."""
+        with self._lock:
+            user = self._users.get(user_id)
+            return len(user.outfits) if user else 0
+
+    def _check_version(self, user, version):
+        # A newer version means a write this pool did not see: drop the queue
+        if version is None:
+            return
+        if user.version is not None and version > user.version:
+            user.clear()
+            user.generation += 1
+        if user.version is None or version > user.version:
+            user.version = version
+
+    def _advance_version(self, user, version):
+        # The queue is about to be updated in place for the write that made
+        # version; that only brings it up to date if it was current just before
+        if version is None:
+            return
+        if user.version != version - 1:
+            user.clear()
+        user.version = version
+
+    def _user(self, user_id):
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserQueue()
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+        return user
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+                return
+            if self._pid != pid:
+                # Forked: the parent's queue and pending set are meaningless here
+                self._requests = queue.Queue()
+                self._pending.clear()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="outfit-pool", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            user_id = self._requests.get()
+            with self._lock:
+                user = self._users.get(user_id)
+                generation = user.generation if user else None
+                missing = self.size - len(user.outfits) if user else 0
+            try:
+                if user is not None and missing > 0:
+                    outfits = self.build(user_id, missing)
+                    with self._lock:
+                        # Discard the batch if the wardrobe changed while building it
+                        if self._users.get(user_id) is user and user.generation == generation:
+                            for outfit in outfits[:self.size - len(user.outfits)]:
+                                user.push(outfit)
+            except Exception as e:
+                print(f"Error pre-generating outfits for user {user_id}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._pending.discard(user_id)
+
+
+outfit_pool = OutfitPool(generate_outfits, get_rules)
@@ -0,0 +1,315 @@
+import re
+from models.generator import Constraint
+
+
+# ==========================================================
+#                     RULE LANGUAGE
+# ==========================================================
+#
+#   rule        := "if" expr "then" expr | expr
+#   expr        := and_expr ("or" and_expr)*
+#   and_expr    := not_expr ("and" not_expr)*
+#   not_expr    := "not" not_expr | "(" expr ")" | comparison
+#   comparison  := ref ("=" | "==" | "!=") (value | ref)
+#                | ref ["not"] "in" "{" value ("," value)* "}"
+#   ref         := name "." name          -- slot.attribute
+#   name/value  := word | "quoted string"
+#
+# Examples:
+#   if top.color = red then bottom.color != red
+#   shoes.color = belt.color
+#   if "Outer Wear".season in {summer, spring} then not top.material = wool
+#
+# Names and values are case-insensitive. For attributes that allow multiple
+# values, a stored "red, blue" is treated as the set {red, blue}: "=" means
+# "contains" and "in" means "shares a value with".
+
+KEYWORDS = {"if", "then", "and", "or", "not", "in"}
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<string>"[^"]*"|'[^']*')
+      | (?P<op>==|!=|=|\(|\)|\{|\}|,|\.)
+      | (?P<word>[^\s"'=!(){},.]+)
+    )""", re.VERBOSE)
+
+
+class RuleSyntaxError(ValueError):
+    """Raised when a rule definition cannot be parsed or refers to unknown slots/attributes."""
+
+
+def tokenize(text):
+    """Splits a rule definition into (kind, value) tokens."""
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise RuleSyntaxError(f"Unexpected character {text[pos]!r} at position {pos}")
+        pos = match.end()
+        if match.group("string") is not None:
+            tokens.append(("name", match.group("string")[1:-1]))
+        elif match.group("op") is not None:
+            tokens.append(("op", match.group("op")))
+        else:
+            word = match.group("word")
+            if word.lower() in KEYWORDS:
+                tokens.append(("kw", word.lower()))
+            else:
+                tokens.append(("name", word))
+    return tokens
+
+
+class _Parser(object):
+    """Recursive-descent parser producing a small tuple-based syntax tree."""
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self, kind=None, value=None):
+        if self.pos >= len(self.tokens):
+            return None
+        token = self.tokens[self.pos]
+        if kind and token[0] != kind:
+            return None
+        if value and token[1] != value:
+            return None
+        return token
+
+    def take(self, kind=None, value=None):
+        token = self.peek(kind, value)
+        if token is None:
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "end of rule"
+            raise RuleSyntaxError(f"Expected {value or kind}, found {found!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if self.peek("kw", "if"):
+            self.take()
+            condition = self.expr()
+            self.take("kw", "then")
+            tree = ("or", ("not", condition), self.expr())
+        else:
+            tree = self.expr()
+        if self.pos != len(self.tokens):
+            raise RuleSyntaxError(f"Unexpected {self.tokens[self.pos][1]!r}")
+        return tree
+
+    def expr(self):
+        node = self.and_expr()
+        while self.peek("kw", "or"):
+            self.take()
+            node = ("or", node, self.and_expr())
+        return node
+
+    def and_expr(self):
+        node = self.not_expr()
+        while self.peek("kw", "and"):
+            self.take()
+            node = ("and", node, self.not_expr())
+        return node
+
+    def not_expr(self):
+        if self.peek("kw", "not"):
+            self.take()
+            return ("not", self.not_expr())
+        if self.peek("op", "("):
+            self.take()
+            node = self.expr()
+            self.take("op", ")")
+            return node
+        return self.comparison()
+
+    def ref(self):
+        slot = self.take("name")[1]
+        self.take("op", ".")
+        attr = self.take("name")[1]
+        return ("ref", slot, attr)
+
+    def comparison(self):
+        left = self.ref()
+
+        if self.peek("kw", "not") or self.peek("kw", "in"):
+            negate = bool(self.peek("kw", "not"))
+            if negate:
+                self.take()
+            self.take("kw", "in")
+            self.take("op", "{")
+            values = [self.take("name")[1]]
+            while self.peek("op", ","):
+                self.take()
+                values.append(self.take("name")[1])
+            self.take("op", "}")
+            node = ("in", left, values)
+            return ("not", node) if negate else node
+
+        op = self.peek("op")
+        if op is None or op[1] not in ("=", "==", "!="):
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "end of rule"
+            raise RuleSyntaxError(f"Expected =, != or in after {left[1]}.{left[2]}, found {found!r}")
+        op = self.take()[1]
+        value = self.take("name")[1]
+        if self.peek("op", "."):
+            self.take()
+            right = ("ref", value, self.take("name")[1])
+        else:
+            right = ("value", value)
+        node = ("eq", left, right)
+        return ("not", node) if op == "!=" else node
+
+
+def parse_rule(text):
+    """Parses a rule definition into a syntax tree, raising RuleSyntaxError if invalid."""
+    return _Parser(text).parse()
+
+
+# ==========================================================
+#                     COMPILER
+# ==========================================================
+
+class CompiledRule(object):
+    """
+    A rule turned into a predicate over an outfit.
+
+    check takes {slot_id: item} where each item carries attr_values and
+    returns True if the outfit satisfies the rule. slot_ids and attr_ids are
+    the slots and attributes the rule reads.
+    """
+
+    def __init__(self, definition, check, slot_ids, attr_ids):
+        self.definition = definition
+        self.check = check
+        self.slot_ids = tuple(slot_ids)
+        self.attr_ids = frozenset(attr_ids)
+
+    def depends_on(self, slot_id, attr_ids):
+        """True if the rule reads any of attr_ids on the given slot."""
+        return slot_id in self.slot_ids and not self.attr_ids.isdisjoint(attr_ids)
+
+    def to_constraint(self):
+        """Wraps the rule as a generator Constraint."""
+        return Constraint(self.slot_ids, self.check)
+
+    def __repr__(self):
+        return f"CompiledRule({self.definition!r})"
+
+
+def _norm(value):
+    return str(value).strip().lower()
+
+
+class _Resolver(object):
+    """Looks up slot.attribute names against a user's schema."""
+
+    def __init__(self, slots, slot_attrs, attributes):
+        self.slots = {_norm(slot["slot_name"]): slot for slot in slots}
+        self.slot_attrs = slot_attrs
+        self.attributes = {}
+        for attr in attributes:
+            self.attributes.setdefault(_norm(attr["attr_name"]), attr)
+        self.slot_ids = []
+        self.attr_ids = set()
+
+    def resolve(self, slot_name, attr_name):
+        slot = self.slots.get(_norm(slot_name))
+        if slot is None:
+            raise RuleSyntaxError(f"Unknown slot {slot_name!r}")
+
+        # Prefer the attribute attached to this slot, then any attribute by that name
+        attr = next((a for a in self.slot_attrs.get(slot["slot_id"], [])
+                     if _norm(a["attr_name"]) == _norm(attr_name)), None)
+        attr = attr or self.attributes.get(_norm(attr_name))
+        if attr is None:
+            raise RuleSyntaxError(f"Unknown attribute {attr_name!r} for slot {slot['slot_name']!r}")
+
+        if slot["slot_id"] not in self.slot_ids:
+            self.slot_ids.append(slot["slot_id"])
+        self.attr_ids.add(attr["attr_id"])
+        return slot["slot_id"], attr["attr_id"], bool(attr.get("allow_multiple"))
+
+
+def _reader(slot_id, attr_id, multiple):
+    """Returns a function reading one attribute of one slot's item as a set of normalised values."""
+    if multiple:
+        def read(outfit):
+            value = outfit[slot_id]["attr_values"].get(attr_id)
+            if value is None:
+                return frozenset()
+            return frozenset(v for v in (_norm(p) for p in str(value).split(",")) if v)
+    else:
+        def read(outfit):
+            value = outfit[slot_id]["attr_values"].get(attr_id)
+            return frozenset() if value is None else frozenset((_norm(value),))
+    return read
+
+
+def _compile_node(node, resolver):
+    kind = node[0]
+
+    if kind == "and":
+        left, right = _compile_node(node[1], resolver), _compile_node(node[2], resolver)
+        return lambda outfit: left(outfit) and right(outfit)
+
+    if kind == "or":
+        left, right = _compile_node(node[1], resolver), _compile_node(node[2], resolver)
+        return lambda outfit: left(outfit) or right(outfit)
+
+    if kind == "not":
+        inner = _compile_node(node[1], resolver)
+        return lambda outfit: not inner(outfit)
+
+    if kind == "in":
+        read = _reader(*resolver.resolve(node[1][1], node[1][2]))
+        wanted = frozenset(_norm(v) for v in node[2])
+        return lambda outfit: not wanted.isdisjoint(read(outfit))
+
+    if kind == "eq":
+        slot_id, attr_id, multiple = resolver.resolve(node[1][1], node[1][2])
+        right = node[2]
+
+        if right[0] == "ref":
+            read_left = _reader(slot_id, attr_id, multiple)
+            read_right = _reader(*resolver.resolve(right[1], right[2]))
+            return lambda outfit: not read_left(outfit).isdisjoint(read_right(outfit))
+
+        wanted = _norm(right[1])
+        if multiple:
+            read = _reader(slot_id, attr_id, multiple)
+            return lambda outfit: wanted in read(outfit)
+
+        # Fast path for the common single-valued comparison
+        def check(outfit):
+            value = outfit[slot_id]["attr_values"].get(attr_id)
+            return value is not None and _norm(value) == wanted
+        return check
+
+    raise RuleSyntaxError(f"Unknown expression {kind!r}")
+
+
+def compile_rule(definition, slots, slot_attrs, attributes):
+    """
+    Compiles one rule definition against a user's schema (slots in order,
+    slot_id -> attributes, and all attributes). Raises RuleSyntaxError if the
+    rule is invalid or names an unknown slot or attribute.
+    """
+    tree = parse_rule(definition)
+    resolver = _Resolver(slots, slot_attrs, attributes)
+    check = _compile_node(tree, resolver)
+    return CompiledRule(definition, check, resolver.slot_ids, resolver.attr_ids)
+
+
+def compile_rules(definitions, slots, slot_attrs, attributes):
+    """
+    Compiles every definition that is valid; invalid ones are logged and
+    skipped so a single bad rule cannot block outfit generation.
+    """
+    compiled = []
+    for definition in definitions:
+        try:
+            compiled.append(compile_rule(definition, slots, slot_attrs, attributes))
+        except RuleSyntaxError as e:
+            print(f"Skipping invalid rule {definition!r}: {str(e)}")
+    return compiled
@@ -0,0 +1,23 @@
+from models.backend import Repository
+
+
+class RuleRepository(Repository):
+    """A user's rule definitions (compiled and cached by models.wardrobe.get_rules)."""
+
+    def list_for_user(self, user_id, columns="*"):
+        """Returns the user's rule rows."""
+        return self.table("rules").select(columns).eq("user_id", user_id).execute().data
+
+    def create(self, user_id, rule_definition):
+        """Inserts a rule and returns the new row."""
+        return self.table("rules").insert({
+            "user_id": user_id,
+            "rule_definition": rule_definition
+        }).execute().data[0]
+
+    def create_many(self, rows):
+        """Inserts several rules in one write."""
+        return self.table("rules").insert(rows).execute().data
+
+
+rule_repository = RuleRepository()
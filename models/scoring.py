@@ -0,0 +1,123 @@
+import numpy as np
+
+
+DEFAULT_WEIGHTS = {
+    "freshness": 1.0,       # prefer items that have been worn less
+    "novelty": 1.0,         # prefer items that have been suggested less
+    "compatibility": 1.0,   # prefer outfits whose slots agree on shared attributes
+}
+
+
+def _norm(value):
+    return str(value).strip().lower()
+
+
+class OutfitScorer(object):
+    """
+    Scores and ranks candidate outfits in batch with NumPy.
+
+    Each slot's items are encoded once as arrays: times_worn, times_generated
+    and, for every attribute name used by more than one slot, an integer code
+    per item (0 = no value). A batch of candidates is an (n_candidates,
+    n_slots) matrix of item positions, so every score component is a gather
+    plus a few vectorised operations, with no Python loop per candidate.
+
+    The score is a weighted sum of
+      * freshness:     mean of 1 / (1 + times_worn) over the outfit's items
+      * novelty:       mean of 1 / (1 + times_generated)
+      * compatibility: for each shared attribute, the fraction of slot pairs
+                       (both with a value) whose values are equal, times the
+                       attribute's weight in attr_weights (default 1; a
+                       negative weight penalises matching, e.g. for colour)
+    """
+
+    def __init__(self, slot_ids, slot_items, attributes=(), weights=None, attr_weights=None):
+        self.slot_ids = list(slot_ids)
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.attr_weights = {_norm(k): v for k, v in (attr_weights or {}).items()}
+
+        names = {attr["attr_id"]: _norm(attr["attr_name"]) for attr in attributes}
+        self.positions = []
+        worn, generated = [], []
+        values = []  # per slot: list of {name: value} per item
+        for slot_id in self.slot_ids:
+            items = slot_items[slot_id]
+            self.positions.append({item["item_id"]: i for i, item in enumerate(items)})
+            worn.append(np.array([item.get("times_worn") or 0 for item in items], dtype=np.float64))
+            generated.append(np.array([item.get("times_generated") or 0 for item in items], dtype=np.float64))
+            values.append([{names.get(attr_id, str(attr_id)): _norm(v)
+                            for attr_id, v in item.get("attr_values", {}).items()} for item in items])
+
+        self.freshness = [1.0 / (1.0 + w) for w in worn]
+        self.novelty = [1.0 / (1.0 + g) for g in generated]
+
+        # Attribute names present in at least two slots can be compared
+        slot_names = [set().union(*item_values) if item_values else set() for item_values in values]
+        shared = sorted(name for name in set().union(*slot_names) if sum(name in s for s in slot_names) > 1) \
+            if slot_names else []
+
+        self.codes = {}
+        for name in shared:
+            vocabulary = {}
+            self.codes[name] = [
+                np.array([vocabulary.setdefault(v[name], len(vocabulary) + 1) if name in v else 0
+                          for v in item_values], dtype=np.int32)
+                for item_values in values
+            ]
+
+    def encode(self, outfits):
+        """Turns outfits (lists of item rows in slot order) into an item position matrix."""
+        matrix = np.empty((len(outfits), len(self.slot_ids)), dtype=np.intp)
+        for row, outfit in enumerate(outfits):
+            for col, item in enumerate(outfit):
+                matrix[row, col] = self.positions[col][item["item_id"]]
+        return matrix
+
+    def score(self, candidates):
+        """Returns a score per candidate row of an item position matrix."""
+        n, s = candidates.shape
+        if n == 0 or s == 0:
+            return np.zeros(n)
+
+        freshness = np.zeros(n)
+        novelty = np.zeros(n)
+        for col in range(s):
+            positions = candidates[:, col]
+            freshness += self.freshness[col][positions]
+            novelty += self.novelty[col][positions]
+
+        compatibility = np.zeros(n)
+        for name, slot_codes in self.codes.items():
+            weight = self.attr_weights.get(name, 1.0)
+            if not weight:
+                continue
+            codes = np.stack([slot_codes[col][candidates[:, col]] for col in range(s)], axis=1)
+            agree = np.zeros(n)
+            comparable = np.zeros(n)
+            for i in range(s):
+                for j in range(i + 1, s):
+                    both = (codes[:, i] > 0) & (codes[:, j] > 0)
+                    comparable += both
+                    agree += both & (codes[:, i] == codes[:, j])
+            compatibility += weight * np.divide(agree, comparable, out=np.zeros(n), where=comparable > 0)
+
+        return (self.weights["freshness"] * freshness / s
+                + self.weights["novelty"] * novelty / s
+                + self.weights["compatibility"] * compatibility)
+
+    def top_k(self, candidates, k):
+        """Returns (row indexes, scores) of the k best candidates, best first."""
+        scores = self.score(candidates)
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.array([], dtype=np.intp), np.array([])
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return best, scores[best]
+
+    def rank(self, outfits, k):
+        """Returns the k best outfits (lists of item rows), best first."""
+        if not outfits:
+            return []
+        best, _ = self.top_k(self.encode(outfits), k)
+        return [outfits[i] for i in best]
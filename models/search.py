@@ -0,0 +1,168 @@
+import threading
+from collections import defaultdict
+
+
+def _norm(value):
+    return str(value).strip().lower()
+
+
+def _split_values(value, multiple):
+    """Returns the normalised values stored in one attr_items value."""
+    if multiple:
+        return {v for v in (_norm(p) for p in str(value).split(",")) if v}
+    value = _norm(value)
+    return {value} if value else set()
+
+
+# ==========================================================
+#                     INVERTED INDEX
+# ==========================================================
+
+class AttributeIndex(object):
+    """
+    Inverted index from (attr_id, value) to the set of items having it.
+
+    Each item gets a bit position and every posting list is a Python int used
+    as a bitset, so multi-attribute queries are a handful of big-int AND/OR
+    operations instead of a scan over attr_items. Values of attributes that
+    allow multiple values ("red, blue") are indexed under each value.
+    Positions of removed items are reused.
+    """
+
+    def __init__(self, multiple_attr_ids=()):
+        self.multiple = {str(attr_id) for attr_id in multiple_attr_ids}
+        self.positions = {}                 # item_id -> bit position
+        self.item_ids = []                  # bit position -> item_id
+        self.free = []                      # reusable bit positions
+        self.postings = defaultdict(int)    # (attr_id, value) -> bitset
+        self.slot_bits = defaultdict(int)   # slot_id -> bitset
+        self.item_slots = {}                # item_id -> slot_id
+        self.item_keys = {}                 # item_id -> posting keys set for it
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, items, attr_items, multiple_attr_ids=()):
+        """Builds an index from item rows and attr_items rows."""
+        index = cls(multiple_attr_ids)
+        values = defaultdict(dict)
+        for ai in attr_items:
+            values[ai["item_id"]][ai["attr_id"]] = ai["value"]
+        for item in items:
+            index._add(item["item_id"], item["slot_id"], values.get(item["item_id"], {}))
+        return index
+
+    # ------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------
+
+    def add_item(self, item_id, slot_id, values):
+        """Indexes a new item; values is {attr_id: value}."""
+        with self._lock:
+            self._remove(item_id)
+            self._add(item_id, slot_id, values)
+
+    def update_item(self, item_id, values):
+        """Re-indexes an existing item's attribute values, keeping its slot."""
+        with self._lock:
+            slot_id = self.item_slots.get(str(item_id))
+            if slot_id is None:
+                return
+            # Keep the id as indexed (routes pass it as a string)
+            item_id = self.item_ids[self.positions[str(item_id)]]
+            self._remove(item_id)
+            self._add(item_id, slot_id, values)
+
+    def remove_item(self, item_id):
+        """Drops an item from the index."""
+        with self._lock:
+            self._remove(item_id)
+
+    def _add(self, item_id, slot_id, values):
+        key = str(item_id)
+        if self.free:
+            position = self.free.pop()
+            self.item_ids[position] = item_id
+        else:
+            position = len(self.item_ids)
+            self.item_ids.append(item_id)
+        bit = 1 << position
+
+        self.positions[key] = position
+        self.item_slots[key] = slot_id
+        self.slot_bits[str(slot_id)] |= bit
+
+        keys = set()
+        for attr_id, value in values.items():
+            attr_id = str(attr_id)
+            for v in _split_values(value, attr_id in self.multiple):
+                keys.add((attr_id, v))
+        for posting in keys:
+            self.postings[posting] |= bit
+        self.item_keys[key] = keys
+
+    def _remove(self, item_id):
+        key = str(item_id)
+        position = self.positions.pop(key, None)
+        if position is None:
+            return
+        mask = ~(1 << position)
+
+        slot_key = str(self.item_slots.pop(key))
+        self.slot_bits[slot_key] &= mask
+        for posting in self.item_keys.pop(key, ()):
+            self.postings[posting] &= mask
+            if not self.postings[posting]:
+                del self.postings[posting]
+
+        self.item_ids[position] = None
+        self.free.append(position)
+
+    # ------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------
+
+    def query(self, clauses, slot_id=None, match="all"):
+        """
+        Returns the ids of items matching the query, in index order.
+
+        clauses is a list of (attr_id, values): an item matches a clause if
+        it has any of the values. With match="all" every clause must match,
+        with match="any" at least one. slot_id restricts the result to one
+        slot. With no clauses every item (of the slot) matches.
+        """
+        with self._lock:
+            if slot_id is not None:
+                scope = self.slot_bits.get(str(slot_id), 0)
+            else:
+                scope = 0
+                for bits in self.slot_bits.values():
+                    scope |= bits
+
+            if clauses:
+                result = scope if match == "all" else 0
+                for attr_id, values in clauses:
+                    bits = 0
+                    for value in values:
+                        bits |= self.postings.get((str(attr_id), _norm(value)), 0)
+                    if match == "all":
+                        result &= bits
+                    else:
+                        result |= bits
+                result &= scope
+            else:
+                result = scope
+
+            return self._item_ids(result)
+
+    def _item_ids(self, bits):
+        ids = []
+        position = 0
+        while bits:
+            # Skip runs of zero bits in one step
+            low = bits & -bits
+            shift = low.bit_length() - 1
+            position += shift
+            ids.append(self.item_ids[position])
+            bits >>= shift + 1
+            position += 1
+        return ids
@@ -0,0 +1,278 @@
+import csv
+import io
+import json
+import os
+
+from models.items import item_repository
+from models.wardrobe import get_schema, load_slot_page
+
+
+TRANSFER_FORMATS = ("csv", "jsonl")
+
+# Items read per query while exporting, and rows written per batch while
+# importing; either way only one page or batch is held in memory at a time
+EXPORT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", 500))
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 500))
+# Import reports list at most this many row errors (all of them are counted)
+IMPORT_MAX_ERRORS = int(os.environ.get("IMPORT_MAX_ERRORS", 1000))
+
+# CSV columns before the attribute columns
+CSV_FIELDS = ["item_id", "slot", "item_name"]
+
+
+# ==========================================================
+#                     SCHEMA LOOKUPS
+# ==========================================================
+
+class TransferSchema(object):
+    """
+    The user's slots and attributes as the file formats name them: a slot by
+    its name (or id), and an attribute by its name within the item's slot.
+    """
+
+    def __init__(self, schema):
+        self.slots_by_id = {slot["slot_id"]: slot for slot in schema["slots"]}
+        self.slots_by_name = {}
+        for slot in schema["slots"]:
+            self.slots_by_name.setdefault(_key(slot["slot_name"]), slot)
+
+        # slot_id -> {attribute name -> attribute}, in the slot's column order
+        self.slot_attrs = {}
+        # Every attribute name, once, in first-seen order (the CSV columns)
+        self.attr_names = []
+        seen = set()
+        for slot in schema["slots"]:
+            attrs = self.slot_attrs[slot["slot_id"]] = {}
+            for attr in schema["slot_attrs"].get(slot["slot_id"], []):
+                attrs.setdefault(_key(attr["attr_name"]), attr)
+                if _key(attr["attr_name"]) not in seen:
+                    seen.add(_key(attr["attr_name"]))
+                    self.attr_names.append(attr["attr_name"])
+
+    def find_slot(self, value):
+        slot = self.slots_by_name.get(_key(value))
+        if slot is None and str(value).strip().isdigit():
+            slot = self.slots_by_id.get(int(value))
+        return slot
+
+
+def _key(name):
+    return str(name).strip().lower()
+
+
+# ==========================================================
+#                     EXPORT
+# ==========================================================
+
+def export_items(user_id, fmt):
+    """
+    Returns an iterator over the user's items with their attribute values as
+    CSV or JSONL text, one chunk per page of EXPORT_PAGE_SIZE items read by
+    keyset, so the export never holds more than one page however large the
+    wardrobe. The schema is read up front, so its errors are raised here
+    rather than halfway through a response.
+    """
+    return _export_chunks(user_id, TransferSchema(get_schema(user_id)), fmt)
+
+
+def _export_chunks(user_id, schema, fmt):
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS + schema.attr_names, extrasaction="ignore")
+        writer.writeheader()
+        yield _drain(buffer)
+
+    after = None
+    while True:
+        items, after = load_slot_page(user_id, None, after, EXPORT_PAGE_SIZE)
+        if fmt == "csv":
+            for item in items:
+                writer.writerow(dict(_attribute_values(schema, item),
+                                     item_id=item["item_id"], slot=_slot_name(schema, item), item_name=item["item_name"]))
+            yield _drain(buffer)
+        else:
+            yield "".join(json.dumps({
+                "item_id": item["item_id"],
+                "slot": _slot_name(schema, item),
+                "item_name": item["item_name"],
+                "attributes": _attribute_values(schema, item),
+            }) + "\n" for item in items)
+        if after is None:
+            return
+
+
+def _slot_name(schema, item):
+    slot = schema.slots_by_id.get(item["slot_id"])
+    return slot["slot_name"] if slot else ""
+
+
+def _attribute_values(schema, item):
+    """{attribute name: value} of an item, for the attributes of its slot."""
+    values = {}
+    for attr in schema.slot_attrs.get(item["slot_id"], {}).values():
+        value = item["attr_values"].get(attr["attr_id"])
+        if value is not None:
+            values[attr["attr_name"]] = value
+    return values
+
+
+def _drain(buffer):
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
+
+
+# ==========================================================
+#                     IMPORT
+# ==========================================================
+
+class ImportReport(object):
+    """Outcome of an import: rows written, and the rows rejected with why."""
+
+    def __init__(self):
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []        # {"row": n, "error": message}, at most IMPORT_MAX_ERRORS
+
+    def reject(self, row, error):
+        self.error_count += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    def as_dict(self):
+        return {
+            "imported": self.imported,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "errors_truncated": self.error_count > len(self.errors),
+        }
+
+
+def import_items(user_id, stream, fmt):
+    """
+    Creates items from a CSV or JSONL byte stream and returns an
+    ImportReport. Rows are parsed one at a time and validated against the
+    user's slots and attributes (values must be among attr_possiblevals
+    when the attribute has any); valid rows are written in batches of
+    IMPORT_BATCH_SIZE, one request for the items and one for their values
+    per batch. Invalid rows are skipped and reported by row number.
+    """
+    schema = TransferSchema(get_schema(user_id))
+    report = ImportReport()
+
+    batch = []
+    row_number = 0
+    try:
+        for row_number, row in _read_rows(stream, fmt, report):
+            try:
+                batch.append((row_number, _validate(schema, row)))
+            except ValueError as e:
+                report.reject(row_number, str(e))
+                continue
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                _write_batch(user_id, batch, report)
+                batch = []
+    except (UnicodeDecodeError, csv.Error) as e:
+        # The rest of the file cannot be read; keep what was read so far
+        report.reject(row_number + 1, f"Unreadable file from here on: {str(e)}")
+    _write_batch(user_id, batch, report)
+    return report
+
+
+def _read_rows(stream, fmt, report):
+    """Yields (row number, {"slot", "item_name", "attributes"}) from the stream."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            attributes = {name: value for name, value in row.items()
+                          if name not in CSV_FIELDS and name is not None}
+            yield reader.line_num, {"slot": row.get("slot"), "item_name": row.get("item_name"),
+                                    "attributes": attributes}
+        return
+
+    for row_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            report.reject(row_number, f"Invalid JSON: {str(e)}")
+            continue
+        if not isinstance(row, dict):
+            report.reject(row_number, "Expected a JSON object.")
+            continue
+        yield row_number, row
+
+
+def _validate(schema, row):
+    """Returns the item and values a row describes, or raises ValueError."""
+    item_name = str(row.get("item_name") or "").strip()
+    if not item_name:
+        raise ValueError("item_name is required.")
+
+    slot = schema.find_slot(row.get("slot") or "")
+    if slot is None:
+        raise ValueError(f"Unknown slot {row.get('slot')!r}.")
+
+    attributes = row.get("attributes") or {}
+    if not isinstance(attributes, dict):
+        raise ValueError("attributes must be an object.")
+
+    slot_attrs = schema.slot_attrs[slot["slot_id"]]
+    values = {}
+    for name, value in attributes.items():
+        value = "" if value is None else str(value).strip()
+        if not value:
+            continue
+        attr = slot_attrs.get(_key(name))
+        if attr is None:
+            raise ValueError(f"Slot {slot['slot_name']!r} has no attribute {name!r}.")
+        values[attr["attr_id"]] = _check_value(attr, value)
+
+    return {"item_name": item_name, "slot_id": slot["slot_id"], "values": values}
+
+
+def _check_value(attr, value):
+    """Returns value in its stored form, or raises ValueError if it is not allowed."""
+    parts = [p.strip() for p in value.split(",") if p.strip()] if attr.get("allow_multiple") else [value]
+    allowed = attr.get("attr_possiblevals")
+    if allowed:
+        canonical = {_key(v): v for v in allowed}
+        for i, part in enumerate(parts):
+            if _key(part) not in canonical:
+                raise ValueError(f"{part!r} is not an allowed value of {attr['attr_name']!r} "
+                                 f"(allowed: {', '.join(allowed)}).")
+            parts[i] = canonical[_key(part)]
+    return ", ".join(parts)
+
+
+def _write_batch(user_id, batch, report):
+    if not batch:
+        return
+    created = []
+    try:
+        created = item_repository.create_many([{
+            "user_id": user_id,
+            "item_name": row["item_name"],
+            "slot_id": row["slot_id"]
+        } for _, row in batch])
+        item_repository.add_values([{
+            "user_id": user_id,
+            "item_id": item["item_id"],
+            "attr_id": attr_id,
+            "value": value
+        } for (_, row), item in zip(batch, created) for attr_id, value in row["values"].items()])
+        report.imported += len(created)
+    except Exception as e:
+        print(f"Error importing items: {str(e)}")
+        # Don't leave items without their values behind
+        if created:
+            try:
+                item_repository.delete_many(user_id, [item["item_id"] for item in created])
+            except Exception as cleanup_error:
+                print(f"Error removing partly imported items: {str(cleanup_error)}")
+        for row_number, _ in batch:
+            report.reject(row_number, f"Could not be written: {str(e)}")
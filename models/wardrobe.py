@@ -0,0 +1,504 @@
+import os
+from collections import defaultdict
+from functools import partial
+from models.backend import get_backend
+from models.cache import LRUCache
+from models.concurrency import run_parallel
+from models.rule_engine import compile_rules
+from models.rules import rule_repository
+from models.search import AttributeIndex
+
+
+# Only the columns the templates actually read
+SLOT_COLUMNS = "slot_id, slot_name, order_index"
+ATTRIBUTE_COLUMNS = "attr_id, attr_name, attr_type, attr_possiblevals, allow_multiple"
+ATTR_SLOT_COLUMNS = "attr_id, slot_id, order_index"
+ITEM_COLUMNS = "item_id, item_name, slot_id, times_generated, times_worn"
+ATTR_ITEM_COLUMNS = "item_id, attr_id, value"
+
+WARDROBE_TABLES = ("slots", "attributes", "attr_slots", "items", "attr_items")
+
+# Every wardrobe table references users.user_id, so PostgREST can embed all of
+# them under the user's row and answer the whole page in one request.
+WARDROBE_SELECT = (
+    f"slots({SLOT_COLUMNS}), "
+    f"attributes({ATTRIBUTE_COLUMNS}), "
+    f"attr_slots({ATTR_SLOT_COLUMNS}), "
+    f"items({ITEM_COLUMNS}), "
+    f"attr_items({ATTR_ITEM_COLUMNS})"
+)
+
+# The dashboard only shows counts; exact-count HEAD requests return no rows,
+# so its payload is the same however large the wardrobe is
+SUMMARY_TABLES = ("items", "attributes", "rules")
+
+# The slot/attribute layout, which changes far less often than items
+SCHEMA_TABLES = ("slots", "attributes", "attr_slots")
+SCHEMA_SELECT = f"slots({SLOT_COLUMNS}), attributes({ATTRIBUTE_COLUMNS}), attr_slots({ATTR_SLOT_COLUMNS})"
+
+# An item with its current values
+ITEM_EDIT_SELECT = f"{ITEM_COLUMNS}, attr_items(attr_id, value)"
+
+# Items per slot on the first render of /items; later pages load on demand
+ITEMS_PAGE_SIZE = int(os.environ.get("ITEMS_PAGE_SIZE", 50))
+
+# Schemas are cached per process. A worker drops a user's copy when it sees a
+# newer wardrobe version (sync_version); the TTL is a backstop.
+SCHEMA_CACHE_SIZE = int(os.environ.get("SCHEMA_CACHE_SIZE", 512))
+SCHEMA_CACHE_TTL = int(os.environ.get("SCHEMA_CACHE_TTL", 60))
+
+schema_cache = LRUCache(maxsize=SCHEMA_CACHE_SIZE, ttl=SCHEMA_CACHE_TTL)
+
+# The default template user's data, copied into every new account at signup
+TEMPLATE_TABLES = ("slots", "attributes", "attr_slots", "rules")
+TEMPLATE_SELECT = (
+    f"user_id, slots({SLOT_COLUMNS}), attributes({ATTRIBUTE_COLUMNS}), "
+    f"attr_slots({ATTR_SLOT_COLUMNS}), rules(rule_definition)"
+)
+TEMPLATE_CACHE_TTL = int(os.environ.get("TEMPLATE_CACHE_TTL", 600))
+
+template_cache = LRUCache(maxsize=4, ttl=TEMPLATE_CACHE_TTL)
+
+# Compiled rules are tied to the schema they were resolved against
+RULE_CACHE_SIZE = int(os.environ.get("RULE_CACHE_SIZE", 512))
+
+rule_cache = LRUCache(maxsize=RULE_CACHE_SIZE, ttl=SCHEMA_CACHE_TTL)
+
+# Attribute search indexes, kept current by this worker's item writes and
+# dropped when another worker's write moves the wardrobe version on
+INDEX_SELECT = "items(item_id, slot_id), attr_items(item_id, attr_id, value)"
+INDEX_CACHE_SIZE = int(os.environ.get("INDEX_CACHE_SIZE", 128))
+
+index_cache = LRUCache(maxsize=INDEX_CACHE_SIZE, ttl=SCHEMA_CACHE_TTL)
+
+# user_id -> wardrobe version this worker's cached schema, rules and search
+# index are current for (an entry outlives none of the caches it vouches for)
+cache_versions = LRUCache(maxsize=SCHEMA_CACHE_SIZE, ttl=SCHEMA_CACHE_TTL)
+
+# Per-user caches that other workers' writes make stale
+VERSIONED_CACHES = (schema_cache, rule_cache, index_cache)
+
+
+# ==========================================================
+#                     INDEXES
+# ==========================================================
+
+def index_by(rows, key):
+    """Map each row's key to the row (first row wins on duplicates)."""
+    index = {}
+    for row in rows:
+        index.setdefault(row[key], row)
+    return index
+
+
+def group_by(rows, key):
+    """Group rows into lists by key, keeping the original row order."""
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row[key]].append(row)
+    return groups
+
+
+# ==========================================================
+#                     ITEMS PAGE ASSEMBLY
+# ==========================================================
+
+def assemble_items_page(slots, attributes, attr_slots, items, attr_items):
+    """
+    Builds the slot_attrs and slot_items dictionaries used by items.html.
+
+    Every input list is walked once to build dict indexes, so the whole page
+    is assembled in O(slots + attributes + attr_slots + items + attr_items)
+    instead of rescanning the lists for every slot and every item.
+    """
+    attrs_by_id = index_by(attributes, "attr_id")
+    attr_slots_by_slot = group_by(attr_slots, "slot_id")
+    items_by_slot = group_by(items, "slot_id")
+
+    # Collect every item's attribute values in a single pass
+    values_by_item = defaultdict(dict)
+    for ai in attr_items:
+        values_by_item[ai["item_id"]][ai["attr_id"]] = ai["value"]
+
+    slot_attrs = {}
+    slot_items = {}
+    for slot in slots:
+        slot_id = slot["slot_id"]
+
+        # Attributes for this slot, ordered by their attr_slots order_index
+        relations = sorted(attr_slots_by_slot.get(slot_id, []), key=lambda x: x["order_index"])
+        slot_attrs[slot_id] = [attrs_by_id[rel["attr_id"]] for rel in relations if rel["attr_id"] in attrs_by_id]
+
+        # Items for this slot, each with its attribute values attached
+        slot_item_list = items_by_slot.get(slot_id, [])
+        for item in slot_item_list:
+            item["attr_values"] = dict(values_by_item.get(item["item_id"], {}))
+        slot_items[slot_id] = slot_item_list
+
+    return slot_attrs, slot_items
+
+
+# ==========================================================
+#                     LOADERS (one round trip each)
+# ==========================================================
+
+# PostgREST error codes for "no relationship" / "ambiguous relationship"
+_EMBEDDING_ERRORS = ("PGRST200", "PGRST201")
+
+# Flipped off the first time the database cannot resolve an embedded select;
+# from then on the loaders fall back to parallel per-table reads. Backends
+# without embedding (SQLite) always use the parallel reads.
+_embedding_supported = True
+
+
+def _embedded(load_embedded, load_parallel, *args):
+    """Runs the embedded-select loader, falling back to parallel reads if needed."""
+    global _embedding_supported
+
+    if _embedding_supported and get_backend().supports_embedding:
+        try:
+            return load_embedded(*args)
+        except Exception as e:
+            # postgrest's APIError carries the code; it is not imported here so
+            # that loading the app does not pull in the client library
+            if getattr(e, "code", None) not in _EMBEDDING_ERRORS:
+                raise
+            print(f"Embedded selects unavailable ({e.code}), using parallel reads")
+            _embedding_supported = False
+    return load_parallel(*args)
+
+
+def _user_row(select, user_id):
+    rows = get_backend().table("users").select(select).eq("user_id", user_id).execute().data
+    return rows[0] if rows else {}
+
+
+def _user_tables(user_id, columns):
+    """Reads several of a user's tables concurrently, one query per table."""
+    return run_parallel({
+        table: get_backend().table(table).select(cols).eq("user_id", user_id)
+        for table, cols in columns.items()
+    })
+
+
+def load_wardrobe(user_id):
+    """
+    Fetches slots, attributes, attr_slots, items and attr_items for a user in
+    a single embedded-resource query. Slots come back ordered by order_index.
+    """
+    wardrobe = _embedded(_load_wardrobe_embedded, _load_wardrobe_parallel, user_id)
+    wardrobe["slots"].sort(key=lambda x: (x["order_index"], x["slot_id"]))
+    return wardrobe
+
+
+def _load_wardrobe_embedded(user_id):
+    row = _user_row(WARDROBE_SELECT, user_id)
+    return {table: row.get(table) or [] for table in WARDROBE_TABLES}
+
+
+def _load_wardrobe_parallel(user_id):
+    return _user_tables(user_id, {
+        "slots": SLOT_COLUMNS,
+        "attributes": ATTRIBUTE_COLUMNS,
+        "attr_slots": ATTR_SLOT_COLUMNS,
+        "items": ITEM_COLUMNS,
+        "attr_items": ATTR_ITEM_COLUMNS,
+    })
+
+
+def load_summary(user_id):
+    """
+    Counts the user's items, attributes and rules for the dashboard, as
+    {table: count}. The three counts are read concurrently and no rows are
+    transferred.
+    """
+    return run_parallel({table: partial(_count_rows, table, user_id) for table in SUMMARY_TABLES})
+
+
+def _count_rows(table, user_id):
+    response = get_backend().table(table).select("user_id", count="exact", head=True) \
+        .eq("user_id", user_id).execute()
+    return response.count or 0
+
+
+def load_slot_page(user_id, slot_id, after=None, limit=ITEMS_PAGE_SIZE):
+    """
+    Returns (items, next_after): up to limit of a slot's items (all of the
+    user's items if slot_id is None) in item_id order, starting after the
+    given item_id, each with its attr_values attached, and the cursor of the
+    following page (None on the last one). Keyset paging costs the same for
+    the hundredth page as for the first.
+    """
+    # One extra row tells whether another page follows
+    items = _embedded(_load_slot_page_embedded, _load_slot_page_parallel, user_id, slot_id, after, limit + 1)
+    next_after = items[limit - 1]["item_id"] if len(items) > limit else None
+    return items[:limit], next_after
+
+
+def _slot_page_query(select, user_id, slot_id, after, limit):
+    query = get_backend().table("items").select(select).eq("user_id", user_id)
+    if slot_id is not None:
+        query = query.eq("slot_id", slot_id)
+    if after is not None:
+        query = query.gt("item_id", after)
+    return query.order("item_id").limit(limit)
+
+
+def _load_slot_page_embedded(user_id, slot_id, after, limit):
+    items = _slot_page_query(ITEM_EDIT_SELECT, user_id, slot_id, after, limit).execute().data
+    for item in items:
+        item["attr_values"] = {ai["attr_id"]: ai["value"] for ai in item.pop("attr_items", None) or []}
+    return items
+
+
+def _load_slot_page_parallel(user_id, slot_id, after, limit):
+    # The values can only be selected once the page's item ids are known
+    items = _slot_page_query(ITEM_COLUMNS, user_id, slot_id, after, limit).execute().data
+    values_by_item = defaultdict(dict)
+    if items:
+        attr_items = get_backend().table("attr_items").select(ATTR_ITEM_COLUMNS).eq("user_id", user_id) \
+            .in_("item_id", [item["item_id"] for item in items]).execute().data
+        for ai in attr_items:
+            values_by_item[ai["item_id"]][ai["attr_id"]] = ai["value"]
+    for item in items:
+        item["attr_values"] = values_by_item[item["item_id"]]
+    return items
+
+
+# ==========================================================
+#                     SCHEMA CACHE
+# ==========================================================
+
+def get_schema(user_id):
+    """
+    Returns the user's slots, attributes and attr_slots, plus slot_attrs (the
+    attributes of each slot in order) and slots_by_id, from the schema cache.
+    """
+    return schema_cache.get_or_load(user_id, lambda: _load_schema(user_id))
+
+
+def invalidate_schema(user_id):
+    """
+    Drops the cached schema after a slot or attribute write, along with the
+    search index (slot deletes cascade to items, and new attributes may
+    change how values are split).
+    """
+    schema_cache.invalidate(user_id)
+    index_cache.invalidate(user_id)
+
+
+def sync_version(user_id, version, written=False):
+    """
+    Keeps the user's cached schema, rules and search index in step with
+    their wardrobe version (models.pages). Called with every version a
+    request sees: a version newer than the one the caches are known current
+    for means a write this worker did not make, so they are dropped. With
+    written=True the version comes from this worker's own write, which
+    updated or dropped the caches itself; they stay if they were current
+    just before.
+    """
+    if version is None:
+        return
+    known = cache_versions.get(user_id)
+    if known is not None and (version <= known or (written and version == known + 1)):
+        if version > known:
+            cache_versions.set(user_id, version)
+        return
+    for cache in VERSIONED_CACHES:
+        cache.invalidate(user_id)
+    cache_versions.set(user_id, version)
+
+
+def _load_schema(user_id):
+    schema = _embedded(_load_schema_embedded, _load_schema_parallel, user_id)
+    schema["slots"].sort(key=lambda x: (x["order_index"], x["slot_id"]))
+    schema["slot_attrs"], _ = assemble_items_page(
+        schema["slots"], schema["attributes"], schema["attr_slots"], [], [])
+    schema["slots_by_id"] = {str(slot["slot_id"]): slot for slot in schema["slots"]}
+    return schema
+
+
+def _load_schema_embedded(user_id):
+    row = _user_row(SCHEMA_SELECT, user_id)
+    return {table: row.get(table) or [] for table in SCHEMA_TABLES}
+
+
+def _load_schema_parallel(user_id):
+    return _user_tables(user_id, {
+        "slots": SLOT_COLUMNS,
+        "attributes": ATTRIBUTE_COLUMNS,
+        "attr_slots": ATTR_SLOT_COLUMNS,
+    })
+
+
+def get_rules(user_id):
+    """
+    Returns the user's rules compiled into predicates. Compiled rules are
+    cached per user and rebuilt when the rules change (invalidate_rules) or
+    when the cached schema they were resolved against is replaced.
+    """
+    schema = get_schema(user_id)
+    cached = rule_cache.get(user_id)
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+
+    compiled = load_rules(user_id, schema["slots"], schema["slot_attrs"], schema["attributes"])
+    rule_cache.set(user_id, (schema, compiled))
+    return compiled
+
+
+def load_rules(user_id, slots, slot_attrs, attributes):
+    """
+    Reads the user's rules (one query) and compiles them against the given
+    schema rows, for callers that already hold them, bypassing the caches.
+    """
+    rows = rule_repository.list_for_user(user_id, "rule_definition")
+    return compile_rules([row["rule_definition"] for row in rows], slots, slot_attrs, attributes)
+
+
+def invalidate_items(user_id):
+    """Drops the search index after a bulk item write it was not told about."""
+    index_cache.invalidate(user_id)
+
+
+def invalidate_rules(user_id):
+    """Drops the compiled rules after a rule write."""
+    rule_cache.invalidate(user_id)
+
+
+def get_search_index(user_id):
+    """Returns the user's attribute search index, building it on a cache miss."""
+    return index_cache.get_or_load(user_id, lambda: _build_search_index(user_id))
+
+
+def cached_search_index(user_id):
+    """Returns the user's index only if it is already built (for write-through updates)."""
+    return index_cache.get(user_id)
+
+
+def _build_search_index(user_id):
+    schema = get_schema(user_id)
+    multiple = [attr["attr_id"] for attr in schema["attributes"] if attr.get("allow_multiple")]
+    data = _embedded(_load_index_embedded, _load_index_parallel, user_id)
+    return AttributeIndex.build(data["items"], data["attr_items"], multiple)
+
+
+def _load_index_embedded(user_id):
+    row = _user_row(INDEX_SELECT, user_id)
+    return {table: row.get(table) or [] for table in ("items", "attr_items")}
+
+
+def _load_index_parallel(user_id):
+    return _user_tables(user_id, {"items": "item_id, slot_id", "attr_items": ATTR_ITEM_COLUMNS})
+
+
+def load_slot_schema(user_id, slot_id):
+    """
+    Returns (slot, attributes) for one of the user's slots, or (None, []) if
+    the slot does not exist.
+    """
+    schema = get_schema(user_id)
+    slot = schema["slots_by_id"].get(str(slot_id))
+    if not slot:
+        return None, []
+    return slot, schema["slot_attrs"][slot["slot_id"]]
+
+
+def load_item_for_edit(user_id, item_id):
+    """
+    Returns (item, slot, attributes, attr_values) for the edit form, or None
+    if the item does not exist. Only the item is read from the database; the
+    slot and its attributes come from the schema cache.
+    """
+    loaded = _embedded(_load_item_embedded, _load_item_parallel, user_id, item_id)
+    if not loaded:
+        return None
+
+    item, attr_values = loaded
+    slot, attributes = load_slot_schema(user_id, item["slot_id"])
+    return item, slot or {}, attributes, attr_values
+
+
+def _load_item_embedded(user_id, item_id):
+    rows = get_backend().table("items").select(ITEM_EDIT_SELECT).eq("item_id", item_id).eq("user_id", user_id).execute().data
+    if not rows:
+        return None
+
+    item = rows[0]
+    attr_values = {ai["attr_id"]: ai["value"] for ai in item.pop("attr_items", None) or []}
+    return item, attr_values
+
+
+def _load_item_parallel(user_id, item_id):
+    data = run_parallel({
+        "item": get_backend().table("items").select(ITEM_COLUMNS).eq("item_id", item_id).eq("user_id", user_id),
+        "attr_items": get_backend().table("attr_items").select(ATTR_ITEM_COLUMNS).eq("item_id", item_id).eq("user_id", user_id),
+    })
+    if not data["item"]:
+        return None
+
+    return data["item"][0], {ai["attr_id"]: ai["value"] for ai in data["attr_items"]}
+
+
+# ==========================================================
+#                     DEFAULT TEMPLATE
+# ==========================================================
+
+def load_default_template(email):
+    """
+    Returns the template user's slots, attributes, attr_slots and rules, or
+    None if there is no template user. The snapshot is cached in-process so
+    signups do not re-read it every time.
+    """
+    template = template_cache.get(email)
+    if template is None:
+        template = _embedded(_load_template_embedded, _load_template_parallel, email)
+        if template is not None:
+            template_cache.set(email, template)
+    return template
+
+
+def _load_template_embedded(email):
+    rows = get_backend().table("users").select(TEMPLATE_SELECT).eq("email", email).execute().data
+    if not rows:
+        return None
+    return {table: rows[0].get(table) or [] for table in TEMPLATE_TABLES}
+
+
+def _load_template_parallel(email):
+    rows = get_backend().table("users").select("user_id").eq("email", email).execute().data
+    if not rows:
+        return None
+    return _user_tables(rows[0]["user_id"], {
+        "slots": SLOT_COLUMNS,
+        "attributes": ATTRIBUTE_COLUMNS,
+        "attr_slots": ATTR_SLOT_COLUMNS,
+        "rules": "rule_definition",
+    })
+
+
+def warm_caches(template_email, user_ids=()):
+    """
+    Loads the default template and the given users' schemas and compiled
+    rules into this process's caches, so the first requests a fresh worker
+    serves do not pay for them.
+    """
+    # One user at a time: each load already fans out over the query pool, and
+    # nesting run_parallel calls could leave every pool thread waiting
+    load_default_template(template_email)
+    for user_id in user_ids:
+        get_rules(user_id)
+
+
+# ==========================================================
+#                     ATTRIBUTE VALUES
+# ==========================================================
+
+def form_attr_values(form):
+    """Collects the non-empty attr_<id> fields of a submitted item form as {attr_id: value}."""
+    return {
+        key.replace("attr_", ""): value.strip()
+        for key, value in form.items()
+        if key.startswith("attr_") and value.strip()
+    }
+
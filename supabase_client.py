@@ -1,7 +1,67 @@
 import os
+import threading
+
+import httpx
 from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL")
+SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+
+# Keep-alive connections per process; size it to the worker's thread count
+# plus the query fan-out (QUERY_WORKERS) so requests do not queue for a socket.
+SUPABASE_POOL_SIZE = int(os.environ.get("SUPABASE_POOL_SIZE", 32))
+SUPABASE_TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", 30))
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_supabase() -> Client:
+    """
+    Returns this process's supabase client.
+
+    The client is created on first use, so importing the app costs nothing,
+    and is dropped in every forked child (and re-created if the pid
+    changes), so a gunicorn worker forked from a preloaded master never
+    shares the master's sockets. Every client owns one httpx connection
+    pool, bounded by SUPABASE_POOL_SIZE, whose keep-alive connections are
+    reused by all of the worker's threads.
+    """
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                if not SUPABASE_URL or not SUPABASE_KEY:
+                    raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set")
+                http_client = httpx.Client(
+                    timeout=SUPABASE_TIMEOUT,
+                    limits=httpx.Limits(max_connections=SUPABASE_POOL_SIZE,
+                                        max_keepalive_connections=SUPABASE_POOL_SIZE),
+                )
+                _client = create_client(SUPABASE_URL, SUPABASE_KEY,
+                                        options=SyncClientOptions(httpx_client=http_client))
+                _client_pid = pid
+    return _client
+
+
+def _reset_after_fork():
+    # The parent's connections belong to the parent; the child opens its own
+    global _client, _client_pid, _client_lock
+    _client = None
+    _client_pid = None
+    _client_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_KEY"]
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+def __getattr__(name):
+    # Keeps "from supabase_client import supabase" working for scripts
+    if name == "supabase":
+        return get_supabase()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
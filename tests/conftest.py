@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pytest
+
+# Run from anywhere: the app modules import each other from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "tests")
+
+from models.backend import SQLiteBackend, set_backend
+from models.cache import LRUCache
+from models import pages
+from models import wardrobe as wardrobe_module
+
+
+@pytest.fixture
+def backend():
+    """A fresh in-memory SQLite backend, with every module-level cache emptied."""
+    backend = SQLiteBackend()
+    set_backend(backend)
+    for module in (pages, wardrobe_module):
+        for value in vars(module).values():
+            if isinstance(value, LRUCache):
+                value.clear()
+    yield backend
+    set_backend(None)
+
+
+@pytest.fixture
+def user(backend):
+    from models.auth import user_repository
+    return user_repository.create("tests@example.com", "", "Test", "User")
+
+
+@pytest.fixture
+def client(backend, user):
+    """Test client logged in as user."""
+    from view import app
+    from models.metrics import InstrumentedBackend
+    app.config["TESTING"] = True
+    # init_metrics wrapped the backend of the first test only; wrap this one too
+    set_backend(InstrumentedBackend(backend))
+    with app.test_client() as client:
+        with client.session_transaction() as session:
+            session["user_id"] = user["user_id"]
+            session["email"] = user["email"]
+        yield client
+
+
+@pytest.fixture
+def wardrobe(user):
+    """
+    A small wardrobe: slots Top and Bottom (and an empty Shoes), attributes
+    Color (single value) and Season (multiple values) in both, and three
+    items, one of them without values.
+    """
+    from models.attributes import slot_repository, attribute_repository
+    from models.items import item_repository
+
+    user_id = user["user_id"]
+    slots = slot_repository.create_many([{"user_id": user_id, "slot_name": name, "order_index": (i + 1) * 1024}
+                                         for i, name in enumerate(["Top", "Bottom", "Shoes"])])
+    color, season = attribute_repository.create_many([
+        {"user_id": user_id, "attr_name": "Color", "attr_type": "string",
+         "attr_possiblevals": ["blue", "black", "black, white"], "allow_multiple": False},
+        {"user_id": user_id, "attr_name": "Season", "attr_type": "string",
+         "attr_possiblevals": ["summer", "winter"], "allow_multiple": True},
+    ])
+    attribute_repository.create_links([
+        {"user_id": user_id, "attr_id": attr["attr_id"], "slot_id": slot["slot_id"], "order_index": (i + 1) * 1024}
+        for slot in slots[:2] for i, attr in enumerate([color, season])
+    ])
+    shirt, striped, jeans = item_repository.create_many([
+        {"user_id": user_id, "item_name": "Shirt", "slot_id": slots[0]["slot_id"]},
+        {"user_id": user_id, "item_name": "Striped shirt", "slot_id": slots[0]["slot_id"]},
+        {"user_id": user_id, "item_name": "Jeans", "slot_id": slots[1]["slot_id"]},
+    ])
+    item_repository.add_values([
+        {"user_id": user_id, "item_id": shirt["item_id"], "attr_id": color["attr_id"], "value": "blue"},
+        {"user_id": user_id, "item_id": shirt["item_id"], "attr_id": season["attr_id"], "value": "summer, winter"},
+        {"user_id": user_id, "item_id": striped["item_id"], "attr_id": color["attr_id"], "value": "black, white"},
+    ])
+    return {"slots": slots, "color": color, "season": season, "items": [shirt, striped, jeans]}
@@ -0,0 +1,83 @@
+import pytest
+
+from models.auth import user_repository
+from models.attributes import attribute_repository
+from models.items import item_repository
+from models.outfits import outfit_repository
+
+
+def test_json_and_boolean_columns_round_trip(backend, user):
+    attr = attribute_repository.create(user["user_id"], "Color", "string", ["red", "blue"], True)
+    row = backend.table("attributes").select("*").eq("attr_id", attr["attr_id"]).execute().data[0]
+
+    assert attr["attr_possiblevals"] == row["attr_possiblevals"] == ["red", "blue"]
+    assert row["allow_multiple"] is True
+
+
+def test_filters_order_range_and_head_count(backend, wardrobe):
+    items = backend.table("items")
+    shirt, striped, jeans = wardrobe["items"]
+    top = wardrobe["slots"][0]["slot_id"]
+
+    rows = items.select("item_id").eq("slot_id", top).order("item_id", desc=True).execute().data
+    assert [row["item_id"] for row in rows] == [striped["item_id"], shirt["item_id"]]
+
+    rows = backend.table("items").select("item_name").order("item_id").range(1, 2).execute().data
+    assert [row["item_name"] for row in rows] == ["Striped shirt", "Jeans"]
+
+    assert backend.table("items").select("item_id").in_("item_id", []).execute().data == []
+
+    response = backend.table("items").select("user_id", count="exact", head=True).gt("item_id", shirt["item_id"]) \
+        .execute()
+    assert response.count == 2 and response.data == []
+
+
+def test_unknown_column_is_rejected(backend, user):
+    with pytest.raises(ValueError):
+        backend.table("items").select("item_id").eq("item_id; DROP TABLE items", 1).execute()
+
+
+def test_save_values_upserts_and_deletes(wardrobe):
+    user_id = wardrobe["slots"][0]["user_id"]
+    shirt = wardrobe["items"][0]["item_id"]
+    color, season = str(wardrobe["color"]["attr_id"]), str(wardrobe["season"]["attr_id"])
+
+    stored = item_repository.values(user_id, shirt)
+    item_repository.save_values(user_id, shirt, {color: "black"}, stored)
+
+    assert item_repository.values(user_id, shirt) == {int(color): "black"}
+    assert season not in {str(attr_id) for attr_id in item_repository.values(user_id, shirt)}
+
+
+def test_multi_row_insert_is_all_or_nothing(backend, wardrobe):
+    user_id = wardrobe["slots"][0]["user_id"]
+    before = len(backend.table("items").select("item_id").execute().data)
+
+    with pytest.raises(Exception):
+        item_repository.create_many([
+            {"user_id": user_id, "item_name": "Valid", "slot_id": wardrobe["slots"][0]["slot_id"]},
+            {"user_id": user_id, "item_name": None, "slot_id": wardrobe["slots"][0]["slot_id"]},
+        ])
+    assert len(backend.table("items").select("item_id").execute().data) == before
+
+
+def test_delete_cascades_to_attribute_values(backend, wardrobe):
+    user_id = wardrobe["slots"][0]["user_id"]
+    shirt = wardrobe["items"][0]["item_id"]
+
+    item_repository.delete(user_id, shirt)
+    assert backend.table("attr_items").select("item_id").eq("item_id", shirt).execute().data == []
+
+
+def test_rpc_functions(backend, wardrobe):
+    user_id = wardrobe["slots"][0]["user_id"]
+    shirt, _, jeans = (item["item_id"] for item in wardrobe["items"])
+
+    outfit_repository.record_generated(user_id, [shirt, jeans])
+    outfit_repository.record_generated(user_id, [shirt])
+    rows = backend.table("items").select("item_id, times_generated").order("item_id").execute().data
+    assert [row["times_generated"] for row in rows] == [2, 0, 1]
+
+    assert user_repository.wardrobe_version(user_id) == 0
+    assert user_repository.bump_wardrobe_version(user_id) == 1
+    assert user_repository.wardrobe_version(user_id) == 1
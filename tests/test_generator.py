@@ -0,0 +1,75 @@
+import itertools
+import random
+
+from models.generator import Constraint, OutfitGenerator
+
+
+SLOTS = [{"slot_id": 1}, {"slot_id": 2}, {"slot_id": 3}, {"slot_id": 4}]
+
+
+def items(slot_id, colors):
+    return [{"item_id": slot_id * 100 + i, "slot_id": slot_id, "color": color} for i, color in enumerate(colors)]
+
+
+def wardrobe():
+    return {
+        1: items(1, ["red", "blue", "black", "white"]),
+        2: items(2, ["red", "blue", "black"]),
+        3: items(3, ["black", "white"]),
+        4: [],                                  # empty slot
+    }
+
+
+def valid(outfit, constraints):
+    chosen = {item["slot_id"]: item for item in outfit}
+    return all(c.check(chosen) for c in constraints if set(c.scope) <= set(chosen))
+
+
+CONSTRAINTS = [
+    Constraint([1], lambda a: a[1]["color"] != "white"),
+    Constraint([1, 2], lambda a: a[1]["color"] != a[2]["color"]),
+    Constraint([2, 3], lambda a: a[2]["color"] != "black" or a[3]["color"] == "white"),
+]
+
+
+def test_every_outfit_satisfies_every_constraint():
+    generator = OutfitGenerator(SLOTS, wardrobe(), CONSTRAINTS, rng=random.Random(3))
+    outfits = generator.generate(50)
+
+    brute_force = [combo for combo in itertools.product(*(wardrobe()[s] for s in (1, 2, 3)))
+                   if valid(list(combo), CONSTRAINTS)]
+    assert outfits
+    assert len(outfits) == len(brute_force)
+    for outfit in outfits:
+        assert [item["slot_id"] for item in outfit] == [1, 2, 3]
+        assert valid(outfit, CONSTRAINTS)
+
+
+def test_outfits_are_distinct():
+    outfits = OutfitGenerator(SLOTS, wardrobe(), rng=random.Random(5)).generate(10)
+
+    keys = [tuple(item["item_id"] for item in outfit) for outfit in outfits]
+    assert len(keys) == 10
+    assert len(set(keys)) == 10
+
+
+def test_unsatisfiable_constraints_return_nothing():
+    never = Constraint([1, 3], lambda a: a[1]["color"] == "green")
+    assert OutfitGenerator(SLOTS, wardrobe(), CONSTRAINTS + [never]).generate(5) == []
+
+    # Satisfiable pairwise, but not all at once
+    same = Constraint([1, 2], lambda a: a[1]["color"] == a[2]["color"])
+    assert OutfitGenerator(SLOTS, wardrobe(), CONSTRAINTS + [same]).generate(5) == []
+
+
+def test_empty_slots_and_their_constraints_are_dropped():
+    needs_shoes = Constraint([1, 4], lambda a: False)
+    generator = OutfitGenerator(SLOTS, wardrobe(), [needs_shoes])
+
+    assert generator.slot_ids == [1, 2, 3]
+    assert generator.constraints == []
+    assert len(generator.generate(3)) == 3
+
+
+def test_no_items_at_all():
+    assert OutfitGenerator(SLOTS, {1: [], 2: []}).generate(3) == []
@@ -0,0 +1,72 @@
+from models import metrics
+
+
+def test_metrics_local_only_without_token(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "")
+
+    assert client.get("/metrics").status_code == 200
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.9"}).status_code == 403
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    response = client.get("/metrics", headers={"Authorization": "Bearer s3cret"},
+                          environ_base={"REMOTE_ADDR": "203.0.113.9"})
+    assert response.status_code == 200
+    assert b"wardrobe_http_requests_total" in response.data
+
+
+def histogram(name, route):
+    buckets, counts, total, count = metrics.registry.histograms.get((name, (("route", route),)), [(), [], 0.0, 0])
+    return total, count
+
+
+def test_streamed_page_is_recorded_when_it_ends(client, wardrobe, monkeypatch):
+    import time
+    import view
+
+    load_first_page = view.load_first_page
+
+    def slow_first_page(user_id, slot_id):
+        time.sleep(0.05)
+        return load_first_page(user_id, slot_id)
+    monkeypatch.setattr(view, "load_first_page", slow_first_page)
+
+    queries_before, requests_before = histogram("wardrobe_request_db_queries", "/items")
+    seconds_before, _ = histogram("wardrobe_http_request_seconds", "/items")
+    items_before = metrics.registry.counters[("wardrobe_db_queries_total",
+                                              (("route", "/items"), ("table", "items"), ("action", "select")))]
+
+    with client.get("/items") as response:
+        assert response.status_code == 200
+        response.get_data()
+        # Nothing is recorded until the response is closed
+        assert histogram("wardrobe_request_db_queries", "/items")[1] == requests_before
+
+    queries, requests = histogram("wardrobe_request_db_queries", "/items")
+    seconds, _ = histogram("wardrobe_http_request_seconds", "/items")
+    items = metrics.registry.counters[("wardrobe_db_queries_total",
+                                       (("route", "/items"), ("table", "items"), ("action", "select")))]
+    assert requests == requests_before + 1
+    # The three slots' item pages ran in the stream, and count against /items
+    assert items - items_before == 3
+    assert queries - queries_before >= 3
+    assert seconds - seconds_before >= 0.05
+
+
+def test_metrics_exports_cache_stats(client, wardrobe, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "")
+    client.get("/items").get_data()
+    client.get("/items").get_data()
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert "# TYPE wardrobe_cache_hits_total counter" in text
+    assert "# TYPE wardrobe_cache_entries gauge" in text
+    for cache in ("schema", "template", "rule", "index", "version", "page", "fragment"):
+        assert f'wardrobe_cache_max_entries{{cache="{cache}"}}' in text
+    assert 'wardrobe_cache_entries{cache="page"} 1' in text
+    hits = next(line for line in text.splitlines() if line.startswith('wardrobe_cache_hits_total{cache="page"}'))
+    assert float(hits.split()[-1]) >= 1
@@ -0,0 +1,63 @@
+from models.attributes import slot_repository
+from models.ordering import ORDER_GAP, key_between, order_index_for_insert, spread_keys
+
+
+def test_key_between():
+    assert key_between(None, None) == ORDER_GAP
+    assert key_between(2048, None) == 2048 + ORDER_GAP
+    assert key_between(None, 1024) == 512
+    assert key_between(1024, 2048) == 1536
+    assert key_between(1024, 1026) == 1025
+    assert key_between(1024, 1025) is None
+    assert key_between(None, 1) is None
+
+
+def test_spread_keys():
+    assert spread_keys(3) == [ORDER_GAP, 2 * ORDER_GAP, 3 * ORDER_GAP]
+    assert spread_keys(0) == []
+
+
+def slots(backend):
+    return backend.table("slots").select("*").order("order_index").execute().data
+
+
+def create_slots(user_id, keys):
+    return slot_repository.create_many([{"user_id": user_id, "slot_name": f"Slot {key}", "order_index": key}
+                                        for key in keys])
+
+
+def test_insert_into_gaps_writes_nothing(backend, user):
+    create_slots(user["user_id"], [1024, 2048, 3072])
+    siblings = slots(backend)
+
+    assert order_index_for_insert("slots", "slot_id", siblings, 0) == 512
+    assert order_index_for_insert("slots", "slot_id", siblings, 1) == 1536
+    assert order_index_for_insert("slots", "slot_id", siblings, 3) == 3072 + ORDER_GAP
+    # Positions past either end are clamped
+    assert order_index_for_insert("slots", "slot_id", siblings, 99) == 3072 + ORDER_GAP
+    assert order_index_for_insert("slots", "slot_id", siblings, -5) == 512
+    assert [row["order_index"] for row in slots(backend)] == [1024, 2048, 3072]
+    assert order_index_for_insert("slots", "slot_id", [], 0) == ORDER_GAP
+
+
+def test_adjacent_keys_rebalance_and_leave_a_hole(backend, user, monkeypatch):
+    create_slots(user["user_id"], [5, 6, 7])
+    siblings = slots(backend)
+
+    calls = []
+    execute = backend.execute
+    monkeypatch.setattr(backend, "execute", lambda query: calls.append(query.action) or execute(query))
+    key = order_index_for_insert("slots", "slot_id", siblings, 1)
+    monkeypatch.undo()
+
+    assert calls == ["upsert"]
+    assert key == 2 * ORDER_GAP
+    assert [(row["slot_name"], row["order_index"]) for row in slots(backend)] == [
+        ("Slot 5", ORDER_GAP), ("Slot 6", 3 * ORDER_GAP), ("Slot 7", 4 * ORDER_GAP)]
+
+
+def test_rebalance_at_the_start(backend, user):
+    create_slots(user["user_id"], [1, 2])
+
+    assert order_index_for_insert("slots", "slot_id", slots(backend), 0) == ORDER_GAP
+    assert [row["order_index"] for row in slots(backend)] == [2 * ORDER_GAP, 3 * ORDER_GAP]
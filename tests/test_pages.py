@@ -0,0 +1,97 @@
+from models import pages
+from models.auth import user_repository
+
+
+def get(client, path, **headers):
+    response = client.get(path, headers=headers)
+    response.get_data()     # runs a streamed page to the end
+    return response
+
+
+def count_queries(backend, monkeypatch):
+    calls = []
+    execute = backend.execute
+    monkeypatch.setattr(backend, "execute", lambda query: calls.append(query.table) or execute(query))
+    return calls
+
+
+def test_etag_and_not_modified(client, wardrobe):
+    for path in ("/items", "/wardrobe"):
+        first = get(client, path)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+        assert first.headers["Cache-Control"] == "private, no-cache"
+
+        again = get(client, path, **{"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.data == b""
+        assert again.headers["ETag"] == etag
+
+
+def test_repeat_view_is_served_from_the_page_cache(client, backend, wardrobe, monkeypatch):
+    first = get(client, "/items")
+    calls = count_queries(backend, monkeypatch)
+
+    again = get(client, "/items")
+    assert again.data == first.data
+    assert calls == []
+
+
+def test_write_changes_the_etag(client, wardrobe):
+    before = get(client, "/items")
+    shirt = wardrobe["items"][0]
+
+    response = client.post(f"/items/edit/{shirt['item_id']}", data={"item_name": "Linen shirt"})
+    assert response.status_code == 302
+
+    after = get(client, "/items", **{"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert b"Linen shirt" in after.data
+
+
+def test_version_read_failure_serves_the_page_uncached(client, wardrobe, monkeypatch):
+    def fail(user_id):
+        raise RuntimeError("database unavailable")
+    monkeypatch.setattr(user_repository, "wardrobe_version", fail)
+
+    response = get(client, "/wardrobe")
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert pages.page_cache.get((wardrobe["slots"][0]["user_id"], "wardrobe")) is None
+
+
+def write_from_another_worker(client, user_id, write):
+    """Makes a write the way another worker would: this worker's caches are not told."""
+    write()
+    version = user_repository.bump_wardrobe_version(user_id)
+    with client.session_transaction() as session:
+        session["wardrobe_version"] = [user_id, version]
+    return version
+
+
+def test_write_through_another_worker_reloads_the_schema(client, wardrobe):
+    from models.attributes import attribute_repository
+    from models.wardrobe import get_rules, schema_cache
+    user_id = wardrobe["slots"][0]["user_id"]
+
+    before = get(client, "/items")
+    assert b"Fabric" not in before.data
+    assert get_rules(user_id) == []
+
+    def add_column_and_rule():
+        fabric = attribute_repository.create(user_id, "Fabric", "string", None, False)
+        attribute_repository.link(user_id, fabric["attr_id"], wardrobe["slots"][0]["slot_id"], 4096)
+        from models.rules import rule_repository
+        rule_repository.create(user_id, 'Top.Color != Bottom.Color')
+    version = write_from_another_worker(client, user_id, add_column_and_rule)
+
+    after = get(client, "/items", **{"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert f"-{user_id}-{version}-" in after.headers["ETag"]
+    assert b"Fabric" in after.data
+    assert len(get_rules(user_id)) == 1
+
+    # The page cached under the new version is the fresh one
+    schema_cache.clear()
+    assert get(client, "/items").data == after.data
@@ -0,0 +1,110 @@
+from models.pregen import OutfitPool
+
+
+def outfit(*item_ids):
+    return [{"item_id": item_id, "slot_id": 1, "item_name": f"Item {item_id}", "attr_values": {}}
+            for item_id in item_ids]
+
+
+def pool(builds):
+    def build(user_id, count):
+        builds.append((user_id, count))
+        return []
+    return OutfitPool(build, lambda user_id: [], size=5, low_water=0)
+
+
+def test_empty_queue_is_left_to_the_caller():
+    builds = []
+    outfits = pool(builds)
+
+    assert outfits.take(1, version=3) is None
+    outfits.fill(1, [outfit(1), outfit(2)], version=3)
+    assert outfits.take(1, version=3) == outfit(1)
+    assert builds == []
+
+
+def test_newer_version_drops_the_queue():
+    outfits = pool([])
+    outfits.fill(1, [outfit(1), outfit(2)], version=3)
+
+    # Written through another worker: this pool never saw the write
+    assert outfits.take(1, version=4) is None
+    assert outfits.size_of(1) == 0
+
+    # Outfits built for the old version are not queued any more
+    outfits.fill(1, [outfit(3)], version=3)
+    assert outfits.size_of(1) == 0
+
+
+def test_in_place_updates_keep_the_queue_current():
+    outfits = pool([])
+    outfits.fill(1, [outfit(1), outfit(2), outfit(3)], version=3)
+
+    outfits.item_removed(1, 2, version=4)
+    outfits.item_changed(1, 3, "Renamed", {}, version=5)
+    assert outfits.take(1, version=5) == outfit(1)
+    assert outfits.take(1, version=5)[0]["item_name"] == "Renamed"
+
+
+def test_in_place_update_after_a_missed_write_drops_the_queue():
+    outfits = pool([])
+    outfits.fill(1, [outfit(1), outfit(2)], version=3)
+
+    # Version 4 was written elsewhere, so the queue cannot be patched up to 5
+    outfits.item_removed(1, 2, version=5)
+    assert outfits.size_of(1) == 0
+    outfits.fill(1, [outfit(4)], version=5)
+    assert outfits.take(1, version=5) == outfit(4)
+
+
+def test_item_changed_rechecks_only_the_rules_reading_a_changed_attribute():
+    from models.rule_engine import compile_rules
+
+    color = {"attr_id": 10, "attr_name": "Color", "allow_multiple": False}
+    fit = {"attr_id": 11, "attr_name": "Fit", "allow_multiple": False}
+    slots = [{"slot_id": 1, "slot_name": "Top"}, {"slot_id": 2, "slot_name": "Bottom"}]
+    rules = compile_rules(["top.color != bottom.color", "top.fit = slim"],
+                          slots, {1: [color, fit], 2: [color]}, [color, fit])
+
+    def row(item_id, slot_id, **values):
+        return {"item_id": item_id, "slot_id": slot_id, "item_name": f"Item {item_id}",
+                "attr_values": {attr["attr_id"]: values[attr["attr_name"]]
+                                for attr in (color, fit) if attr["attr_name"] in values}}
+
+    # Both tops already break "top.fit = slim"; queued outfits are only re-checked
+    # against the rules that read an attribute an edit changes
+    shirt = row(1, 1, Color="blue", Fit="baggy")
+    baggy = row(2, 1, Color="green", Fit="baggy")
+    red_jeans, black_jeans = row(3, 2, Color="red"), row(4, 2, Color="black")
+
+    outfits = OutfitPool(lambda user_id, count: [], lambda user_id: rules, size=10, low_water=0)
+    outfits.fill(1, [[shirt, red_jeans], [shirt, black_jeans], [baggy, red_jeans]], version=1)
+
+    # The edit form sends string attr ids; the shirt turns red, its fit is unchanged
+    outfits.item_changed(1, "1", "Red shirt", {"10": "red", "11": "baggy"}, version=2)
+
+    queued = [outfits.take(1, version=2) for _ in range(outfits.size_of(1))]
+    assert [[item["item_id"] for item in outfit] for outfit in queued] == [[1, 4], [2, 3]]
+    # Values are stored under the rules' attr ids again, not the form's strings
+    assert queued[0][0]["attr_values"] == {10: "red", 11: "baggy"}
+    assert queued[0][0]["item_name"] == "Red shirt"
+
+
+def test_generate_outfits_reads_the_wardrobe_once(backend, user, wardrobe, monkeypatch):
+    from models.pregen import generate_outfits
+    from models.rules import rule_repository
+
+    rule_repository.create(user["user_id"], "Top.Color != Bottom.Color")
+    selects = []
+    execute = backend.execute
+
+    def counted(query):
+        if query.action == "select":
+            selects.append(query.table)
+        return execute(query)
+    monkeypatch.setattr(backend, "execute", counted)
+
+    outfits = generate_outfits(user["user_id"], 5)
+    assert [[item["item_name"] for item in outfit] for outfit in outfits]
+    # One read per wardrobe table and one for the rules; no separate schema read
+    assert sorted(selects) == sorted(["slots", "attributes", "attr_slots", "items", "attr_items", "rules"])
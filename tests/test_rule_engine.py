@@ -0,0 +1,125 @@
+import re
+
+import pytest
+
+from models.rule_engine import RuleSyntaxError, compile_rule, compile_rules, parse_rule, tokenize
+
+
+SLOTS = [
+    {"slot_id": 1, "slot_name": "Top"},
+    {"slot_id": 2, "slot_name": "Bottom"},
+    {"slot_id": 3, "slot_name": "Outer Wear"},
+]
+COLOR = {"attr_id": 10, "attr_name": "Color", "allow_multiple": False}
+SEASON = {"attr_id": 11, "attr_name": "Season", "allow_multiple": True}
+MATERIAL = {"attr_id": 12, "attr_name": "Material", "allow_multiple": False}
+ATTRIBUTES = [COLOR, SEASON, MATERIAL]
+SLOT_ATTRS = {1: [COLOR, MATERIAL], 2: [COLOR], 3: [COLOR, SEASON]}
+
+
+def compile_(definition):
+    return compile_rule(definition, SLOTS, SLOT_ATTRS, ATTRIBUTES)
+
+
+def outfit(top=None, bottom=None, outer=None):
+    return {1: {"attr_values": top or {}}, 2: {"attr_values": bottom or {}}, 3: {"attr_values": outer or {}}}
+
+
+def test_tokenize_quoted_names_and_keywords():
+    assert tokenize('IF "Outer Wear".season In {summer}') == [
+        ("kw", "if"), ("name", "Outer Wear"), ("op", "."), ("name", "season"),
+        ("kw", "in"), ("op", "{"), ("name", "summer"), ("op", "}")]
+    assert tokenize("top.color=='dark red'")[-1] == ("name", "dark red")
+
+
+def test_parse_trees():
+    assert parse_rule("top.color = red") == ("eq", ("ref", "top", "color"), ("value", "red"))
+    assert parse_rule("top.color != bottom.color") == (
+        "not", ("eq", ("ref", "top", "color"), ("ref", "bottom", "color")))
+    assert parse_rule("if top.color = red then bottom.color = blue") == (
+        "or", ("not", ("eq", ("ref", "top", "color"), ("value", "red"))),
+        ("eq", ("ref", "bottom", "color"), ("value", "blue")))
+    # and binds tighter than or
+    assert parse_rule("top.color = a or top.color = b and top.color = c")[0] == "or"
+    assert parse_rule("top.color not in {a, b}") == ("not", ("in", ("ref", "top", "color"), ["a", "b"]))
+
+
+def test_if_then():
+    rule = compile_("if top.color = red then bottom.color != red")
+
+    assert rule.check(outfit({10: "red"}, {10: "blue"}))
+    assert not rule.check(outfit({10: "red"}, {10: "red"}))
+    assert rule.check(outfit({10: "blue"}, {10: "blue"}))
+    assert rule.slot_ids == (1, 2) and rule.attr_ids == {10}
+
+
+def test_and_or_not_and_parentheses():
+    rule = compile_("not (top.color = red or top.color = blue) and top.material = wool")
+
+    assert rule.check(outfit({10: "green", 12: "wool"}))
+    assert not rule.check(outfit({10: "red", 12: "wool"}))
+    assert not rule.check(outfit({10: "green", 12: "cotton"}))
+
+
+def test_in_and_not_in():
+    inside = compile_("top.color in {red, blue}")
+    outside = compile_("top.color not in {red, blue}")
+
+    for color, expected in (("red", True), ("Blue", True), ("green", False)):
+        assert inside.check(outfit({10: color})) is expected
+        assert outside.check(outfit({10: color})) is not expected
+    # A missing value is in no set
+    assert not inside.check(outfit())
+    assert outside.check(outfit())
+
+
+def test_quoted_names_and_case_insensitivity():
+    rule = compile_('IF "outer wear".SEASON = Summer THEN "TOP".color = \'Light Blue\'')
+
+    assert rule.check(outfit({10: "light blue"}, outer={11: "SUMMER"}))
+    assert not rule.check(outfit({10: "navy"}, outer={11: "summer"}))
+    assert rule.slot_ids == (3, 1)
+
+
+def test_attribute_to_attribute_comparison():
+    same = compile_("top.color = bottom.color")
+    different = compile_("top.color != bottom.color")
+
+    assert same.check(outfit({10: "Black"}, {10: "black"}))
+    assert not same.check(outfit({10: "black"}, {10: "white"}))
+    assert different.check(outfit({10: "black"}, {10: "white"}))
+    # Missing values never compare equal
+    assert not same.check(outfit({10: "black"}))
+
+
+def test_multiple_value_sets():
+    contains = compile_('"Outer Wear".season = winter')
+    shares = compile_('"Outer Wear".season in {spring, autumn}')
+
+    assert contains.check(outfit(outer={11: "summer, Winter"}))
+    assert not contains.check(outfit(outer={11: "summer"}))
+    assert shares.check(outfit(outer={11: "winter,spring"}))
+    assert not shares.check(outfit(outer={11: "winter, summer"}))
+
+
+@pytest.mark.parametrize("definition, message", [
+    ("shoes.color = red", "Unknown slot"),
+    ("top.fabric = wool", "Unknown attribute"),
+    ("top.color", "Expected =, != or in"),
+    ("top.color = ", "Expected name"),
+    ("if top.color = red bottom.color = red", "Expected then"),
+    ("top.color in {red", "Expected }"),
+    ("(top.color = red", "Expected )"),
+    ("top.color = red red", "Unexpected"),
+    ("top.color = red!", "Unexpected character"),
+])
+def test_errors(definition, message):
+    with pytest.raises(RuleSyntaxError, match=re.escape(message)):
+        compile_(definition)
+
+
+def test_compile_rules_skips_invalid_definitions():
+    rules = compile_rules(["top.color = red", "shoes.color = red", "top.color ==", "bottom.color != top.color"],
+                          SLOTS, SLOT_ATTRS, ATTRIBUTES)
+
+    assert [rule.definition for rule in rules] == ["top.color = red", "bottom.color != top.color"]
@@ -0,0 +1,72 @@
+import itertools
+import random
+
+import numpy as np
+
+from models.scoring import OutfitScorer
+
+
+ATTRIBUTES = [{"attr_id": 10, "attr_name": "Color"}, {"attr_id": 20, "attr_name": "color"},
+              {"attr_id": 11, "attr_name": "Fit"}]
+
+
+def item(item_id, slot_id, worn=0, generated=0, values=None):
+    return {"item_id": item_id, "slot_id": slot_id, "times_worn": worn, "times_generated": generated,
+            "attr_values": values or {}}
+
+
+def scorer(slot_items, **kwargs):
+    return OutfitScorer(list(slot_items), slot_items, ATTRIBUTES, **kwargs)
+
+
+def test_top_k_matches_a_brute_force_sort():
+    rng = random.Random(11)
+    slot_items = {
+        slot_id: [item(slot_id * 100 + i, slot_id, rng.randint(0, 9), rng.randint(0, 9),
+                       {10 if slot_id == 1 else 20: rng.choice(["red", "blue", "black"])})
+                  for i in range(6)]
+        for slot_id in (1, 2, 3)
+    }
+    outfits = [list(combo) for combo in itertools.product(*slot_items.values())]
+    outfit_scorer = scorer(slot_items)
+    candidates = outfit_scorer.encode(outfits)
+    scores = outfit_scorer.score(candidates)
+
+    for k in (1, 5, len(outfits)):
+        best, best_scores = outfit_scorer.top_k(candidates, k)
+        assert list(best_scores) == sorted(scores, reverse=True)[:k]
+        assert np.allclose(scores[best], best_scores)
+        assert len(set(best)) == k
+
+
+def test_k_larger_than_n_and_no_candidates():
+    slot_items = {1: [item(1, 1), item(2, 1, worn=3)]}
+    outfit_scorer = scorer(slot_items)
+
+    best, scores = outfit_scorer.top_k(outfit_scorer.encode([[slot_items[1][0]], [slot_items[1][1]]]), 10)
+    assert list(best) == [0, 1] and len(scores) == 2
+
+    best, scores = outfit_scorer.top_k(outfit_scorer.encode([]), 3)
+    assert len(best) == 0 and len(scores) == 0
+    assert outfit_scorer.rank([], 3) == []
+
+
+def test_less_worn_and_less_generated_items_rank_higher():
+    worn = {1: [item(1, 1, worn=5), item(2, 1, worn=0), item(3, 1, worn=1)]}
+    assert [o[0]["item_id"] for o in scorer(worn).rank([[i] for i in worn[1]], 3)] == [2, 3, 1]
+
+    generated = {1: [item(1, 1, generated=0), item(2, 1, generated=4)]}
+    assert [o[0]["item_id"] for o in scorer(generated).rank([[i] for i in generated[1]], 2)] == [1, 2]
+
+
+def test_matching_shared_attributes_rank_higher():
+    # Color is attr 10 in one slot and attr 20 in the other; matched by name, case-insensitively
+    slot_items = {
+        1: [item(1, 1, values={10: "Navy", 11: "slim"})],
+        2: [item(2, 2, values={20: "red"}), item(3, 2, values={20: "navy"})],
+    }
+    outfits = [[slot_items[1][0], bottom] for bottom in slot_items[2]]
+
+    assert [o[1]["item_id"] for o in scorer(slot_items).rank(outfits, 2)] == [3, 2]
+    # A negative weight penalises matching instead
+    assert [o[1]["item_id"] for o in scorer(slot_items, attr_weights={"Color": -1}).rank(outfits, 2)] == [2, 3]
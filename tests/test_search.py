@@ -0,0 +1,64 @@
+def search(client, query):
+    response = client.get("/items/search?" + query)
+    assert response.status_code == 200
+    return sorted(response.get_json()["item_ids"])
+
+
+def test_search_repeated_params_match_any_value(client, wardrobe):
+    color = wardrobe["color"]["attr_id"]
+    shirt, striped, jeans = (item["item_id"] for item in wardrobe["items"])
+
+    assert search(client, f"attr_{color}=blue") == [shirt]
+    assert search(client, f"attr_{color}=blue&attr_{color}=black,+white") == sorted([shirt, striped])
+
+
+def test_search_value_with_comma_is_not_split(client, wardrobe):
+    color = wardrobe["color"]["attr_id"]
+    striped = wardrobe["items"][1]["item_id"]
+
+    assert search(client, f"attr_{color}=black,+white") == [striped]
+    assert search(client, f"attr_{color}=black") == []
+
+
+def test_search_multiple_value_attribute(client, wardrobe):
+    color, season = wardrobe["color"]["attr_id"], wardrobe["season"]["attr_id"]
+    shirt = wardrobe["items"][0]["item_id"]
+
+    assert search(client, f"attr_{season}=winter") == [shirt]
+    assert search(client, f"attr_{season}=winter&attr_{color}=black&match=any") == [shirt]
+
+
+def test_search_sees_writes_made_through_another_worker(client, wardrobe):
+    from models.auth import user_repository
+    from models.items import item_repository
+    user_id = wardrobe["slots"][0]["user_id"]
+    color = wardrobe["color"]["attr_id"]
+    shirt = wardrobe["items"][0]["item_id"]
+
+    assert search(client, f"attr_{color}=blue") == [shirt]
+
+    # Another worker adds a blue item and deletes the shirt; this worker's index is not told
+    polo = item_repository.create(user_id, "Polo", wardrobe["slots"][0]["slot_id"])
+    item_repository.add_values([{"user_id": user_id, "item_id": polo["item_id"], "attr_id": color, "value": "blue"}])
+    item_repository.delete(user_id, shirt)
+    version = user_repository.bump_wardrobe_version(user_id)
+    with client.session_transaction() as session:
+        session["wardrobe_version"] = [user_id, version]
+
+    assert search(client, f"attr_{color}=blue") == [polo["item_id"]]
+
+
+def test_search_index_kept_through_own_writes(client, wardrobe):
+    from models.wardrobe import cached_search_index
+    user_id = wardrobe["slots"][0]["user_id"]
+    color = wardrobe["color"]["attr_id"]
+    shirt = wardrobe["items"][0]["item_id"]
+
+    search(client, f"attr_{color}=blue")
+    index = cached_search_index(user_id)
+    response = client.post(f"/items/edit/{shirt}", data={"item_name": "Shirt", f"attr_{color}": "black"})
+    assert response.status_code == 302
+
+    # Updated in place rather than rebuilt
+    assert search(client, f"attr_{color}=black") == [shirt]
+    assert cached_search_index(user_id) is index
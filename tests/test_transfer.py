@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+
+import pytest
+
+from models import transfer
+from models.items import item_repository
+
+
+def export(client, fmt):
+    with client.get(f"/items/export?format={fmt}") as response:
+        assert response.status_code == 200
+        assert response.headers["Content-Disposition"] == f"attachment; filename=wardrobe-items.{fmt}"
+        return response.get_data(as_text=True)
+
+
+def upload(client, body, filename):
+    response = client.post("/items/import", data={"file": (io.BytesIO(body.encode()), filename)},
+                           content_type="multipart/form-data")
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def without_ids(text, fmt):
+    if fmt == "csv":
+        rows = list(csv.DictReader(io.StringIO(text)))
+    else:
+        rows = [json.loads(line) for line in text.splitlines()]
+    for row in rows:
+        del row["item_id"]
+    return rows
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_export_import_round_trip(client, wardrobe, monkeypatch, fmt):
+    # Small pages and batches, so paging and batching are both exercised
+    monkeypatch.setattr(transfer, "EXPORT_PAGE_SIZE", 2)
+    monkeypatch.setattr(transfer, "IMPORT_BATCH_SIZE", 2)
+    user_id = wardrobe["slots"][0]["user_id"]
+
+    exported = export(client, fmt)
+    item_repository.delete_many(user_id, [item["item_id"] for item in wardrobe["items"]])
+    assert without_ids(export(client, fmt), fmt) == []
+
+    report = upload(client, exported, f"items.{fmt}")
+    assert report == {"imported": 3, "error_count": 0, "errors": [], "errors_truncated": False}
+    assert without_ids(export(client, fmt), fmt) == without_ids(exported, fmt)
+
+
+def test_export_csv_columns(client, wardrobe):
+    rows = list(csv.DictReader(io.StringIO(export(client, "csv"))))
+
+    assert list(rows[0]) == ["item_id", "slot", "item_name", "Color", "Season"]
+    assert [(row["slot"], row["item_name"], row["Color"], row["Season"]) for row in rows] == [
+        ("Top", "Shirt", "blue", "summer, winter"),
+        ("Top", "Striped shirt", "black, white", ""),
+        ("Bottom", "Jeans", "", ""),
+    ]
+
+
+def test_import_reports_invalid_rows(client, wardrobe):
+    body = "\n".join([
+        json.dumps({"slot": "top", "item_name": "Polo", "attributes": {"color": "BLUE", "Season": "Winter,summer"}}),
+        json.dumps({"slot": "Hats", "item_name": "Cap"}),
+        json.dumps({"slot": "Top", "item_name": ""}),
+        json.dumps({"slot": "Top", "item_name": "Tee", "attributes": {"Color": "green"}}),
+        json.dumps({"slot": "Top", "item_name": "Vest", "attributes": {"Fabric": "wool"}}),
+        "not json",
+    ]) + "\n"
+
+    report = upload(client, body, "items.jsonl")
+    assert report["imported"] == 1
+    assert [error["row"] for error in report["errors"]] == [2, 3, 4, 5, 6]
+
+    rows = without_ids(export(client, "jsonl"), "jsonl")
+    assert rows[-1] == {"slot": "Top", "item_name": "Polo",
+                        "attributes": {"Color": "blue", "Season": "winter, summer"}}
+
+
+def test_import_unknown_format(client, wardrobe):
+    response = client.post("/items/import?format=xlsx", data="x")
+    assert response.status_code == 400
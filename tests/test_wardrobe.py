@@ -0,0 +1,105 @@
+import copy
+
+from models.wardrobe import assemble_items_page
+
+
+def nested_scan(slots, all_attributes, attr_slots, items, attr_items):
+    """The items page as list_items assembled it before assemble_items_page."""
+    slot_attrs = {}
+    for slot in slots:
+        slot_attr_relations = [as_rel for as_rel in attr_slots if as_rel["slot_id"] == slot["slot_id"]]
+        slot_attr_relations.sort(key=lambda x: x["order_index"])
+        slot_attributes = []
+        for as_rel in slot_attr_relations:
+            attr = next((a for a in all_attributes if a["attr_id"] == as_rel["attr_id"]), None)
+            if attr:
+                slot_attributes.append(attr)
+        slot_attrs[slot["slot_id"]] = slot_attributes
+
+    slot_items = {}
+    for slot in slots:
+        slot_item_list = [item for item in items if item["slot_id"] == slot["slot_id"]]
+        for item in slot_item_list:
+            item["attr_values"] = {}
+            item_attrs = [ai for ai in attr_items if ai["item_id"] == item["item_id"]]
+            for ai in item_attrs:
+                item["attr_values"][ai["attr_id"]] = ai["value"]
+        slot_items[slot["slot_id"]] = slot_item_list
+    return slot_attrs, slot_items
+
+
+def wardrobe_rows():
+    slots = [
+        {"slot_id": 1, "slot_name": "Top", "order_index": 1},
+        {"slot_id": 2, "slot_name": "Bottom", "order_index": 2},
+        {"slot_id": 3, "slot_name": "Empty", "order_index": 3},       # no items, no attributes
+    ]
+    attributes = [
+        {"attr_id": 10, "attr_name": "Color"},
+        {"attr_id": 11, "attr_name": "Season"},
+        {"attr_id": 12, "attr_name": "Unlinked"},                     # in no slot
+    ]
+    attr_slots = [
+        # Out of order, to check the sort by order_index
+        {"attr_id": 11, "slot_id": 1, "order_index": 2},
+        {"attr_id": 10, "slot_id": 1, "order_index": 1},
+        {"attr_id": 10, "slot_id": 2, "order_index": 1},
+        {"attr_id": 99, "slot_id": 2, "order_index": 2},              # attribute that no longer exists
+    ]
+    items = [
+        {"item_id": 100, "item_name": "Shirt", "slot_id": 1},
+        {"item_id": 101, "item_name": "Plain tee", "slot_id": 1},     # no attribute values
+        {"item_id": 102, "item_name": "Jeans", "slot_id": 2},
+        {"item_id": 103, "item_name": "Orphan", "slot_id": 4},        # slot that no longer exists
+    ]
+    attr_items = [
+        {"item_id": 100, "attr_id": 10, "value": "blue"},
+        {"item_id": 100, "attr_id": 11, "value": "summer, spring"},
+        {"item_id": 102, "attr_id": 10, "value": "black"},
+        {"item_id": 103, "attr_id": 10, "value": "red"},
+    ]
+    return slots, attributes, attr_slots, items, attr_items
+
+
+def test_assemble_items_page_matches_nested_scan():
+    rows = wardrobe_rows()
+    assert assemble_items_page(*copy.deepcopy(rows)) == nested_scan(*copy.deepcopy(rows))
+
+
+def test_assemble_items_page_empty_slots_and_items_without_values():
+    slot_attrs, slot_items = assemble_items_page(*wardrobe_rows())
+
+    assert slot_attrs[3] == [] and slot_items[3] == []
+    assert [attr["attr_id"] for attr in slot_attrs[1]] == [10, 11]
+    assert [attr["attr_id"] for attr in slot_attrs[2]] == [10]
+    assert {item["item_id"]: item["attr_values"] for item in slot_items[1]} == {
+        100: {10: "blue", 11: "summer, spring"},
+        101: {},
+    }
+    assert 4 not in slot_items
+
+
+def test_assemble_items_page_empty_wardrobe():
+    assert assemble_items_page([], [], [], [], []) == nested_scan([], [], [], [], [])
+
+
+def test_load_slot_page_covers_every_item_once(wardrobe):
+    from models.items import item_repository
+    from models.wardrobe import load_slot_page
+
+    user_id = wardrobe["slots"][0]["user_id"]
+    top = wardrobe["slots"][0]["slot_id"]
+    item_repository.create_many([{"user_id": user_id, "item_name": f"Tee {i}", "slot_id": top} for i in range(5)])
+
+    pages, after = [], None
+    while True:
+        items, after = load_slot_page(user_id, top, after, limit=3)
+        pages.append([item["item_name"] for item in items])
+        if after is None:
+            break
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    names = [name for page in pages for name in page]
+    assert names == ["Shirt", "Striped shirt"] + [f"Tee {i}" for i in range(5)]
+    assert load_slot_page(user_id, top, limit=3)[0][0]["attr_values"] == {
+        wardrobe["color"]["attr_id"]: "blue", wardrobe["season"]["attr_id"]: "summer, winter"}
@@ -1,13 +1,37 @@
-from flask import Flask, render_template, request, redirect, session, flash
+from functools import partial
+from flask import (Flask, render_template, stream_template, stream_with_context, request, redirect, session,
+                   flash, jsonify, make_response, g)
 from werkzeug.security import generate_password_hash, check_password_hash
-from supabase_client import supabase
+from models.wardrobe import (load_slot_page, load_summary, load_slot_schema,
+                             load_item_for_edit, invalidate_schema, load_default_template,
+                             form_attr_values, get_schema, invalidate_rules,
+                             get_search_index, cached_search_index, invalidate_items, warm_caches)
+from models.auth import user_repository
+from models.attributes import slot_repository, attribute_repository
+from models.items import item_repository
+from models.rules import rule_repository
+from models.outfits import outfit_repository
+from models.concurrency import run_parallel, iter_parallel
+from models.ordering import order_index_for_insert
+from models.rule_engine import compile_rule, RuleSyntaxError
+from models.pregen import outfit_pool, generate_outfits
+from models.metrics import init_metrics
+from models.transfer import TRANSFER_FORMATS, export_items, import_items
+from models.pages import versioned_page, current_version, bump_version, render_fragment
 import os
 
 app = Flask(__name__)
 app.secret_key = os.environ["SECRET_KEY"]
 
+# Query counts, latency histograms and render times on /metrics
+init_metrics(app)
+
 DEFAULT_USER_EMAIL = "DEFAULT_DEFAULT"
 
+# Warm-up of a new worker's caches; read by post_worker_init in gunicorn.conf.py
+WARM_CACHES = os.environ.get("WARM_CACHES", "False") == "True"
+WARM_SCHEMA_USERS = int(os.environ.get("WARM_SCHEMA_USERS", 0))
+
 
 # -------------------------------------------------------
 # HELPER FUNCTION TO COPY DEFAULT DATA
@@ -15,70 +39,66 @@ DEFAULT_USER_EMAIL = "DEFAULT_DEFAULT"
 
 def copy_default_data_to_user(new_user_id):
     """
-    Copies slots, attributes, and attribute-slot relationships from the default template user
-    to a newly registered user.
+    Copies slots, attributes, attribute-slot relationships and rules from the default
+    template user to a newly registered user.
+
+    Each table is cloned with one multi-row insert (PostgREST returns the new rows in
+    insertion order, which gives the old -> new id mappings), so signup costs the same
+    number of round trips however large the template is.
     """
     try:
-        # Get the default user
-        default_user = supabase.table("users").select("*").eq("email", DEFAULT_USER_EMAIL).execute().data
-        if not default_user:
+        # Get the default template (cached in-process)
+        template = load_default_template(DEFAULT_USER_EMAIL)
+        if template is None:
             print("No default template user found. Skipping default data copy.")
             return
         
-        default_user_id = default_user[0]["id"]
-        
-        # 1. Copy Slots
-        default_slots = supabase.table("slots").select("*").eq("user_id", default_user_id).execute().data
-        slot_id_mapping = {}  # Maps old slot_id to new slot_id
+        default_slots = template["slots"]
+        default_attributes = template["attributes"]
         
-        for slot in default_slots:
-            new_slot = supabase.table("slots").insert({
+        # 1 + 2. Copy Slots and Attributes (independent, so sent together)
+        inserts = {}
+        if default_slots:
+            inserts["slots"] = partial(slot_repository.create_many, [{
                 "user_id": new_user_id,
                 "slot_name": slot["slot_name"],
                 "order_index": slot["order_index"]
-            }).execute()
-            
-            slot_id_mapping[slot["slot_id"]] = new_slot.data[0]["slot_id"]
-        
-        # 2. Copy Attributes
-        default_attributes = supabase.table("attributes").select("*").eq("user_id", default_user_id).execute().data
-        attr_id_mapping = {}  # Maps old attr_id to new attr_id
-        
-        for attr in default_attributes:
-            new_attr = supabase.table("attributes").insert({
+            } for slot in default_slots])
+        if default_attributes:
+            inserts["attributes"] = partial(attribute_repository.create_many, [{
                 "user_id": new_user_id,
                 "attr_name": attr["attr_name"],
                 "attr_type": attr["attr_type"],
                 "attr_possiblevals": attr["attr_possiblevals"],
                 "allow_multiple": attr["allow_multiple"]
-            }).execute()
-            
-            attr_id_mapping[attr["attr_id"]] = new_attr.data[0]["attr_id"]
-        
-        # 3. Copy Attribute-Slot relationships
-        default_attr_slots = supabase.table("attr_slots").select("*").eq("user_id", default_user_id).execute().data
+            } for attr in default_attributes])
+        created = run_parallel(inserts)
         
-        for attr_slot in default_attr_slots:
-            old_slot_id = attr_slot["slot_id"]
-            old_attr_id = attr_slot["attr_id"]
-            
-            # Only copy if both the slot and attribute were successfully copied
-            if old_slot_id in slot_id_mapping and old_attr_id in attr_id_mapping:
-                supabase.table("attr_slots").insert({
-                    "user_id": new_user_id,
-                    "attr_id": attr_id_mapping[old_attr_id],
-                    "slot_id": slot_id_mapping[old_slot_id],
-                    "order_index": attr_slot["order_index"]
-                }).execute()
+        # Maps old slot_id / attr_id to the new ones
+        slot_id_mapping = {old["slot_id"]: new["slot_id"]
+                           for old, new in zip(default_slots, created.get("slots", []))}
+        attr_id_mapping = {old["attr_id"]: new["attr_id"]
+                           for old, new in zip(default_attributes, created.get("attributes", []))}
         
-        # 4. Copy Rules (if any)
-        default_rules = supabase.table("rules").select("*").eq("user_id", default_user_id).execute().data
+        # 3 + 4. Copy Attribute-Slot relationships and Rules
+        # Only copy relationships whose slot and attribute were both copied
+        new_attr_slots = [{
+            "user_id": new_user_id,
+            "attr_id": attr_id_mapping[attr_slot["attr_id"]],
+            "slot_id": slot_id_mapping[attr_slot["slot_id"]],
+            "order_index": attr_slot["order_index"]
+        } for attr_slot in template["attr_slots"]
+            if attr_slot["slot_id"] in slot_id_mapping and attr_slot["attr_id"] in attr_id_mapping]
         
-        for rule in default_rules:
-            supabase.table("rules").insert({
+        inserts = {}
+        if new_attr_slots:
+            inserts["attr_slots"] = partial(attribute_repository.create_links, new_attr_slots)
+        if template["rules"]:
+            inserts["rules"] = partial(rule_repository.create_many, [{
                 "user_id": new_user_id,
                 "rule_definition": rule["rule_definition"]
-            }).execute()
+            } for rule in template["rules"]])
+        run_parallel(inserts)
         
         print(f"Successfully copied default data to user {new_user_id}")
         
@@ -86,6 +106,25 @@ def copy_default_data_to_user(new_user_id):
         print(f"Error copying default data: {str(e)}")
         # Don't fail signup if default data copy fails
 
+# -------------------------------------------------------
+# WORKER WARM-UP
+# -------------------------------------------------------
+
+def warm_up():
+    """
+    Opens this process's database connection and fills the default template
+    cache, plus the schema and rule caches of the WARM_SCHEMA_USERS newest
+    users. post_worker_init in gunicorn.conf.py calls this in every new
+    worker when WARM_CACHES is True.
+    """
+    try:
+        user_ids = user_repository.recent_ids(WARM_SCHEMA_USERS, DEFAULT_USER_EMAIL) if WARM_SCHEMA_USERS else []
+        warm_caches(DEFAULT_USER_EMAIL, user_ids)
+        print(f"Warmed caches for the default template and {len(user_ids)} users")
+    except Exception as e:
+        print(f"Error warming caches: {str(e)}")
+        # Don't fail worker boot; the caches fill on demand instead
+
 # -------------------------------------------------------
 # AUTH
 # -------------------------------------------------------
@@ -115,12 +154,9 @@ def signup():
         # ---------------------------
         # Check if email already exists
         # ---------------------------
-        existing = supabase.table("users") \
-            .select("user_id") \
-            .eq("email", email) \
-            .execute()
+        existing = user_repository.find_by_email(email, "user_id")
 
-        if existing.data:
+        if existing:
             flash("An account with that email already exists.")
             return render_template("signup.html")
 
@@ -129,15 +165,10 @@ def signup():
         # ---------------------------
         hashed = generate_password_hash(password)
 
-        new_user = supabase.table("users").insert({
-            "email": email,
-            "password_hash": hashed,
-            "first_name": first,
-            "last_name": last
-        }).execute()
+        user = user_repository.create(email, hashed, first, last)
 
-        # Insert returns a list with the created row
-        user = new_user.data[0]
+        # Give the new account the default slots, attributes and rules
+        copy_default_data_to_user(user["user_id"])
 
         # ---------------------------
         # Start session
@@ -159,13 +190,11 @@ def login():
         email = request.form["email"]
         password = request.form["password"]
 
-        result = supabase.table("users").select("*").eq("email", email).execute()
-        if not result.data:
+        user = user_repository.find_by_email(email)
+        if not user:
             flash("User not found!")
             return render_template("login.html")
 
-        user = result.data[0]
-
         if not check_password_hash(user["password_hash"], password):
             flash("Incorrect password!")
             return render_template("login.html")
@@ -187,6 +216,7 @@ def logout():
 # -------------------------------------------------------
 
 @app.route("/wardrobe")
+@versioned_page("wardrobe")
 def wardrobe_home():
     if "user_id" not in session:
         return redirect("/login")
@@ -194,24 +224,22 @@ def wardrobe_home():
     user_id = session["user_id"]
 
     try:
-        items = supabase.table("items").select("*").eq("user_id", user_id).execute().data
-        attributes = supabase.table("attributes").select("*").eq("user_id", user_id).execute().data
-        rules = supabase.table("rules").select("*").eq("user_id", user_id).execute().data
+        summary = load_summary(user_id)
 
         return render_template(
             "wardrobe.html",
-            items=items,
-            attributes=attributes,
-            rules=rules
+            item_count=summary["items"],
+            attribute_count=summary["attributes"],
+            rule_count=summary["rules"]
         )
     except Exception as e:
         print(f"Error in wardrobe_home: {str(e)}")
         flash(f"Error loading wardrobe: {str(e)}")
         return render_template(
             "wardrobe.html",
-            items=[],
-            attributes=[],
-            rules=[]
+            item_count=0,
+            attribute_count=0,
+            rule_count=0
         )
 
 
@@ -228,23 +256,21 @@ def add_slot():
 
     if request.method == "POST":
         slot_name = request.form.get("slot_name", "").strip()
-        order_index = int(request.form.get("order_index", 0))
+        position = int(request.form.get("order_index", 0))
 
         if not slot_name:
             flash("Slot name is required.")
             return redirect(request.referrer)
 
-        # Shift existing slots at or after this order_index
-        existing_slots = supabase.table("slots").select("*").eq("user_id", user_id).gte("order_index", order_index).execute().data
-        for slot in existing_slots:
-            supabase.table("slots").update({"order_index": slot["order_index"] + 1}).eq("slot_id", slot["slot_id"]).execute()
+        # Pick a sparse order key between the neighbouring slots
+        existing_slots = slot_repository.list_ordered(user_id)
+        order_index = order_index_for_insert("slots", "slot_id", existing_slots, position)
 
         # Insert new slot
-        supabase.table("slots").insert({
-            "user_id": user_id,
-            "slot_name": slot_name,
-            "order_index": order_index
-        }).execute()
+        slot_repository.create(user_id, slot_name, order_index)
+        invalidate_schema(user_id)
+        outfit_pool.invalidate(user_id)
+        bump_version(user_id)
 
         return redirect("/items")
 
@@ -266,15 +292,18 @@ def edit_slot(slot_id):
             flash("Slot name is required.")
             return redirect(request.referrer)
 
-        supabase.table("slots").update({"slot_name": slot_name}).eq("slot_id", slot_id).eq("user_id", user_id).execute()
+        slot_repository.rename(user_id, slot_id, slot_name)
+        invalidate_schema(user_id)
+        outfit_pool.invalidate(user_id)
+        bump_version(user_id)
         return redirect("/items")
 
-    slot = supabase.table("slots").select("*").eq("slot_id", slot_id).eq("user_id", user_id).execute().data
+    slot, _ = load_slot_schema(user_id, slot_id)
     if not slot:
         flash("Slot not found.")
         return redirect("/items")
 
-    return render_template("edit_slot.html", slot=slot[0])
+    return render_template("edit_slot.html", slot=slot)
 
 
 @app.route("/slots/delete/<slot_id>", methods=["POST"])
@@ -284,18 +313,12 @@ def delete_slot(slot_id):
     
     user_id = session["user_id"]
     
-    # Get the slot to find its order_index
-    slot = supabase.table("slots").select("*").eq("slot_id", slot_id).eq("user_id", user_id).execute().data
-    if slot:
-        order_index = slot[0]["order_index"]
-        
-        # Delete the slot (cascade will handle items, attr_slots, etc.)
-        supabase.table("slots").delete().eq("slot_id", slot_id).eq("user_id", user_id).execute()
-        
-        # Shift down slots that come after
-        later_slots = supabase.table("slots").select("*").eq("user_id", user_id).gt("order_index", order_index).execute().data
-        for s in later_slots:
-            supabase.table("slots").update({"order_index": s["order_index"] - 1}).eq("slot_id", s["slot_id"]).execute()
+    # Delete the slot (cascade will handle items, attr_slots, etc.)
+    # order_index keys are sparse, so later slots do not need shifting
+    slot_repository.delete(user_id, slot_id)
+    invalidate_schema(user_id)
+    outfit_pool.invalidate(user_id)
+    bump_version(user_id)
 
     return redirect("/items")
 
@@ -305,6 +328,7 @@ def delete_slot(slot_id):
 # -------------------------------------------------------
 
 @app.route("/items")
+@versioned_page("items")
 def list_items():
     if "user_id" not in session:
         return redirect("/login")
@@ -312,63 +336,87 @@ def list_items():
     user_id = session["user_id"]
     
     try:
-        # Fetch all slots for this user, ordered by order_index
-        slots = supabase.table("slots").select("*").eq("user_id", user_id).order("order_index").execute().data
-        
-        # Fetch all attributes
-        all_attributes = supabase.table("attributes").select("*").eq("user_id", user_id).execute().data
-        
-        # Fetch all attribute-slot relationships
-        attr_slots = supabase.table("attr_slots").select("*").eq("user_id", user_id).execute().data
-        
-        # Fetch all items
-        items = supabase.table("items").select("*").eq("user_id", user_id).execute().data
+        # Slots and their attributes come from the schema cache; items are
+        # fetched per slot, one page each, while the page streams
+        schema = get_schema(user_id)
+        slots = schema["slots"]
         
-        # Fetch all item attribute values
-        attr_items = supabase.table("attr_items").select("*").eq("user_id", user_id).execute().data
-        
-        # Organize attributes by slot
-        slot_attrs = {}
-        for slot in slots:
-            # Get attr_slots for this slot, ordered by order_index
-            slot_attr_relations = [as_rel for as_rel in attr_slots if as_rel["slot_id"] == slot["slot_id"]]
-            slot_attr_relations.sort(key=lambda x: x["order_index"])
-            
-            # Get the actual attribute objects
-            slot_attributes = []
-            for as_rel in slot_attr_relations:
-                attr = next((a for a in all_attributes if a["attr_id"] == as_rel["attr_id"]), None)
-                if attr:
-                    slot_attributes.append(attr)
-            
-            slot_attrs[slot["slot_id"]] = slot_attributes
-        
-        # Organize items by slot with their attribute values
-        slot_items = {}
-        for slot in slots:
-            slot_item_list = [item for item in items if item["slot_id"] == slot["slot_id"]]
-            
-            # For each item, get its attribute values
-            for item in slot_item_list:
-                item["attr_values"] = {}
-                item_attrs = [ai for ai in attr_items if ai["item_id"] == item["item_id"]]
-                for ai in item_attrs:
-                    item["attr_values"][ai["attr_id"]] = ai["value"]
-            
-            slot_items[slot["slot_id"]] = slot_item_list
-        
-        return render_template("items.html", 
-                             slots=slots, 
-                             slot_attrs=slot_attrs,
-                             slot_items=slot_items)
+        return stream_template("items.html",
+                               slots=slots,
+                               slot_sections=slot_sections(user_id, slots, schema["slot_attrs"]))
     except Exception as e:
         # Log the error and show a friendly message
         print(f"Error in list_items: {str(e)}")
         flash(f"Error loading items: {str(e)}")
         return render_template("items.html", 
                              slots=[], 
-                             slot_attrs={},
-                             slot_items={})
+                             slot_sections=[])
+
+
+def slot_sections(user_id, slots, slot_attrs):
+    """
+    Returns an iterator of (slot, html) for items.html in slot order. The
+    first page of every slot is requested here, while the view runs, so the
+    queries carry the request's context (and its metrics) into the pool;
+    each slot is rendered as soon as its page arrives, so the browser paints
+    the first slots while later ones are still loading.
+    """
+    pages = iter_parallel({
+        slot["slot_id"]: partial(load_first_page, user_id, slot["slot_id"]) for slot in slots
+    })
+    return _render_slot_sections(user_id, slots, slot_attrs, pages)
+
+
+def _render_slot_sections(user_id, slots, slot_attrs, pages):
+    for slot, (slot_id, (items, next_after, error)) in zip(slots, pages):
+        if error:
+            g.page_incomplete = True
+        # Cached per slot; only slots whose data changed are re-rendered
+        yield slot, render_fragment("_slot.html", user_id, slot_id, {
+            "slot": slot,
+            "slot_attributes": slot_attrs.get(slot_id, []),
+            "items": items,
+            "next_after": next_after,
+            "load_error": error
+        })
+
+
+def load_first_page(user_id, slot_id):
+    """Returns (items, next_after, error) for the first page of a slot."""
+    try:
+        items, next_after = load_slot_page(user_id, slot_id)
+        return items, next_after, None
+    except Exception as e:
+        print(f"Error loading items of slot {slot_id}: {str(e)}")
+        return [], None, "Could not load the items of this slot."
+
+
+@app.route("/items/slot/<slot_id>")
+def slot_items_page(slot_id):
+    """
+    The next page of a slot's item rows, after the item_id in ?after=, for
+    the "Load more items" button. The cursor of the page after that is in
+    the X-Next-After header (empty on the last page).
+    """
+    if "user_id" not in session:
+        return "Not logged in.", 401
+    
+    user_id = session["user_id"]
+    after = request.args.get("after", type=int)
+
+    slot, attributes = load_slot_schema(user_id, slot_id)
+    if not slot:
+        return "Slot not found.", 404
+
+    try:
+        items, next_after = load_slot_page(user_id, slot["slot_id"], after)
+    except Exception as e:
+        print(f"Error in slot_items_page: {str(e)}")
+        return f"Error loading items: {str(e)}", 500
+
+    response = make_response(render_template("_slot_rows.html", slot=slot, slot_attributes=attributes, items=items))
+    response.headers["X-Next-After"] = "" if next_after is None else str(next_after)
+    return response
 
 
 @app.route("/items/new", methods=["GET", "POST"])
@@ -388,46 +436,26 @@ def add_item():
             return redirect(request.referrer)
 
         # Create the item
-        new_item = supabase.table("items").insert({
-            "user_id": user_id,
-            "item_name": item_name,
-            "slot_id": slot_id,
-            "times_generated": 0,
-            "times_worn": 0
-        }).execute()
-
-        item_id = new_item.data[0]["item_id"]
-
-        # Add attribute values
-        for key, value in request.form.items():
-            if key.startswith("attr_"):
-                attr_id = key.replace("attr_", "")
-                if value.strip():  # Only insert if value is not empty
-                    supabase.table("attr_items").insert({
-                        "user_id": user_id,
-                        "attr_id": attr_id,
-                        "item_id": item_id,
-                        "value": value.strip()
-                    }).execute()
+        item_id = item_repository.create(user_id, item_name, slot_id)["item_id"]
+
+        # Add attribute values (one batched write)
+        values = form_attr_values(request.form)
+        item_repository.save_values(user_id, item_id, values)
+
+        index = cached_search_index(user_id)
+        if index:
+            index.add_item(item_id, slot_id, values)
+        bump_version(user_id)
 
         return redirect("/items")
 
-    # Fetch slot info
-    slot = supabase.table("slots").select("*").eq("slot_id", slot_id).eq("user_id", user_id).execute().data
+    # Fetch slot info and its attributes
+    slot, attributes = load_slot_schema(user_id, slot_id)
     if not slot:
         flash("Slot not found.")
         return redirect("/items")
 
-    # Fetch attributes for this slot
-    attr_slots = supabase.table("attr_slots").select("*").eq("slot_id", slot_id).eq("user_id", user_id).order("order_index").execute().data
-    
-    attributes = []
-    for as_rel in attr_slots:
-        attr = supabase.table("attributes").select("*").eq("attr_id", as_rel["attr_id"]).execute().data
-        if attr:
-            attributes.append(attr[0])
-
-    return render_template("add_item.html", slot=slot[0], attributes=attributes)
+    return render_template("add_item.html", slot=slot, attributes=attributes)
 
 
 @app.route("/items/edit/<item_id>", methods=["GET", "POST"])
@@ -444,51 +472,36 @@ def edit_item(item_id):
             flash("Item name is required.")
             return redirect(request.referrer)
 
-        # Update item name
-        supabase.table("items").update({"item_name": item_name}).eq("item_id", item_id).eq("user_id", user_id).execute()
-
-        # Update attribute values
-        # First, delete existing attr_items for this item
-        supabase.table("attr_items").delete().eq("item_id", item_id).eq("user_id", user_id).execute()
-
-        # Then insert new values
-        for key, value in request.form.items():
-            if key.startswith("attr_"):
-                attr_id = key.replace("attr_", "")
-                if value.strip():
-                    supabase.table("attr_items").insert({
-                        "user_id": user_id,
-                        "attr_id": attr_id,
-                        "item_id": item_id,
-                        "value": value.strip()
-                    }).execute()
+        # Update item name and read the stored attribute values together
+        result = run_parallel({
+            "item": partial(item_repository.rename, user_id, item_id, item_name),
+            "stored": partial(item_repository.values, user_id, item_id),
+        })
+        if not result["item"]:
+            flash("Item not found.")
+            return redirect("/items")
+
+        # Write only the attribute values that changed
+        values = form_attr_values(request.form)
+        item_repository.save_values(user_id, item_id, values, result["stored"])
+
+        index = cached_search_index(user_id)
+        if index:
+            index.update_item(item_id, values)
+
+        # Re-check only the queued outfits that contain this item
+        version = bump_version(user_id)
+        outfit_pool.item_changed(user_id, item_id, item_name, values, version)
 
         return redirect("/items")
 
-    # Fetch item
-    item = supabase.table("items").select("*").eq("item_id", item_id).eq("user_id", user_id).execute().data
-    if not item:
+    # Fetch item, its slot, the slot's attributes and the current values
+    loaded = load_item_for_edit(user_id, item_id)
+    if not loaded:
         flash("Item not found.")
         return redirect("/items")
     
-    item = item[0]
-    slot_id = item["slot_id"]
-
-    # Fetch slot
-    slot = supabase.table("slots").select("*").eq("slot_id", slot_id).execute().data[0]
-
-    # Fetch attributes for this slot
-    attr_slots = supabase.table("attr_slots").select("*").eq("slot_id", slot_id).eq("user_id", user_id).order("order_index").execute().data
-    
-    attributes = []
-    for as_rel in attr_slots:
-        attr = supabase.table("attributes").select("*").eq("attr_id", as_rel["attr_id"]).execute().data
-        if attr:
-            attributes.append(attr[0])
-
-    # Fetch current attribute values
-    attr_items = supabase.table("attr_items").select("*").eq("item_id", item_id).eq("user_id", user_id).execute().data
-    attr_values = {ai["attr_id"]: ai["value"] for ai in attr_items}
+    item, slot, attributes, attr_values = loaded
 
     return render_template("edit_item.html", item=item, slot=slot, attributes=attributes, attr_values=attr_values)
 
@@ -499,10 +512,112 @@ def delete_item(item_id):
         return redirect("/login")
     
     user_id = session["user_id"]
-    supabase.table("items").delete().eq("item_id", item_id).eq("user_id", user_id).execute()
+    item_repository.delete(user_id, item_id)
+
+    index = cached_search_index(user_id)
+    if index:
+        index.remove_item(item_id)
+    outfit_pool.item_removed(user_id, item_id, bump_version(user_id))
     return redirect("/items")
 
 
+@app.route("/items/search")
+def search_items():
+    """
+    Finds items by attribute values, e.g.
+        /items/search?slot_id=3&attr_5=blue&attr_9=summer&attr_9=spring
+    An attribute matches any of the values given for its attr_<id> parameter
+    (repeat the parameter for several; values are not split on commas, so a
+    value may contain one). The attributes are combined with AND, or with OR
+    when match=any.
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Not logged in."}), 401
+    
+    user_id = session["user_id"]
+    slot_id = request.args.get("slot_id")
+    match = "any" if request.args.get("match") == "any" else "all"
+
+    clauses = []
+    for key in request.args:
+        if key.startswith("attr_"):
+            values = [value for value in request.args.getlist(key) if value.strip()]
+            if values:
+                clauses.append((key.replace("attr_", ""), values))
+
+    try:
+        # Drops this worker's index if another worker's write made it stale
+        current_version(user_id)
+        item_ids = get_search_index(user_id).query(clauses, slot_id=slot_id, match=match)
+        return jsonify({"item_ids": item_ids, "count": len(item_ids)})
+    except Exception as e:
+        print(f"Error in search_items: {str(e)}")
+        return jsonify({"error": f"Error searching items: {str(e)}"}), 500
+
+
+# -------------------------------------------------------
+# IMPORT / EXPORT
+# -------------------------------------------------------
+
+@app.route("/items/export")
+def export_items_file():
+    """
+    Downloads every item with its attribute values, as CSV (one column per
+    attribute name) or, with ?format=jsonl, one JSON object per line. The
+    file is streamed page by page.
+    """
+    if "user_id" not in session:
+        return redirect("/login")
+    
+    user_id = session["user_id"]
+    fmt = request.args.get("format", "csv")
+    if fmt not in TRANSFER_FORMATS:
+        return jsonify({"error": f"Unknown format {fmt!r}."}), 400
+
+    try:
+        chunks = export_items(user_id, fmt)
+    except Exception as e:
+        print(f"Error in export_items_file: {str(e)}")
+        return jsonify({"error": f"Error exporting items: {str(e)}"}), 500
+
+    response = app.response_class(stream_with_context(chunks),
+                                  mimetype="text/csv" if fmt == "csv" else "application/x-ndjson")
+    response.headers["Content-Disposition"] = f"attachment; filename=wardrobe-items.{fmt}"
+    return response
+
+
+@app.route("/items/import", methods=["POST"])
+def import_items_file():
+    """
+    Creates items from an uploaded CSV or JSONL file (the export's format;
+    item_id is ignored), sent as the "file" field or as the request body.
+    Returns a JSON report of the rows imported and the rows rejected.
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Not logged in."}), 401
+    
+    user_id = session["user_id"]
+    upload = request.files.get("file")
+    filename = upload.filename if upload and upload.filename else ""
+    extension = filename.rpartition(".")[2].lower() if "." in filename else ""
+    fmt = request.args.get("format") or request.form.get("format") or extension or "csv"
+    if fmt not in TRANSFER_FORMATS:
+        return jsonify({"error": f"Unknown format {fmt!r}."}), 400
+
+    try:
+        report = import_items(user_id, upload.stream if upload else request.stream, fmt)
+    except Exception as e:
+        print(f"Error in import_items_file: {str(e)}")
+        return jsonify({"error": f"Error importing items: {str(e)}"}), 500
+
+    if report.imported:
+        invalidate_items(user_id)
+        outfit_pool.invalidate(user_id)
+        bump_version(user_id)
+
+    return jsonify(report.as_dict())
+
+
 # -------------------------------------------------------
 # ATTRIBUTE DEFINITIONS
 # -------------------------------------------------------
@@ -513,7 +628,7 @@ def list_attributes():
         return redirect("/login")
     
     user_id = session["user_id"]
-    attrs = supabase.table("attributes").select("*").eq("user_id", user_id).execute().data
+    attrs = attribute_repository.list_for_user(user_id)
     return render_template("attributes.html", attributes=attrs)
 
 
@@ -532,7 +647,7 @@ def add_attribute():
         allowed_values = request.form.get("allowed_values", "")
         allow_multiple = request.form.get("allow_multiple") == "on"
         slot_id = request.form.get("slot_id")
-        order_index = int(request.form.get("order_index", 0))
+        position = int(request.form.get("order_index", 0))
 
         if not attr_name:
             flash("Attribute name is required.")
@@ -544,45 +659,76 @@ def add_attribute():
             allowed_values_list = [v.strip() for v in allowed_values.split(",") if v.strip()]
 
         # Create attribute
-        new_attr = supabase.table("attributes").insert({
-            "user_id": user_id,
-            "attr_name": attr_name,
-            "attr_type": attr_type,
-            "attr_possiblevals": allowed_values_list,
-            "allow_multiple": allow_multiple
-        }).execute()
+        new_attr = attribute_repository.create(user_id, attr_name, attr_type, allowed_values_list, allow_multiple)
 
-        attr_id = new_attr.data[0]["attr_id"]
+        attr_id = new_attr["attr_id"]
 
         # If slot_id is provided, link it to the slot
         if slot_id:
-            # Shift existing attributes at or after this order_index
-            existing_attr_slots = supabase.table("attr_slots").select("*").eq("slot_id", slot_id).gte("order_index", order_index).execute().data
-            for as_rel in existing_attr_slots:
-                supabase.table("attr_slots").update({"order_index": as_rel["order_index"] + 1}).eq("attr_slot_id", as_rel["attr_slot_id"]).execute()
+            # Pick a sparse order key between the neighbouring attributes
+            existing_attr_slots = attribute_repository.slot_links(user_id, slot_id)
+            order_index = order_index_for_insert("attr_slots", "attr_slot_id", existing_attr_slots, position)
 
             # Create attr_slot relationship
-            supabase.table("attr_slots").insert({
-                "user_id": user_id,
-                "attr_id": attr_id,
-                "slot_id": slot_id,
-                "order_index": order_index
-            }).execute()
+            attribute_repository.link(user_id, attr_id, slot_id, order_index)
+            invalidate_schema(user_id)
+            outfit_pool.invalidate(user_id)
+            bump_version(user_id)
 
             return redirect("/items")
 
+        invalidate_schema(user_id)
+        outfit_pool.invalidate(user_id)
+        bump_version(user_id)
         return redirect("/attributes")
 
     # If adding to a specific slot, get slot info
     slot = None
     if slot_id:
-        slot_data = supabase.table("slots").select("*").eq("slot_id", slot_id).eq("user_id", user_id).execute().data
-        if slot_data:
-            slot = slot_data[0]
+        slot, _ = load_slot_schema(user_id, slot_id)
 
     return render_template("add_attribute.html", slot=slot, order_index=order_index)
 
 
+# -------------------------------------------------------
+# OUTFITS
+# -------------------------------------------------------
+
+@app.route("/outfits/generate")
+def generate_outfit():
+    if "user_id" not in session:
+        return redirect("/login")
+    
+    user_id = session["user_id"]
+
+    try:
+        # Normally just a dequeue. On an empty queue generate a whole batch here
+        # and queue the rest, rather than also waiting on a background refill
+        version = current_version(user_id)
+        chosen = outfit_pool.take(user_id, version)
+        if chosen is None:
+            outfits = generate_outfits(user_id, outfit_pool.size)
+            chosen = outfits[0] if outfits else None
+            outfit_pool.fill(user_id, outfits[1:], version)
+        if not chosen:
+            flash("No outfit fits your rules. Add some items or relax your rules.")
+            return render_template("outfit.html", outfit=[])
+
+        # Pair each chosen item with its slot for display
+        slots_by_id = get_schema(user_id)["slots_by_id"]
+        outfit = [(slots_by_id[str(item["slot_id"])], item) for item in chosen
+                  if str(item["slot_id"]) in slots_by_id]
+
+        # Count the generation against every item in the outfit (one atomic increment)
+        outfit_repository.record_generated(user_id, [item["item_id"] for item in chosen])
+
+        return render_template("outfit.html", outfit=outfit)
+    except Exception as e:
+        print(f"Error in generate_outfit: {str(e)}")
+        flash(f"Error generating outfit: {str(e)}")
+        return render_template("outfit.html", outfit=[])
+
+
 # -------------------------------------------------------
 # RULES
 # -------------------------------------------------------
@@ -595,7 +741,7 @@ def list_rules():
     user_id = session["user_id"]
     
     try:
-        rules = supabase.table("rules").select("*").eq("user_id", user_id).execute().data
+        rules = rule_repository.list_for_user(user_id)
         return render_template("rules.html", rules=rules)
     except Exception as e:
         print(f"Error in list_rules: {str(e)}")
@@ -617,10 +763,18 @@ def add_rule():
             flash("Rule definition is required.")
             return redirect(request.referrer)
 
-        supabase.table("rules").insert({
-            "user_id": user_id,
-            "rule_definition": rule_definition
-        }).execute()
+        # Make sure the rule parses and names real slots and attributes
+        schema = get_schema(user_id)
+        try:
+            compile_rule(rule_definition, schema["slots"], schema["slot_attrs"], schema["attributes"])
+        except RuleSyntaxError as e:
+            flash(f"Invalid rule: {str(e)}")
+            return redirect(request.referrer)
+
+        rule_repository.create(user_id, rule_definition)
+        invalidate_rules(user_id)
+        outfit_pool.invalidate(user_id)
+        bump_version(user_id)
 
         return redirect("/rules")
 